@@ -0,0 +1,1293 @@
+# guest_checkout/benchmarks/fake_frappe.py
+"""In-memory stand-in for the parts of frappe, webshop and erpnext used by guest checkout.
+
+Only meant for the offline benchmark: documents live in dicts, the cache is a
+dict, and every call that would hit the database on a real site increments
+``frappe.db.queries`` so benchmarks can report DB calls per operation.
+"""
+import copy
+import datetime
+import importlib
+import json
+import logging
+import operator
+import pickle
+import secrets
+import sys
+import time
+import traceback
+import types
+
+
+class _dict(dict):
+    """Same semantics as frappe._dict"""
+
+    def __getattr__(self, key):
+        if key.startswith("__"):
+            raise AttributeError(key)
+        return self.get(key)
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+    def __getstate__(self):
+        return dict(self)
+
+    def __setstate__(self, state):
+        self.update(state)
+
+    def copy(self):
+        return _dict(self)
+
+
+class ValidationError(Exception):
+    pass
+
+
+class TimestampMismatchError(ValidationError):
+    pass
+
+
+class DoesNotExistError(ValidationError):
+    pass
+
+
+class TooManyRequestsError(Exception):
+    http_status_code = 429
+
+
+class PermissionError(Exception):
+    pass
+
+
+class DuplicateEntryError(ValidationError):
+    pass
+
+
+class UniqueValidationError(ValidationError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+TABLE_FIELDS = {
+    "Quotation": {"items": "Quotation Item", "taxes": "Sales Taxes and Charges", "payment_schedule": "Payment Schedule"},
+    "Sales Order": {"items": "Sales Order Item", "taxes": "Sales Taxes and Charges", "payment_schedule": "Payment Schedule"},
+    "Address": {"links": "Dynamic Link"},
+    "Contact": {"links": "Dynamic Link", "email_ids": "Contact Email", "phone_nos": "Contact Phone"},
+    "Customer": {},
+    "Delivery Area": {"weight_tiers": "Delivery Area Weight Tier"},
+}
+
+DATA_FIELDS = {
+    "Delivery Area": ["area", "delivery_charge", "free_delivery_above"],
+}
+
+# Header columns copied into get_item_details arguments
+VALID_COLUMNS = {
+    "Quotation": [
+        "name", "company", "currency", "conversion_rate", "selling_price_list", "price_list_currency",
+        "plc_conversion_rate", "party_name", "transaction_date", "coupon_code", "ignore_pricing_rule",
+    ],
+}
+
+SINGLE_DOCTYPES = {"Webshop Settings", "Selling Settings"}
+
+NAMING_PREFIX = {
+    "Quotation": "QTN-CART-",
+    "Sales Order": "SO-",
+    "Payment Entry": "PE-",
+    "Customer": "CUST-",
+    "Address": "ADDR-",
+    "Contact": "CONT-",
+}
+
+
+class Meta:
+    def __init__(self, doctype):
+        self.name = doctype
+        self._tables = TABLE_FIELDS.get(doctype, {})
+
+    def get_table_fields(self):
+        return [_dict({"fieldname": fieldname, "options": options}) for fieldname, options in self._tables.items()]
+
+    def has_field(self, fieldname):
+        return fieldname in self._tables or fieldname in DATA_FIELDS.get(self.name, [fieldname])
+
+    def get_valid_columns(self):
+        return VALID_COLUMNS.get(self.name, [])
+
+
+# ---------------------------------------------------------------------------
+# Database
+# ---------------------------------------------------------------------------
+
+
+class CallbackManager:
+    def __init__(self):
+        self._functions = []
+
+    def add(self, func):
+        self._functions.append(func)
+
+    def run(self):
+        while self._functions:
+            self._functions.pop(0)()
+
+    def reset(self):
+        self._functions.clear()
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.tables = {}
+        self.singles = {}
+        self.queries = 0
+        self.counters = {}
+        self.defaults = {}
+        self.after_commit = CallbackManager()
+        self.after_rollback = CallbackManager()
+
+    # -- bookkeeping -------------------------------------------------------
+    def count_query(self, n=1):
+        self.queries += n
+
+    def table(self, doctype):
+        return self.tables.setdefault(doctype, {})
+
+    def next_name(self, doctype):
+        self.counters[doctype] = self.counters.get(doctype, 0) + 1
+        return f"{NAMING_PREFIX.get(doctype, doctype[:4].upper() + '-')}{self.counters[doctype]:05d}"
+
+    # -- query api ---------------------------------------------------------
+    def sql(self, query, values=None, as_dict=False, pluck=False):
+        self.count_query()
+        return []
+
+    def commit(self):
+        self.after_rollback.reset()
+        self.after_commit.run()
+
+    def rollback(self, save_point=None):
+        if save_point:
+            return
+        self.after_commit.reset()
+        self.after_rollback.run()
+
+    def savepoint(self, save_point):
+        pass
+
+    def get_default(self, key):
+        return self.defaults.get(key)
+
+    def get_value(self, doctype, filters=None, fieldname="name", as_dict=False, order_by=None, cache=False, **kwargs):
+        self.count_query()
+        if doctype in SINGLE_DOCTYPES:
+            return self._single_value(doctype, fieldname)
+
+        rows = self._select(doctype, filters, order_by=order_by, limit=1)
+        if not rows:
+            return None
+        return _project(rows[0], fieldname, as_dict)
+
+    def get_values(self, doctype, filters=None, fieldname="name", as_dict=False, order_by=None, **kwargs):
+        self.count_query()
+        return [_project(row, fieldname, as_dict) for row in self._select(doctype, filters, order_by=order_by)]
+
+    def get_single_value(self, doctype, fieldname, cache=True):
+        self.count_query()
+        return self._single_value(doctype, fieldname)
+
+    def set_single_value(self, doctype, fieldname, value):
+        self.count_query()
+        self.singles.setdefault(doctype, _dict({"doctype": doctype, "name": doctype}))[fieldname] = value
+        local.document_cache.pop((doctype, doctype), None)
+
+    def set_value(self, doctype, name, fieldname, value=None, update_modified=True):
+        self.count_query()
+        values = fieldname if isinstance(fieldname, dict) else {fieldname: value}
+        for row in self._select(doctype, name):
+            row.update(values)
+            if update_modified and "modified" not in values:
+                row["modified"] = now()
+        local.document_cache.pop((doctype, name), None)
+
+    def exists(self, doctype, filters=None, cache=False):
+        self.count_query()
+        if isinstance(doctype, dict):
+            filters = {key: value for key, value in doctype.items() if key != "doctype"}
+            doctype = doctype["doctype"]
+        rows = self._select(doctype, filters, limit=1)
+        return rows[0]["name"] if rows else None
+
+    def count(self, doctype, filters=None):
+        self.count_query()
+        return len(self._select(doctype, filters))
+
+    def delete(self, doctype, filters=None):
+        self.count_query()
+        table = self.table(doctype)
+        for row in self._select(doctype, filters):
+            table.pop(row["name"], None)
+
+    def get_all(self, doctype, filters=None, fields=None, pluck=None, order_by=None, limit=None, limit_page_length=None, **kwargs):
+        self.count_query()
+        rows = self._select(doctype, filters, order_by=order_by, limit=limit or limit_page_length)
+        if pluck:
+            return [row.get(pluck) for row in rows]
+
+        fields = fields or ["name"]
+        out = []
+        for row in rows:
+            out.append(_dict({_alias(field): row.get(_column(field)) for field in fields}))
+        return out
+
+    # -- helpers -----------------------------------------------------------
+    def _single_value(self, doctype, fieldname):
+        single = self.singles.get(doctype) or {}
+        if isinstance(fieldname, (list, tuple)):
+            return tuple(single.get(field) for field in fieldname)
+        return single.get(fieldname)
+
+    def _select(self, doctype, filters=None, order_by=None, limit=None):
+        table = self.table(doctype)
+        if isinstance(filters, str):
+            rows = [table[filters]] if filters in table else []
+        else:
+            rows = [row for row in table.values() if _matches(row, filters)]
+
+        if order_by:
+            for part in reversed(order_by.split(",")):
+                tokens = part.strip().split()
+                field = tokens[0].split(".")[-1].strip("`")
+                reverse = len(tokens) > 1 and tokens[1].lower() == "desc"
+                rows.sort(key=lambda row: (row.get(field) is None, row.get(field) or ""), reverse=reverse)
+
+        if limit:
+            rows = rows[: int(limit)]
+        return rows
+
+
+def _column(field):
+    return field.split(" as ")[0].strip()
+
+
+def _alias(field):
+    parts = field.split(" as ")
+    return (parts[1] if len(parts) > 1 else parts[0]).strip()
+
+
+def _project(row, fieldname, as_dict):
+    if isinstance(fieldname, (list, tuple)):
+        if as_dict:
+            return _dict({field: row.get(field) for field in fieldname})
+        return tuple(row.get(field) for field in fieldname)
+    if as_dict:
+        return _dict({fieldname: row.get(fieldname)})
+    return row.get(fieldname)
+
+
+_OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": lambda a, b: a is not None and a < b,
+    ">": lambda a, b: a is not None and a > b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in (b or []),
+    "not in": lambda a, b: a not in (b or []),
+    "is": lambda a, b: (a not in (None, "")) if b == "set" else (a in (None, "")),
+}
+
+
+def _matches(row, filters):
+    if not filters:
+        return True
+    items = filters.items() if isinstance(filters, dict) else [(f[-3], f[-2:]) for f in filters]
+    for field, condition in items:
+        if isinstance(condition, (list, tuple)):
+            op, value = condition[0], condition[1]
+        else:
+            op, value = "=", condition
+        if not _OPERATORS[op](row.get(field), value):
+            return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Query builder (subset of frappe.qb used by guest checkout)
+# ---------------------------------------------------------------------------
+
+
+class _Criterion:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __call__(self, row):
+        return self.fn(row)
+
+    def __and__(self, other):
+        return _Criterion(lambda row: self(row) and other(row))
+
+    def __or__(self, other):
+        return _Criterion(lambda row: self(row) or other(row))
+
+
+def _value_of(term, row):
+    return term.value(row) if isinstance(term, _Field) else term
+
+
+class _Field:
+    def __init__(self, table, name, alias=None):
+        self.table = table
+        self.name = name
+        self.alias = alias or name
+
+    def as_(self, alias):
+        return _Field(self.table, self.name, alias)
+
+    def value(self, row):
+        record = row.get(self.table.alias)
+        return record.get(self.name) if record else None
+
+    def _compare(self, op, other):
+        def fn(row):
+            left, right = self.value(row), _value_of(other, row)
+            # SQL semantics: any comparison with NULL is false
+            if left is None or right is None:
+                return False
+            return op(left, right)
+
+        return _Criterion(fn)
+
+    def __eq__(self, other):
+        return self._compare(operator.eq, other)
+
+    def __ne__(self, other):
+        return self._compare(operator.ne, other)
+
+    def __lt__(self, other):
+        return self._compare(operator.lt, other)
+
+    def __gt__(self, other):
+        return self._compare(operator.gt, other)
+
+    def __le__(self, other):
+        return self._compare(operator.le, other)
+
+    def __ge__(self, other):
+        return self._compare(operator.ge, other)
+
+    def isnull(self):
+        return _Criterion(lambda row: self.value(row) is None)
+
+    def isnotnull(self):
+        return _Criterion(lambda row: self.value(row) is not None)
+
+    def isin(self, values):
+        values = list(values)
+        return _Criterion(lambda row: self.value(row) in values)
+
+    def notin(self, values):
+        values = list(values)
+        return _Criterion(lambda row: self.value(row) is not None and self.value(row) not in values)
+
+    __hash__ = object.__hash__
+
+
+class _Table:
+    def __init__(self, doctype, alias=None):
+        self.doctype = doctype
+        self.alias = alias or doctype
+
+    def as_(self, alias):
+        return _Table(self.doctype, alias)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _Field(self, name)
+
+
+class _Query:
+    def __init__(self, table):
+        self._from = table
+        self._joins = []
+        self._fields = []
+        self._where = []
+        self._orderby = []
+        self._limit = None
+        self._distinct = False
+
+    def left_join(self, table):
+        query = self
+
+        class _On:
+            def on(self, criterion):
+                query._joins.append((table, criterion))
+                return query
+
+        return _On()
+
+    def select(self, *fields):
+        self._fields.extend(fields)
+        return self
+
+    def distinct(self):
+        self._distinct = True
+        return self
+
+    def where(self, criterion):
+        self._where.append(criterion)
+        return self
+
+    def orderby(self, field, order=None):
+        self._orderby.append((field, order))
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def run(self, as_dict=False, pluck=False):
+        db.count_query()
+        rows = [{self._from.alias: record} for record in db.table(self._from.doctype).values()]
+
+        for table, criterion in self._joins:
+            joined = []
+            records = list(db.table(table.doctype).values())
+            for row in rows:
+                matches = [dict(row, **{table.alias: record}) for record in records if criterion(dict(row, **{table.alias: record}))]
+                joined.extend(matches or [dict(row, **{table.alias: None})])
+            rows = joined
+
+        rows = [row for row in rows if all(criterion(row) for criterion in self._where)]
+
+        for field, order in reversed(self._orderby):
+            rows.sort(key=lambda row: field.value(row) or "", reverse=str(order).lower().endswith("desc"))
+
+        result = []
+        seen = set()
+        for row in rows:
+            values = tuple(field.value(row) for field in self._fields)
+            if self._distinct:
+                if values in seen:
+                    continue
+                seen.add(values)
+            result.append(values)
+
+        if self._limit:
+            result = result[: self._limit]
+
+        if pluck:
+            return [values[0] for values in result]
+        if as_dict:
+            return [_dict(zip([field.alias for field in self._fields], values)) for values in result]
+        return result
+
+
+class _QueryBuilder:
+    @staticmethod
+    def DocType(doctype):
+        return _Table(doctype)
+
+    @staticmethod
+    def from_(table):
+        return _Query(table)
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+
+class _RawRedis:
+    """Raw redis commands on already prefixed keys; values are bytes like redis returns"""
+
+    def __init__(self):
+        self.data = {}
+        self.hashes = {}
+        self.sets = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    def delete(self, *keys):
+        deleted = 0
+        for key in keys:
+            for store in (self.data, self.hashes, self.sets):
+                if store.pop(key, None) is not None:
+                    deleted += 1
+        return deleted
+
+    def expire(self, key, seconds):
+        return True
+
+    def incrby(self, key, amount=1):
+        value = int(self.data.get(key) or 0) + amount
+        self.data[key] = str(value).encode()
+        return value
+
+    def hincrby(self, key, field, amount=1):
+        values = self.hashes.setdefault(key, {})
+        values[_encode(field)] = str(int(values.get(_encode(field)) or 0) + amount).encode()
+        return int(values[_encode(field)])
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        values = self.hashes.setdefault(key, {})
+        values[_encode(field)] = str(float(values.get(_encode(field)) or 0) + amount).encode()
+        return float(values[_encode(field)])
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(_encode(field))
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[_encode(field)] = _encode(value)
+
+    def hdel(self, key, *fields):
+        values = self.hashes.get(key, {})
+        return sum(values.pop(_encode(field), None) is not None for field in fields)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def sadd(self, key, *values):
+        self.sets.setdefault(key, set()).update(_encode(value) for value in values)
+
+    def eval(self, script, numkeys, *keys_and_args):
+        """Runs the app's Lua scripts through Python ports of them"""
+        from guest_checkout import rate_limit
+
+        ports = {rate_limit.TOKEN_BUCKET_SCRIPT: _token_bucket}
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        return ports[script](self, keys, args)
+
+
+def _token_bucket(redis, keys, args):
+    """Python port of rate_limit.TOKEN_BUCKET_SCRIPT"""
+    now = float(args[1])
+    allowed, retry_after, buckets = 1, 0.0, []
+
+    for i, key in enumerate(keys[:-1]):
+        capacity, rate = float(args[2 + i * 2]), float(args[3 + i * 2])
+        state = redis.hashes.get(key, {})
+        tokens = float(state.get(b"tokens") or capacity)
+        ts = float(state.get(b"ts") or now)
+        tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+        if tokens < 1:
+            allowed = 0
+            retry_after = max(retry_after, (1 - tokens) / rate)
+        buckets.append((key, tokens))
+
+    for key, tokens in buckets:
+        _RawRedis.hset(redis, key, "tokens", tokens - allowed)
+        _RawRedis.hset(redis, key, "ts", now)
+
+    _RawRedis.hincrby(redis, keys[-1], f"{args[0]}:{'allowed' if allowed else 'limited'}", 1)
+    return [allowed, str(retry_after).encode()]
+
+
+def _encode(value):
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+class _Pipeline(_RawRedis):
+    """Queues raw commands and returns their results from execute(), like redis-py"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattribute__(self, name):
+        if name in ("redis", "commands", "execute") or name.startswith("_"):
+            return object.__getattribute__(self, name)
+
+        # Pipelines bypass the wrapper methods: raw keys, raw values
+        command = getattr(_RawRedis, name).__get__(self.redis)
+
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        results = [command(*args, **kwargs) for command, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+class FakeCache(_RawRedis):
+    """Dict-backed stand-in for frappe's RedisWrapper
+
+    Wrapper methods (get_value, hset, hgetall, sadd, ...) prefix keys and
+    pickle values; the inherited raw commands work on prefixed keys.
+    """
+
+    def __call__(self):
+        return self
+
+    def make_key(self, key):
+        return f"site|{key}".encode()
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def get_value(self, key, generator=None, expires=False):
+        raw = self.get(self.make_key(key))
+        return pickle.loads(raw) if raw is not None else None
+
+    def set_value(self, key, value, expires_in_sec=None):
+        self.data[self.make_key(key)] = pickle.dumps(value)
+
+    def delete_value(self, keys):
+        for key in keys if isinstance(keys, (list, tuple)) else [keys]:
+            self.delete(self.make_key(key))
+
+    def hget(self, name, key, generator=None):
+        raw = self.hashes.get(self.make_key(name), {}).get(_encode(key))
+        if raw is None:
+            if not generator:
+                return None
+            value = generator()
+            self.hset(name, key, value)
+            return value
+        return pickle.loads(raw)
+
+    def hset(self, name, key, value):
+        self.hashes.setdefault(self.make_key(name), {})[_encode(key)] = pickle.dumps(value)
+
+    def hdel(self, name, key):
+        self.hashes.get(self.make_key(name), {}).pop(_encode(key), None)
+
+    def hgetall(self, name):
+        return {key: pickle.loads(value) for key, value in self.hashes.get(self.make_key(name), {}).items()}
+
+    def sadd(self, name, *values):
+        super().sadd(self.make_key(name), *values)
+
+    def smembers(self, name):
+        return super().smembers(self.make_key(name))
+
+
+# ---------------------------------------------------------------------------
+# Documents
+# ---------------------------------------------------------------------------
+
+
+class Document:
+    """Attribute based like frappe's BaseDocument; stored rows are plain dicts"""
+
+    def __init__(self, *args, **kwargs):
+        data = args[0] if args and isinstance(args[0], dict) else kwargs
+        self.__dict__["flags"] = _dict()
+        for key, value in copy.deepcopy(dict(data)).items():
+            setattr(self, key, value)
+        for fieldname in self._table_fields():
+            if fieldname not in self.__dict__:
+                self.set(fieldname, [])
+
+    def __getattr__(self, key):
+        if key.startswith("__"):
+            raise AttributeError(key)
+        return None
+
+    def __setattr__(self, key, value):
+        if key in self._table_fields():
+            self.set(key, value)
+        else:
+            self.__dict__[key] = value
+
+    def __getitem__(self, key):
+        return self.__dict__[key]
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__dict__
+
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def _table_fields(self):
+        return TABLE_FIELDS.get(self.__dict__.get("doctype"), {})
+
+    def _make_child(self, fieldname, row):
+        child = row if isinstance(row, Document) else Document(dict(row, doctype=row.get("doctype") or self._table_fields()[fieldname]))
+        child.parentfield = fieldname
+        child.parenttype = self.doctype
+        child.parent = self.name
+        return child
+
+    def get(self, key, filters=None, default=None):
+        if isinstance(key, dict):
+            return _matches(self.__dict__, key)
+        value = self.__dict__.get(key, default)
+        if filters is None:
+            return value
+        return [row for row in value or [] if _matches(row.__dict__, filters)]
+
+    def set(self, key, value):
+        if key in self._table_fields():
+            value = [self._make_child(key, row) for row in value or []]
+        self.__dict__[key] = value
+
+    def update(self, values):
+        for key, value in values.items():
+            setattr(self, key, value)
+        return self
+
+    def setdefault(self, key, value):
+        if self.__dict__.get(key) is None:
+            setattr(self, key, value)
+        return self.__dict__[key]
+
+    def pop(self, key, default=None):
+        return self.__dict__.pop(key, default)
+
+    def as_dict(self):
+        data = {key: value for key, value in self.__dict__.items() if key != "flags"}
+        for fieldname in self._table_fields():
+            data[fieldname] = [row.as_dict() for row in data.get(fieldname) or []]
+        return _dict(copy.deepcopy(data))
+
+    def append(self, key, value=None):
+        child = self._make_child(key, value or {})
+        self.__dict__.setdefault(key, []).append(child)
+        return child
+
+    # -- lifecycle ---------------------------------------------------------
+    def is_new(self):
+        return bool(self.get("__islocal")) or not self.name
+
+    def run_method(self, method, *args, **kwargs):
+        controller = CONTROLLERS.get(self.doctype, {}).get(method)
+        result = controller(self, *args, **kwargs) if controller else None
+        _run_doc_events(self, method)
+        return result
+
+    def _child_rows(self):
+        return sum(len(self.get(fieldname) or []) for fieldname in self._table_fields())
+
+    def _store(self):
+        self._delete_children()
+        for fieldname, child_doctype in self._table_fields().items():
+            for idx, row in enumerate(self.get(fieldname) or [], start=1):
+                row.update({"parent": self.name, "parenttype": self.doctype, "parentfield": fieldname, "idx": idx})
+                row.name = row.name or generate_hash(length=10)
+                db.table(child_doctype)[row.name] = row.as_dict()
+
+        db.table(self.doctype)[self.name] = self.as_dict()
+        local.document_cache.pop((self.doctype, self.name), None)
+
+    def _delete_children(self):
+        for child_doctype in self._table_fields().values():
+            table = db.table(child_doctype)
+            for name in [name for name, row in table.items() if row.get("parent") == self.name]:
+                del table[name]
+
+    def insert(self, ignore_permissions=None, ignore_mandatory=None):
+        self.run_method("validate")
+        if self.is_new():
+            self.name = db.next_name(self.doctype) if self.get("__islocal") or not self.name else self.name
+        self.pop("__islocal")
+        self.setdefault("docstatus", 0)
+        self.setdefault("disabled", 0)
+        self.creation = self.modified = now()
+        db.count_query(1 + self._child_rows())
+        self._store()
+        self.run_method("on_update")
+        return self
+
+    def save(self, ignore_permissions=None):
+        if self.is_new():
+            return self.insert()
+        self.run_method("validate")
+        stored = db.table(self.doctype).get(self.name) or {}
+        if stored.get("modified") and stored.get("modified") != self.modified:
+            raise TimestampMismatchError(f"{self.doctype} {self.name} was modified after it was loaded")
+        self.modified = now()
+        db.count_query(1 + self._child_rows())
+        self._store()
+        self.run_method("on_submit" if self.docstatus == 1 and self.flags.submitting else "on_update")
+        return self
+
+    def submit(self):
+        self.docstatus = 1
+        self.flags.submitting = True
+        self.save()
+        self.flags.submitting = False
+        db.count_query(2)
+        return self
+
+    def db_insert(self):
+        self.name = self.name or generate_hash(length=10)
+        self.creation = self.modified = self.modified or now()
+        self.db_update()
+
+    def db_update(self):
+        db.count_query()
+        db.table(self.doctype)[self.name] = self.as_dict()
+        local.document_cache.pop((self.doctype, self.name), None)
+
+    def precision(self, fieldname, parentfield=None):
+        return 3
+
+    def delete(self, ignore_permissions=None):
+        self.run_method("on_trash")
+        db.count_query(1 + len(self._table_fields()))
+        self._delete_children()
+        db.table(self.doctype).pop(self.name, None)
+
+    def get_display(self):
+        return "\n".join(filter(None, [self.address_line1, self.city, self.country]))
+
+    def get_formatted(self, fieldname):
+        return str(self.get(fieldname))
+
+
+def _run_doc_events(doc, event):
+    """Run the app's doc_events hooks for a document event, like frappe's run_method"""
+    from guest_checkout import hooks as app_hooks
+
+    handlers = getattr(app_hooks, "doc_events", {}).get(doc.doctype, {}).get(event) or []
+    for handler in [handlers] if isinstance(handlers, str) else handlers:
+        module_name, function_name = handler.rsplit(".", 1)
+        getattr(importlib.import_module(module_name), function_name)(doc, event)
+
+
+def _calculate_totals(doc):
+    for item in doc.items:
+        item.amount = flt(item.qty) * flt(item.rate)
+    doc.total_qty = sum(flt(item.qty) for item in doc.items)
+    doc.total = doc.net_total = sum(item.amount for item in doc.items)
+    doc.grand_total = doc.rounded_total = doc.total + sum(flt(tax.tax_amount) for tax in doc.taxes)
+
+
+def _set_missing_values(doc):
+    db.count_query(2)
+    doc.setdefault("currency", "KWD")
+    doc.setdefault("conversion_rate", 1)
+
+
+CONTROLLERS = {
+    "Quotation": {"validate": _calculate_totals, "calculate_taxes_and_totals": _calculate_totals, "set_missing_values": _set_missing_values},
+    "Sales Order": {"validate": _calculate_totals, "calculate_taxes_and_totals": _calculate_totals, "set_missing_values": _set_missing_values},
+}
+
+
+# ---------------------------------------------------------------------------
+# frappe module surface
+# ---------------------------------------------------------------------------
+
+
+class _Local:
+    def __init__(self):
+        self.site = "benchmark.local"
+        self.document_cache = {}
+        self.cookie_manager = _CookieManager()
+        self.request = None
+        self.response = _dict()
+
+    def __getattr__(self, key):
+        if key.startswith("__"):
+            raise AttributeError(key)
+        return None
+
+
+class _CookieManager:
+    def __init__(self):
+        self.cookies = {}
+
+    def set_cookie(self, key, value, expires=None, **kwargs):
+        self.cookies[key] = value
+
+    def get_cookie(self, key):
+        return self.cookies.get(key)
+
+
+db = FakeDatabase()
+local = _Local()
+session = _dict({"user": "Guest"})
+form_dict = _dict()
+flags = _dict()
+conf = _dict({"developer_mode": 1, "guest_checkout_payment_secret": "benchmark-secret"})
+qb = _QueryBuilder()
+cache = FakeCache()
+error_log = []
+enqueued_jobs = []
+hooks = {}
+
+
+def now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def nowdate():
+    return datetime.date.today().isoformat()
+
+
+def add_days(date, days):
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date[:10])
+    return (date + datetime.timedelta(days=days)).isoformat()
+
+
+def flt(value, precision=None):
+    try:
+        value = float(value or 0)
+    except (TypeError, ValueError):
+        value = 0.0
+    return round(value, precision) if precision is not None else value
+
+
+def cint(value):
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def round_based_on_smallest_currency_fraction(value, currency=None, precision=2):
+    return flt(value, precision)
+
+
+def cstr(value):
+    return "" if value is None else str(value)
+
+
+def safe_decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def whitelist(allow_guest=False, methods=None, xss_safe=False):
+    def decorator(fn):
+        return fn
+
+    return decorator
+
+
+def _(message, *args, **kwargs):
+    return message
+
+
+def throw(message, exc=ValidationError, title=None):
+    raise exc(message)
+
+
+def only_for(roles, message=False):
+    pass
+
+
+def generate_hash(txt=None, length=None):
+    return secrets.token_hex(((length or 20) + 1) // 2)[: length or 20]
+
+
+def get_traceback(*args, **kwargs):
+    return traceback.format_exc()
+
+
+def log_error(message=None, title=None, **kwargs):
+    error_log.append((title, message))
+
+
+def logger(module=None, **kwargs):
+    return logging.getLogger(module or "frappe")
+
+
+def parse_json(value):
+    return _dict(json.loads(value)) if isinstance(value, str) else value
+
+
+def as_json(value, indent=None):
+    return json.dumps(value, default=str)
+
+
+def get_hooks(hook=None, default=None, app_name=None):
+    return hooks.get(hook, default if default is not None else {})
+
+
+def render_template(template, context, is_path=None, safe_render=True):
+    return ""
+
+
+def set_user(user):
+    session.user = user
+
+
+def get_meta(doctype, cached=True):
+    return Meta(doctype)
+
+
+def new_doc(doctype, **kwargs):
+    return Document({"doctype": doctype, "__islocal": 1, **kwargs})
+
+
+def get_doc(*args, **kwargs):
+    if args and isinstance(args[0], Document):
+        return args[0]
+    if args and isinstance(args[0], dict):
+        return Document(args[0])
+    if kwargs and not args:
+        return Document(kwargs)
+
+    doctype, name = args[0], args[1] if len(args) > 1 else args[0]
+    if doctype in SINGLE_DOCTYPES:
+        db.count_query()
+        return Document(db.singles.setdefault(doctype, _dict({"doctype": doctype, "name": doctype})))
+
+    if isinstance(name, dict):
+        name = db.exists(doctype, name)
+
+    db.count_query(1 + len(TABLE_FIELDS.get(doctype, {})))
+    record = db.table(doctype).get(name)
+    if record is None:
+        raise DoesNotExistError(f"{doctype} {name} not found")
+    return Document(copy.deepcopy(dict(record)))
+
+
+def get_cached_doc(doctype, name=None):
+    key = (doctype, name or doctype)
+    if key not in local.document_cache:
+        local.document_cache[key] = get_doc(doctype, name or doctype)
+    return local.document_cache[key]
+
+
+def get_all(doctype, *args, **kwargs):
+    return db.get_all(doctype, *args, **kwargs)
+
+
+def get_cached_value(doctype, name, fieldname="name", as_dict=False):
+    key = ("value", doctype, json.dumps(name, sort_keys=True, default=str), json.dumps(fieldname))
+    if key not in local.document_cache:
+        local.document_cache[key] = db.get_value(doctype, name, fieldname, as_dict=as_dict)
+    return local.document_cache[key]
+
+
+def delete_doc(doctype, name, force=False, ignore_permissions=False, **kwargs):
+    db.count_query(1 + len(TABLE_FIELDS.get(doctype, {})))
+    db.table(doctype).pop(name, None)
+
+
+def enqueue(method, queue="default", timeout=None, enqueue_after_commit=False, job_id=None, **kwargs):
+    enqueued_jobs.append((method, kwargs))
+
+
+def reset():
+    """Clear all documents, cache entries and counters"""
+    global db, cache, local
+    db.__init__()
+    cache.__init__()
+    local.__init__()
+    session.clear()
+    session.user = "Guest"
+    form_dict.clear()
+    error_log.clear()
+    enqueued_jobs.clear()
+
+
+# ---------------------------------------------------------------------------
+# webshop / erpnext stand-ins
+# ---------------------------------------------------------------------------
+
+
+def get_shopping_cart_settings():
+    return get_cached_doc("Webshop Settings")
+
+
+def apply_cart_settings(party=None, quotation=None):
+    """Prices every line (one Item Price lookup per line, like pricing rules) and recalculates"""
+    settings = get_shopping_cart_settings()
+    quotation.selling_price_list = settings.price_list
+    for item in quotation.get("items") or []:
+        item["rate"] = flt(db.get_value("Item Price", {"item_code": item.item_code, "price_list": settings.price_list}, "price_list_rate"))
+    _calculate_totals(quotation)
+
+
+def get_party(user=None):
+    customer = db.get_value("Contact", {"email_id": user or session.user}, "customer")
+    return get_doc("Customer", customer) if customer else None
+
+
+def get_address_docs(party=None, **kwargs):
+    db.count_query()
+    return []
+
+
+def get_shipping_addresses(party=None):
+    db.count_query()
+    return []
+
+
+def get_billing_addresses(party=None):
+    db.count_query()
+    return []
+
+
+def update_cart_address(address_type, address_name):
+    pass
+
+
+def decorate_quotation_doc(doc):
+    for item in doc.get("items") or []:
+        item.update(db.get_value("Website Item", {"item_code": item.item_code}, ["web_item_name", "route"], as_dict=True) or {})
+    return doc
+
+
+def get_product_info_for_website(item_code, skip_quotation_creation=False):
+    settings = get_shopping_cart_settings()
+    rate = db.get_value("Item Price", {"item_code": item_code, "price_list": settings.price_list}, "price_list_rate")
+    return {"product_info": {"price": {"price_list_rate": rate}}, "cart_settings": settings}
+
+
+def get_item_details(args, doc=None, for_validate=False, overwrite_warehouse=True):
+    """Price list rate of a line (one Item Price lookup); no pricing rules in the stand-in"""
+    price_list = args.get("selling_price_list") or get_shopping_cart_settings().price_list
+    rate = db.get_value("Item Price", {"item_code": args.get("item_code"), "price_list": price_list}, "price_list_rate")
+    return _dict({
+        "price_list_rate": flt(rate),
+        "discount_percentage": 0,
+        "discount_amount": 0,
+        "margin_type": None,
+        "margin_rate_or_amount": 0,
+        "pricing_rules": "",
+    })
+
+
+def make_sales_order(source_name, target_doc=None, ignore_permissions=False):
+    quotation = get_doc("Quotation", source_name)
+    return Document({
+        "doctype": "Sales Order",
+        "__islocal": 1,
+        "customer": quotation.party_name,
+        "company": quotation.company,
+        "currency": quotation.currency,
+        "items": [
+            {"item_code": item.item_code, "item_name": item.item_name, "qty": item.qty, "rate": item.rate, "prevdoc_docname": quotation.name}
+            for item in quotation.get("items")
+        ],
+        "taxes": [tax.as_dict() for tax in quotation.taxes],
+    })
+
+
+def get_payment_entry(dt, dn, **kwargs):
+    reference = get_doc(dt, dn)
+    return Document({
+        "doctype": "Payment Entry",
+        "__islocal": 1,
+        "payment_type": "Receive",
+        "party_type": "Customer",
+        "party": reference.customer,
+        "paid_amount": reference.grand_total,
+        "references": [{"reference_doctype": dt, "reference_name": dn}],
+    })
+
+
+def get_root_of(doctype):
+    return f"All {doctype}s"
+
+
+def get_address_display(address):
+    return Document(address).get_display() if isinstance(address, dict) else str(address)
+
+
+def get_fullname(user=None):
+    return user or session.user
+
+
+def create_custom_field(doctype, df, ignore_validate=False, is_system_generated=True):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Installation into sys.modules
+# ---------------------------------------------------------------------------
+
+
+COUNTRY_INFO = {"Kuwait": {"isd": "+965"}}
+
+
+def get_country_info(country=None):
+    return COUNTRY_INFO.get(country, {})
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    module.__path__ = []
+    sys.modules[name] = module
+    return module
+
+
+def install():
+    """Register the stand-in as frappe, webshop and erpnext"""
+    this = sys.modules[__name__]
+
+    frappe = _module("frappe")
+    for name in [
+        "_dict", "ValidationError", "DoesNotExistError", "PermissionError", "DuplicateEntryError",
+        "UniqueValidationError", "TimestampMismatchError", "TooManyRequestsError", "db", "local", "session",
+        "form_dict", "flags", "conf", "qb", "cache", "whitelist", "_", "throw", "only_for", "generate_hash",
+        "get_traceback", "log_error", "logger", "parse_json", "as_json", "get_hooks", "render_template",
+        "set_user", "get_meta", "new_doc", "get_doc", "get_cached_doc", "get_cached_value", "delete_doc",
+        "enqueue", "safe_decode", "get_all",
+    ]:
+        setattr(frappe, name, getattr(this, name))
+
+    utils = _module(
+        "frappe.utils", flt=flt, cint=cint, cstr=cstr, now=now, nowdate=nowdate, add_days=add_days,
+        get_fullname=get_fullname, safe_decode=safe_decode,
+        round_based_on_smallest_currency_fraction=round_based_on_smallest_currency_fraction,
+    )
+    frappe.utils = utils
+    utils.nestedset = _module("frappe.utils.nestedset", get_root_of=get_root_of)
+    frappe.geo = _module("frappe.geo")
+    frappe.geo.country_info = _module("frappe.geo.country_info", get_country_info=get_country_info)
+    frappe.model = _module("frappe.model")
+    frappe.model.document = _module("frappe.model.document", Document=Document)
+    _module("frappe.contacts")
+    _module("frappe.contacts.doctype")
+    _module("frappe.contacts.doctype.address")
+    _module("frappe.contacts.doctype.address.address", get_address_display=get_address_display)
+    _module("frappe.custom")
+    _module("frappe.custom.doctype")
+    _module("frappe.custom.doctype.custom_field")
+    _module("frappe.custom.doctype.custom_field.custom_field", create_custom_field=create_custom_field)
+
+    for name in ["webshop", "webshop.webshop", "webshop.webshop.doctype", "webshop.webshop.doctype.webshop_settings", "webshop.webshop.shopping_cart"]:
+        _module(name)
+    _module("webshop.webshop.doctype.webshop_settings.webshop_settings", get_shopping_cart_settings=get_shopping_cart_settings)
+    _module(
+        "webshop.webshop.shopping_cart.cart",
+        apply_cart_settings=apply_cart_settings, get_party=get_party, get_address_docs=get_address_docs,
+        get_shipping_addresses=get_shipping_addresses, get_billing_addresses=get_billing_addresses,
+        update_cart_address=update_cart_address, decorate_quotation_doc=decorate_quotation_doc,
+    )
+    _module("webshop.webshop.shopping_cart.product_info", get_product_info_for_website=get_product_info_for_website)
+
+    for name in [
+        "erpnext", "erpnext.selling", "erpnext.selling.doctype", "erpnext.selling.doctype.quotation",
+        "erpnext.accounts", "erpnext.accounts.doctype", "erpnext.accounts.doctype.payment_entry",
+        "erpnext.stock",
+    ]:
+        _module(name)
+    _module("erpnext.stock.get_item_details", get_item_details=get_item_details)
+    _module("erpnext.selling.doctype.quotation.quotation", _make_sales_order=make_sales_order)
+    _module("erpnext.accounts.doctype.payment_entry.payment_entry", get_payment_entry=get_payment_entry)
+
+    return frappe
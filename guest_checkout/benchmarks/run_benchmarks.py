@@ -0,0 +1,612 @@
+#!/usr/bin/env python
+# guest_checkout/benchmarks/run_benchmarks.py
+"""Benchmark the guest cart hot paths
+
+Reports ops/sec, p50/p99 latency and DB calls per operation for each
+scenario and compares them against benchmarks/baseline.json.
+
+Offline, against the in-memory stand-in in fake_frappe.py (no bench needed):
+    python benchmarks/run_benchmarks.py
+
+Against a bench site, from frappe-bench/sites with the bench virtualenv:
+    ../env/bin/python ../apps/guest_checkout/benchmarks/run_benchmarks.py --site mysite.local
+
+Scenarios that create orders or delete rows only run on a site with --allow-writes,
+so use a disposable site. Pass --update-baseline to store the current numbers.
+
+Only DB calls per operation are gated: they are deterministic, while latency
+moves with machine load. Pass --latency-tolerance to also gate p50 against a
+baseline recorded on the same machine.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_ROOT = os.path.dirname(BENCHMARKS_DIR)
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+CART_SIZE = 5
+ABANDONED_CARTS = 50
+PAID_ORDERS = 20
+
+
+class OfflineBackend:
+    """Runs the app code against fake_frappe; DB calls are counted by the stand-in"""
+
+    name = "offline"
+    allow_writes = True
+
+    def __init__(self):
+        sys.path.insert(0, BENCHMARKS_DIR)
+        sys.path.insert(0, APP_ROOT)
+
+        import fake_frappe
+
+        self.fake = fake_frappe
+        self.frappe = fake_frappe.install()
+        self.item_codes = []
+
+    def reset(self):
+        """Start every scenario from the same seeded state"""
+        self.fake.reset()
+        self._seed()
+
+    def query_count(self):
+        return self.fake.db.queries
+
+    def set_setting(self, fieldname, value):
+        self.frappe.db.set_single_value("Webshop Settings", fieldname, value)
+
+    def finish_iteration(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _seed(self):
+        db = self.fake.db
+        db.singles["Webshop Settings"] = self.frappe._dict({
+            "doctype": "Webshop Settings",
+            "name": "Webshop Settings",
+            "enabled": 1,
+            "company": "Benchmark Company",
+            "price_list": "Standard Selling",
+            "quotation_series": "QTN-CART-",
+            "delivery_charges_account": "Delivery Charges - BC",
+        })
+        db.defaults["country"] = "Kuwait"
+        db.singles["Selling Settings"] = self.frappe._dict({"customer_group": "Individual"})
+        db.table("Price List")["Standard Selling"] = {"name": "Standard Selling", "currency": "KWD"}
+        db.table("Delivery Area")["Salmiya"] = {"name": "Salmiya", "area": "Salmiya", "delivery_charge": 2}
+        db.table("Payment Gateway Account")["Bookeey - KWD"] = {
+            "name": "Bookeey - KWD",
+            "payment_gateway": "Bookeey",
+            "payment_account": "Bookeey - BC",
+        }
+
+        self.item_codes = []
+        for i in range(1, 21):
+            item_code = f"BENCH-ITEM-{i:03d}"
+            self.item_codes.append(item_code)
+            db.table("Item")[item_code] = {
+                "name": item_code,
+                "item_name": f"Benchmark Item {i}",
+                "image": f"/files/{item_code}.png",
+                "variant_of": None,
+                "is_stock_item": 1,
+            }
+            db.table("Bin")[f"BIN-{item_code}"] = {
+                "name": f"BIN-{item_code}",
+                "item_code": item_code,
+                "warehouse": "Stores - BC",
+                "actual_qty": 100,
+                "reserved_qty": 10,
+            }
+            db.table("Website Item")[f"WEB-{item_code}"] = {
+                "name": f"WEB-{item_code}",
+                "item_code": item_code,
+                "web_item_name": f"Benchmark Item {i}",
+                "route": f"benchmark-item-{i}",
+                "website_warehouse": "Stores - BC",
+                "published": 1,
+            }
+            db.table("Item Price")[f"PRICE-{item_code}"] = {
+                "name": f"PRICE-{item_code}",
+                "item_code": item_code,
+                "price_list": "Standard Selling",
+                "price_list_rate": 1.5 * i,
+            }
+
+
+class SiteBackend:
+    """Runs the app code on a real bench site, counting queries by wrapping frappe.db.sql
+
+    Every iteration is rolled back, except writes the app commits itself.
+    """
+
+    def __init__(self, site, sites_path=".", item_codes=None, allow_writes=False):
+        import frappe
+
+        self.frappe = frappe
+        self.name = f"site:{site}"
+        self.allow_writes = allow_writes
+        self.queries = 0
+
+        frappe.init(site=site, sites_path=sites_path)
+        frappe.connect()
+        self._patch_db_sql()
+
+        self.item_codes = item_codes or frappe.get_all(
+            "Website Item", filters={"published": 1}, pluck="item_code", limit=CART_SIZE + 1
+        )
+        if len(self.item_codes) < CART_SIZE + 1:
+            sys.exit(f"Need at least {CART_SIZE + 1} published Website Items, pass --item-code")
+
+        self.original_settings = {}
+
+    def reset(self):
+        frappe = self.frappe
+        frappe.set_user("Guest")
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+
+    def query_count(self):
+        return self.queries
+
+    def set_setting(self, fieldname, value):
+        frappe = self.frappe
+        if fieldname not in self.original_settings:
+            self.original_settings[fieldname] = frappe.db.get_single_value("Webshop Settings", fieldname)
+        frappe.db.set_single_value("Webshop Settings", fieldname, value)
+        frappe.db.commit()
+
+    def finish_iteration(self):
+        self.frappe.db.rollback()
+
+    def close(self):
+        frappe = self.frappe
+        for fieldname, value in self.original_settings.items():
+            frappe.db.set_single_value("Webshop Settings", fieldname, value)
+        frappe.db.commit()
+        frappe.destroy()
+
+    def _patch_db_sql(self):
+        original_sql = self.frappe.db.sql
+
+        def sql(*args, **kwargs):
+            self.queries += 1
+            return original_sql(*args, **kwargs)
+
+        self.frappe.db.sql = sql
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+
+def _new_guest(backend):
+    backend.frappe.set_user("Guest")
+    for key in ("guest_id", "guest_quotation_name"):
+        backend.frappe.session.pop(key, None)
+
+
+def _fill_cart(backend, size=CART_SIZE):
+    from guest_checkout.guest_cart import update_cart_allow_guest
+
+    _new_guest(backend)
+    for item_code in backend.item_codes[:size]:
+        update_cart_allow_guest(item_code, 2)
+
+
+def _seed_abandoned_carts(backend, count=ABANDONED_CARTS):
+    """Old party-less guest carts plus guest customers without orders"""
+    from frappe.utils import add_days, nowdate
+    from guest_checkout.guest_cart import _new_cart_quotation, get_guest_party
+
+    frappe = backend.frappe
+    old = add_days(nowdate(), -30)
+
+    for i in range(count):
+        _new_guest(backend)
+        quotation = _new_cart_quotation(get_guest_party())
+        quotation.append("items", {"item_code": backend.item_codes[i % len(backend.item_codes)], "qty": 1, "rate": 1})
+        quotation.insert(ignore_permissions=True)
+        frappe.db.set_value("Quotation", quotation.name, "modified", old, update_modified=False)
+
+        customer = frappe.get_doc({
+            "doctype": "Customer",
+            "customer_name": f"Benchmark Guest {i}",
+            "customer_type": "Individual",
+            "guest_checkout": 1,
+        })
+        customer.insert(ignore_permissions=True, ignore_mandatory=True)
+        frappe.db.set_value("Customer", customer.name, "modified", old, update_modified=False)
+        frappe.get_doc({
+            "doctype": "Contact",
+            "first_name": customer.customer_name,
+            "links": [{"link_doctype": "Customer", "link_name": customer.name}],
+        }).insert(ignore_permissions=True)
+
+
+def bench_update_cart(backend, iteration):
+    from guest_checkout.guest_cart import update_cart_allow_guest
+
+    _fill_cart(backend)
+    item_code = backend.item_codes[CART_SIZE]
+    return lambda: update_cart_allow_guest(item_code, 1)
+
+
+def bench_change_qty(backend, iteration):
+    from guest_checkout.guest_cart import update_cart_allow_guest
+
+    _fill_cart(backend)
+    item_code = backend.item_codes[0]
+    return lambda: update_cart_allow_guest(item_code, 3)
+
+
+def bench_change_qty_full_cart(backend, iteration):
+    """Quantity change on a cart holding every benchmark item"""
+    from guest_checkout.guest_cart import update_cart_allow_guest, update_cart_items_allow_guest
+
+    _new_guest(backend)
+    update_cart_items_allow_guest([{"item_code": item_code, "qty": 2} for item_code in backend.item_codes])
+    item_code = backend.item_codes[0]
+    return lambda: update_cart_allow_guest(item_code, 3)
+
+
+def bench_rate_limit_check(backend, iteration):
+    """Admission check a cart update goes through before any document work"""
+    from guest_checkout.rate_limit import check_rate_limit
+
+    _new_guest(backend)
+    backend.frappe.form_dict.cmd = "guest_checkout.guest_cart.update_cart_allow_guest"
+    return check_rate_limit
+
+
+def bench_bulk_update_cart(backend, iteration):
+    from guest_checkout.guest_cart import update_cart_items_allow_guest
+
+    _new_guest(backend)
+    items = [{"item_code": item_code, "qty": 2} for item_code in backend.item_codes[:CART_SIZE]]
+    return lambda: update_cart_items_allow_guest(items)
+
+
+def bench_shopping_cart_menu(backend, iteration):
+    from guest_checkout.guest_cart import get_shopping_cart_menu
+
+    _fill_cart(backend)
+    return get_shopping_cart_menu
+
+
+def bench_cart_count(backend, iteration):
+    from guest_checkout.guest_cart import set_cart_count_allow_guest
+
+    _fill_cart(backend)
+    return set_cart_count_allow_guest
+
+
+def bench_cart_quotation(backend, iteration):
+    from guest_checkout.guest_cart import get_cart_quotation_allow_guest
+
+    _fill_cart(backend)
+    return get_cart_quotation_allow_guest
+
+
+def bench_cart_quotation_not_modified(backend, iteration):
+    from guest_checkout.guest_cart import get_cart_quotation_allow_guest
+
+    _fill_cart(backend)
+    version = get_cart_quotation_allow_guest()["version"]
+    return lambda: get_cart_quotation_allow_guest(if_none_match=version)
+
+
+def bench_checkout_bootstrap(backend, iteration):
+    from guest_checkout.checkout_bootstrap import get_checkout_bootstrap
+
+    _fill_cart(backend)
+    return get_checkout_bootstrap
+
+
+def bench_checkout_bootstrap_cached(backend, iteration):
+    from guest_checkout.checkout_bootstrap import get_checkout_bootstrap
+
+    _fill_cart(backend)
+    get_checkout_bootstrap()
+    return get_checkout_bootstrap
+
+
+def bench_complete_checkout(backend, iteration):
+    from guest_checkout.guest_cart import complete_guest_checkout
+
+    _fill_cart(backend, size=3)
+    guest_data = {
+        "mobile": f"+96550{iteration:06d}",
+        "email": f"bench{iteration}@example.com",
+        "full_name": f"Benchmark Guest {iteration}",
+    }
+    address_data = {
+        "address_line1": f"Block {iteration}, Street 1",
+        "city": "Salmiya",
+        "country": "Kuwait",
+        "pincode": "20000",
+    }
+    return lambda: complete_guest_checkout(guest_data, address_data, "Bookeey", "Salmiya", 2)
+
+
+def bench_check_cart_stock(backend, iteration):
+    """Pre-checkout stock check of a CART_SIZE cart, cold stock cache"""
+    from guest_checkout.stock_check import STOCK_CACHE_PREFIX, check_cart_stock
+
+    _fill_cart(backend)
+    for item_code in backend.item_codes[:CART_SIZE]:
+        backend.frappe.cache().delete_value(f"{STOCK_CACHE_PREFIX}:{item_code}")
+    return check_cart_stock
+
+
+def bench_guest_sales_order(backend, iteration):
+    from guest_checkout.guest_order import create_guest_sales_order
+
+    _new_guest(backend)
+    web_items = backend.frappe.get_all(
+        "Website Item", filters={"item_code": ("in", backend.item_codes)}, fields=["name", "item_code"]
+    )
+    cart_items = [{"item_code": row.name, "qty": 1, "rate": 1} for row in web_items]
+    guest_data = {
+        "phone": f"+96551{iteration:06d}",
+        "email": f"order{iteration}@example.com",
+        "full_name": f"Benchmark Buyer {iteration}",
+        "delivery_area": "Salmiya",
+    }
+    return lambda: create_guest_sales_order(guest_data, cart_items)
+
+
+def bench_reconcile_payments(backend, iteration):
+    """Gateway-confirmed payments for PAID_ORDERS submitted orders, posted in one run"""
+    from guest_checkout.payments import reconcile_payments, simulate_payment
+
+    for i in range(PAID_ORDERS):
+        sales_order = backend.frappe.get_doc({
+            "doctype": "Sales Order",
+            "customer": f"Benchmark Buyer {i}",
+            "company": "Benchmark Company",
+            "items": [{"item_code": backend.item_codes[i % len(backend.item_codes)], "qty": 1, "rate": 5}],
+        })
+        sales_order.insert(ignore_permissions=True)
+        sales_order.submit()
+        simulate_payment(sales_order.name, "Bookeey")
+
+    return reconcile_payments
+
+
+def bench_login_cart_merge(backend, iteration):
+    """Guest with a CART_SIZE cart logs in as a shopper whose open cart shares one line with it"""
+    from guest_checkout.cart_merge import merge_guest_cart, remember_guest_cart
+    from guest_checkout.guest_cart import update_cart_items_allow_guest
+
+    frappe = backend.frappe
+    email = f"shopper{iteration}@example.com"
+    customer = frappe.get_doc({"doctype": "Customer", "customer_name": f"Benchmark Shopper {iteration}"})
+    customer.insert(ignore_permissions=True, ignore_mandatory=True)
+    frappe.get_doc({"doctype": "Contact", "email_id": email, "customer": customer.name}).insert(ignore_permissions=True)
+
+    frappe.set_user(email)
+    update_cart_items_allow_guest([{"item_code": item_code, "qty": 1} for item_code in backend.item_codes[:3]])
+    _new_guest(backend)
+    update_cart_items_allow_guest([
+        {"item_code": item_code, "qty": 2} for item_code in backend.item_codes[2:2 + CART_SIZE]
+    ])
+
+    def login():
+        remember_guest_cart()
+        frappe.set_user(email)
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+        merge_guest_cart()
+
+    return login
+
+
+def bench_cleanup(backend, iteration):
+    from guest_checkout.guest_cart import cleanup_guest_quotations
+
+    _seed_abandoned_carts(backend)
+    return cleanup_guest_quotations
+
+
+# (name, setup, settings, writes) - setup prepares one iteration and returns the timed callable
+SCENARIOS = [
+    ("update_cart_allow_guest", bench_update_cart, {}, False),
+    ("update_cart_allow_guest[cached cart]", bench_update_cart, {"guest_cart_in_cache": 1}, False),
+    ("update_cart_allow_guest[qty change]", bench_change_qty, {}, False),
+    ("update_cart_allow_guest[coalesced]", bench_change_qty, {"coalesce_cart_updates": 1}, False),
+    ("update_cart_allow_guest[full cart]", bench_change_qty_full_cart, {}, False),
+    ("update_cart_allow_guest[full cart, large cart mode]", bench_change_qty_full_cart, {"large_cart_threshold": 10}, False),
+    ("update_cart_items_allow_guest", bench_bulk_update_cart, {}, False),
+    ("update_cart_items_allow_guest[cached cart]", bench_bulk_update_cart, {"guest_cart_in_cache": 1}, False),
+    ("check_rate_limit", bench_rate_limit_check, {"rate_limit_guest_endpoints": 1}, False),
+    ("get_shopping_cart_menu", bench_shopping_cart_menu, {}, False),
+    ("get_shopping_cart_menu[cached cart]", bench_shopping_cart_menu, {"guest_cart_in_cache": 1}, False),
+    ("set_cart_count_allow_guest", bench_cart_count, {}, False),
+    ("get_cart_quotation_allow_guest", bench_cart_quotation, {}, False),
+    ("get_cart_quotation_allow_guest[cached cart]", bench_cart_quotation, {"guest_cart_in_cache": 1}, False),
+    ("get_cart_quotation_allow_guest[not modified]", bench_cart_quotation_not_modified, {}, False),
+    ("get_checkout_bootstrap", bench_checkout_bootstrap, {}, False),
+    ("get_checkout_bootstrap[cached]", bench_checkout_bootstrap_cached, {}, False),
+    ("complete_guest_checkout", bench_complete_checkout, {}, True),
+    ("complete_guest_checkout[direct]", bench_complete_checkout, {"direct_sales_order_checkout": 1}, True),
+    ("complete_guest_checkout[deferred payment]", bench_complete_checkout, {"defer_payment_entries": 1}, True),
+    ("complete_guest_checkout[stock check]", bench_complete_checkout, {"check_stock_before_checkout": 1}, True),
+    ("check_cart_stock", bench_check_cart_stock, {"check_stock_before_checkout": 1}, False),
+    ("create_guest_sales_order", bench_guest_sales_order, {}, True),
+    ("reconcile_payments", bench_reconcile_payments, {}, True),
+    ("merge_guest_cart", bench_login_cart_merge, {}, True),
+    ("merge_guest_cart[cached cart]", bench_login_cart_merge, {"guest_cart_in_cache": 1}, True),
+    ("cleanup_guest_quotations", bench_cleanup, {}, True),
+]
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+
+def run_scenario(backend, setup, settings, iterations, warmup):
+    backend.reset()
+    for fieldname, value in settings.items():
+        backend.set_setting(fieldname, value)
+
+    timings = []
+    queries = []
+    for iteration in range(warmup + iterations):
+        fn = setup(backend, iteration)
+
+        before = backend.query_count()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        query_count = backend.query_count() - before
+
+        backend.finish_iteration()
+        if iteration >= warmup:
+            timings.append(elapsed)
+            queries.append(query_count)
+
+    for fieldname in settings:
+        backend.set_setting(fieldname, 0)
+
+    return summarize(timings, queries)
+
+
+def summarize(timings, queries):
+    ordered = sorted(timings)
+    return {
+        "iterations": len(timings),
+        "ops_per_sec": round(len(timings) / sum(timings), 1) if sum(timings) else 0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "db_calls": round(sum(queries) / len(queries), 1) if queries else 0,
+    }
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0
+    rank = max(1, -(-pct * len(ordered) // 100))
+    return ordered[int(rank) - 1]
+
+
+def compare(results, baseline, latency_tolerance=None):
+    """Return {scenario: [regression messages]} against the stored baseline
+
+    p50 is only compared when latency_tolerance is given - the fraction p50
+    may grow by before the scenario counts as regressed.
+    """
+    regressions = {}
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+
+        messages = []
+        if result["db_calls"] > expected["db_calls"]:
+            messages.append(f"db calls {expected['db_calls']} -> {result['db_calls']}")
+        if (
+            latency_tolerance is not None
+            and expected["p50_ms"]
+            and result["p50_ms"] > expected["p50_ms"] * (1 + latency_tolerance)
+        ):
+            messages.append(f"p50 {expected['p50_ms']}ms -> {result['p50_ms']}ms")
+        if messages:
+            regressions[name] = messages
+
+    return regressions
+
+
+def print_report(backend_name, results, baseline, regressions):
+    print(f"\nGuest cart benchmarks ({backend_name})\n")
+    header = f"{'scenario':<46}{'ops/sec':>10}{'p50 ms':>10}{'p99 ms':>10}{'db calls':>10}  baseline"
+    print(header)
+    print("-" * len(header))
+
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            note = "new"
+        elif name in regressions:
+            note = "REGRESSION: " + ", ".join(regressions[name])
+        else:
+            note = f"ok (p50 {expected['p50_ms']}ms, {expected['db_calls']} calls)"
+
+        print(
+            f"{name:<46}{result['ops_per_sec']:>10}{result['p50_ms']:>10}"
+            f"{result['p99_ms']:>10}{result['db_calls']:>10}  {note}"
+        )
+    print()
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the guest cart hot paths")
+    parser.add_argument("--site", help="Run against this bench site instead of the in-memory stand-in")
+    parser.add_argument("--sites-path", default=".", help="Path to the bench sites directory")
+    parser.add_argument("--item-code", action="append", dest="item_codes", help="Item to add to carts (site mode)")
+    parser.add_argument("--allow-writes", action="store_true", help="Run checkout and cleanup on the site")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--only", action="append", help="Run only scenarios starting with this name")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument(
+        "--latency-tolerance",
+        type=float,
+        help="Also fail when p50 grows by more than this fraction (baseline from this machine only)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.site:
+        backend = SiteBackend(args.site, args.sites_path, args.item_codes, args.allow_writes)
+    else:
+        backend = OfflineBackend()
+
+    results = {}
+    try:
+        for name, setup, settings, writes in SCENARIOS:
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            if writes and not backend.allow_writes:
+                print(f"Skipping {name} (needs --allow-writes)")
+                continue
+            iterations = max(1, args.iterations // 10) if name == "cleanup_guest_quotations" else args.iterations
+            results[name] = run_scenario(backend, setup, settings, iterations, args.warmup)
+    finally:
+        backend.close()
+
+    stored = load_baseline(args.baseline)
+    baseline = stored.get(backend.name, {})
+    regressions = compare(results, baseline, args.latency_tolerance)
+    print_report(backend.name, results, baseline, regressions)
+
+    if args.update_baseline:
+        stored[backend.name] = dict(baseline, **results)
+        with open(args.baseline, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline for {backend.name} written to {args.baseline}")
+        return 0
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,9 @@
 import frappe
 from frappe.utils import get_fullname
 from frappe.contacts.doctype.address.address import get_address_display
+from guest_checkout.customer_identity import resolve_customer
+from guest_checkout.guest_address import get_or_create_address
+from guest_checkout.instrumentation import stage
 
 @frappe.whitelist(allow_guest=True)
 def create_customer_and_link_cart(guest_details):
@@ -19,37 +22,20 @@ def create_customer_and_link_cart(guest_details):
     if not all([full_name, email, mobile_no]):
         frappe.throw("Full Name, Email, and Mobile Number are required.")
 
-    # 1. Find or Create Customer
-    customer = None
+    # 1. Find or Create Customer through the normalized identity key
+    customer, created = resolve_customer(
+        mobile_no,
+        email,
+        full_name,
+        customer_group=frappe.db.get_single_value("Webshop Settings", "default_customer_group"),
+        guest_checkout=False,
+    )
+
+    # Reuse the shopper's contact if one exists for this email
     contact = None
-    
-    # Try to find an existing contact by email
     contact_name = frappe.db.get_value("Contact", {"email_id": email})
     if contact_name:
         contact = frappe.get_doc("Contact", contact_name)
-        # Check if this contact is linked to a customer
-        for link in contact.links:
-            if link.link_doctype == "Customer":
-                customer = frappe.get_doc("Customer", link.link_name)
-                break
-
-    if not customer:
-        # If no customer linked to contact, or no contact found, try to find customer directly by email
-        customer_name = frappe.db.get_value("Customer", {"email_id": email}) # Assuming email_id custom field on customer
-        if customer_name:
-             customer = frappe.get_doc("Customer", customer_name)
-
-    if not customer:
-        # Create new Customer
-        customer = frappe.new_doc("Customer")
-        customer.customer_name = full_name
-        customer.customer_type = "Individual"
-        customer.email_id = email # Assuming email_id custom field exists on Customer
-        customer.mobile_no = mobile_no # Assuming mobile_no custom field exists on Customer
-        customer.customer_group = frappe.db.get_single_value("Webshop Settings", "default_customer_group")
-        customer.territory = frappe.utils.nestedset.get_root_of("Territory")
-        customer.flags.ignore_mandatory = True
-        customer.insert(ignore_permissions=True)
 
     if not contact:
         # Create new Contact or update existing one if found but not linked to customer
@@ -65,12 +51,8 @@ def create_customer_and_link_cart(guest_details):
         contact.save(ignore_permissions=True)
     
     # 2. Add/Update Addresses
-    for addr_data in address_list:
-        address = frappe.new_doc("Address")
-        address.update(addr_data)
-        address.add_link("Customer", customer.name)
-        address.flags.ignore_mandatory = True
-        address.insert(ignore_permissions=True)
+    for addr_data in address_list or []:
+        get_or_create_address(customer.name, addr_data, address_type=addr_data.get("address_type") or "Billing")
         
     # 3. Link Guest Cart to new/existing Customer
     from guest_checkout.guest_cart import _get_cart_quotation_for_guest_or_user, get_guest_id
@@ -96,10 +78,12 @@ def create_customer_and_link_cart(guest_details):
 
         # Re-apply cart settings to update pricing/taxes based on customer
         from webshop.webshop.shopping_cart.cart import apply_cart_settings
-        apply_cart_settings(customer, guest_quotation)
+        with stage("apply_cart_settings"):
+            apply_cart_settings(customer, guest_quotation)
         
         guest_quotation.flags.ignore_permissions = True
-        guest_quotation.save()
+        with stage("quotation.save"):
+            guest_quotation.save()
         
         # Clear guest_id from session as cart is now linked to a real customer
         if frappe.session.get("guest_id"):
@@ -117,9 +101,7 @@ def apply_delivery_charges_to_cart(delivery_area_name, quotation_name=None):
     if not delivery_area_name:
         frappe.throw("Delivery Area is required.")
 
-    delivery_area = frappe.get_doc("Delivery Area", delivery_area_name)
-    delivery_charge = delivery_area.delivery_charge
-
+    from guest_checkout.delivery import apply_delivery_charge
     from guest_checkout.guest_cart import _get_cart_quotation_for_guest_or_user
 
     quotation = None
@@ -131,36 +113,13 @@ def apply_delivery_charges_to_cart(delivery_area_name, quotation_name=None):
     if not quotation:
         frappe.throw("Could not find an active shopping cart.")
 
-    # Remove any existing delivery charges
-    quotation.set("taxes_and_charges", []) # Clear existing
-    
-    # Add Delivery Charges as a Freight and Charges row
-    # This assumes 'Freight and Charges' doctype and setup
-    # Or, if preferred, can add a custom item to the quotation items directly.
-    
-    # Check if delivery_charges_account is set in Webshop Settings
-    webshop_settings = frappe.get_cached_doc("Webshop Settings")
-    delivery_charges_account = webshop_settings.delivery_charges_account
-
-    if not delivery_charges_account:
-        frappe.throw("Delivery Charges Account not set in Webshop Settings. Please configure it.")
-
-    # Create a new row in Taxes and Charges for delivery
-    quotation.append(
-        "taxes_and_charges",
-        {
-            "charge_type": "Actual",
-            "account_head": delivery_charges_account,
-            "description": f"Delivery Charges - {delivery_area_name}",
-            "amount": delivery_charge,
-            "add_deduct_tax": "Add",
-            "included_in_print_rate": 0,
-            "tax_amount": 0 # Assuming delivery charge is not taxable here, adjust if needed
-        }
-    )
+    # Replaces any earlier delivery charge with the one resolved from the area's rules
+    apply_delivery_charge(quotation, delivery_area_name)
     
-    quotation.run_method("calculate_taxes_and_totals")
+    with stage("calculate_taxes_and_totals"):
+        quotation.run_method("calculate_taxes_and_totals")
     quotation.flags.ignore_permissions = True
-    quotation.save()
+    with stage("quotation.save"):
+        quotation.save()
     
     return quotation.name
\ No newline at end of file
@@ -0,0 +1,146 @@
+# guest_checkout/guest_checkout/cart_coalescer.py
+import pickle
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+
+# Quantity changes to lines already in a saved cart are buffered in one hash
+# per Quotation (item_code -> {qty, additional_notes, warehouse}) and saved
+# together by the first of:
+# - the cart page, the checkout bootstrap or checkout loading the cart, or an
+#   add or removal on it - every path that reads totals saves them first;
+# - flush_idle_carts, which runs every minute and takes carts quiet for
+#   QUIET_WINDOW seconds. A cart nobody reads can therefore hold changes only
+#   in Redis for up to QUIET_WINDOW plus one scheduler tick (about 65s).
+PENDING_CART_PREFIX = "guest_checkout:pending_cart"
+PENDING_CARTS_KEY = "guest_checkout:pending_carts"
+PENDING_EXPIRY = 24 * 60 * 60
+QUIET_WINDOW = 5
+
+
+def is_enabled():
+    """Check if cart quantity updates should be buffered and saved together"""
+    return bool(cint(frappe.get_cached_doc("Webshop Settings").get("coalesce_cart_updates")))
+
+
+def can_buffer(quotation, changes):
+    """Only qty changes to lines of a saved cart can wait; adds and removals reprice the cart"""
+    if not quotation or quotation.is_new():
+        return False
+
+    item_codes = {item.item_code for item in quotation.get("items")}
+    return all(change.qty > 0 and change.item_code in item_codes for change in changes)
+
+
+def buffer_changes(quotation_name, changes):
+    """Record changes for a cart; later changes to the same line replace earlier ones"""
+    cache = frappe.cache()
+    key = _get_pending_key(quotation_name)
+
+    for change in changes:
+        cache.hset(key, change.item_code, {
+            "qty": change.qty,
+            "additional_notes": change.additional_notes,
+            "warehouse": change.warehouse,
+        })
+    cache.expire(cache.make_key(key), PENDING_EXPIRY)
+    cache.hset(PENDING_CARTS_KEY, quotation_name, time.time())
+
+
+def get_pending(quotation_name):
+    """Return the buffered {item_code: change} of a cart"""
+    pending = frappe.cache().hgetall(_get_pending_key(quotation_name))
+    return {frappe.safe_decode(item_code): change for item_code, change in pending.items()}
+
+
+def overlay_pending(quotation):
+    """Show buffered quantities on a loaded cart without saving it
+
+    Line amounts use the saved rate and the totals are shifted by the
+    difference, which is what the save will produce for a qty-only change.
+    """
+    pending = get_pending(quotation.name)
+    if not pending:
+        return quotation
+
+    for item in quotation.get("items"):
+        change = pending.get(item.item_code)
+        if not change:
+            continue
+
+        delta_qty = flt(change["qty"]) - flt(item.qty)
+        delta_amount = flt(item.rate) * delta_qty
+
+        item.qty = change["qty"]
+        item.additional_notes = change["additional_notes"]
+        item.warehouse = change["warehouse"]
+        item.amount = flt(item.amount) + delta_amount
+
+        quotation.total_qty = flt(quotation.total_qty) + delta_qty
+        for field in ("total", "net_total", "grand_total", "rounded_total"):
+            quotation.set(field, flt(quotation.get(field)) + delta_amount)
+
+    return quotation
+
+
+def pop_pending(quotation_name):
+    """Take the buffered changes of a cart, leaving nothing behind for a concurrent flush"""
+    cache = frappe.cache()
+    cache.hdel(PENDING_CARTS_KEY, quotation_name)
+
+    key = cache.make_key(_get_pending_key(quotation_name))
+    pipe = cache.pipeline()
+    pipe.hgetall(key)
+    pipe.delete(key)
+    raw, _deleted = pipe.execute()
+
+    return [
+        frappe._dict(pickle.loads(value), item_code=frappe.safe_decode(item_code))
+        for item_code, value in raw.items()
+    ]
+
+
+def flush_idle_carts():
+    """Save carts whose buffered changes have been quiet for QUIET_WINDOW (scheduled every minute)"""
+    from guest_checkout.guest_cart import _flush_pending_cart_changes
+
+    cutoff = time.time() - QUIET_WINDOW
+    pending_carts = frappe.cache().hgetall(PENDING_CARTS_KEY)
+
+    for quotation_name, buffered_at in pending_carts.items():
+        if flt(buffered_at) > cutoff:
+            continue
+
+        quotation_name = frappe.safe_decode(quotation_name)
+
+        try:
+            quotation = frappe.get_doc("Quotation", quotation_name)
+            if quotation.docstatus != 0 or quotation.order_type != "Shopping Cart":
+                pop_pending(quotation_name)
+                continue
+
+            _flush_pending_cart_changes(quotation, _get_cart_party(quotation))
+            frappe.db.commit()
+        except frappe.DoesNotExistError:
+            pop_pending(quotation_name)
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), "Guest Cart Flush Error")
+
+
+def _get_cart_party(quotation):
+    """Party for apply_cart_settings outside the shopper's request"""
+    if quotation.party_name:
+        return frappe.get_doc("Customer", quotation.party_name)
+
+    return frappe._dict({
+        "doctype": "Customer",
+        "name": f"TMP-{quotation.name}",
+        "is_guest": True
+    })
+
+
+def _get_pending_key(quotation_name):
+    return f"{PENDING_CART_PREFIX}:{quotation_name}"
@@ -0,0 +1,189 @@
+# guest_checkout/guest_checkout/cart_merge.py
+import frappe
+from frappe.utils import cstr, flt
+from guest_checkout import cart_coalescer, cart_summary, guest_cart_store
+
+
+# A guest who logs in keeps their cart. Login replaces the guest session, so
+# on_login notes where the guest cart lives (cached cart or draft Quotation)
+# and on_session_creation, running as the user, merges it into the user's
+# open cart: quantities are summed, the newer cart's notes win and the cart
+# is recalculated and saved once. A user without an open cart takes over the
+# guest draft. Either way the guest cart is gone afterwards.
+MERGE_SAVEPOINT = "guest_cart_merge"
+
+
+def remember_guest_cart(login_manager=None):
+    """on_login hook - note the guest cart before the guest session is replaced"""
+    guest_id = frappe.session.get("guest_id")
+    if not guest_id and getattr(frappe, "request", None):
+        guest_id = frappe.request.cookies.get("guest_id")
+
+    frappe.local.guest_checkout_login_cart = frappe._dict({
+        "guest_id": guest_id,
+        "quotation_name": frappe.session.get("guest_quotation_name"),
+    })
+
+
+def merge_guest_cart(login_manager=None):
+    """on_session_creation hook - move the noted guest cart into the user's cart
+
+    A failed merge is logged and leaves both carts as they were; it never
+    blocks the login.
+    """
+    guest_cart = getattr(frappe.local, "guest_checkout_login_cart", None)
+    frappe.local.guest_checkout_login_cart = None
+    if not guest_cart or not (guest_cart.guest_id or guest_cart.quotation_name):
+        return
+
+    frappe.db.savepoint(MERGE_SAVEPOINT)
+    try:
+        return merge_carts(guest_cart.guest_id, guest_cart.quotation_name)
+    except Exception:
+        frappe.db.rollback(save_point=MERGE_SAVEPOINT)
+        frappe.log_error(frappe.get_traceback(), "Guest Cart Merge Error")
+
+
+def merge_carts(guest_id=None, quotation_name=None, user=None):
+    """Merge a guest's cart into the user's open Shopping Cart Quotation
+
+    Returns:
+        Quotation: the user's cart after the merge, or None if there was nothing to merge
+    """
+    from guest_checkout.guest_cart import (
+        _new_cart_quotation,
+        _save_cart_changes,
+        get_guest_party,
+        set_cart_count_allow_guest,
+    )
+
+    user = user or frappe.session.user
+    guest_quotation = _get_guest_quotation(quotation_name)
+    guest_pending = _take_pending(guest_quotation)
+    lines, guest_modified = _get_guest_lines(guest_id, guest_quotation)
+
+    if not lines:
+        _drop_guest_cart(guest_id, guest_quotation)
+        return None
+
+    # Users without a Customer (desk users) have no webshop cart to merge into
+    party = get_guest_party(user)
+    if not party:
+        return None
+
+    quotation_name = frappe.db.get_value(
+        "Quotation",
+        filters={"party_name": party.name, "order_type": "Shopping Cart", "docstatus": 0},
+        order_by="modified desc",
+    )
+    if quotation_name:
+        quotation = frappe.get_doc("Quotation", quotation_name)
+        changes = _get_merged_changes(quotation, lines, guest_modified, _take_pending(quotation))
+    elif guest_quotation:
+        # The guest draft becomes the user's cart instead of inserting a new one
+        quotation, guest_quotation = guest_quotation, None
+        _set_cart_owner(quotation, party, user)
+        changes = guest_pending
+    else:
+        quotation = _new_cart_quotation(party)
+        _set_cart_owner(quotation, party, user)
+        quotation.run_method("set_missing_values")
+        changes = _get_merged_changes(quotation, lines, guest_modified)
+
+    quotation = _save_cart_changes(quotation, party, changes)
+    _drop_guest_cart(guest_id, guest_quotation)
+
+    cart_summary.set_summary(quotation, f"user:{user}")
+    set_cart_count_allow_guest(quotation)
+    return quotation
+
+
+def _get_guest_quotation(quotation_name):
+    """The guest's draft cart Quotation, if it is still an open party-less cart"""
+    if not quotation_name or not frappe.db.exists("Quotation", quotation_name):
+        return None
+
+    quotation = frappe.get_doc("Quotation", quotation_name)
+    if quotation.docstatus != 0 or quotation.order_type != "Shopping Cart" or quotation.party_name:
+        return None
+
+    return quotation
+
+
+def _take_pending(quotation=None):
+    """Show a cart's buffered quantity changes on it and take them, so they are saved with the merge"""
+    if not quotation or not cart_coalescer.is_enabled():
+        return []
+
+    cart_coalescer.overlay_pending(quotation)
+    return cart_coalescer.pop_pending(quotation.name)
+
+
+def _get_guest_lines(guest_id, guest_quotation=None):
+    """item_code -> {qty, additional_notes, warehouse} of the guest cart, and when it last changed"""
+    if guest_quotation:
+        items, modified = guest_quotation.get("items"), guest_quotation.modified
+    else:
+        cart = guest_cart_store.get_cart(guest_id)
+        items, modified = cart["items"], cart["modified"]
+
+    lines = {}
+    for item in items:
+        line = lines.setdefault(item.item_code, frappe._dict({
+            "qty": 0,
+            "additional_notes": item.additional_notes,
+            "warehouse": item.warehouse,
+        }))
+        line.qty += flt(item.qty)
+
+    return {item_code: line for item_code, line in lines.items() if line.qty > 0}, modified
+
+
+def _set_cart_owner(quotation, party, user):
+    quotation.party_name = party.name
+    quotation.customer_name = party.get("customer_name")
+    quotation.contact_email = user
+    quotation.contact_person = frappe.db.get_value("Contact", {"email_id": user})
+
+
+def _get_merged_changes(quotation, lines, guest_modified, pending=None):
+    """Cart changes that add the guest lines to the user's cart
+
+    Quantities of lines in both carts are summed and the notes of the cart
+    changed last win. Buffered changes of the user's cart are kept.
+    """
+    guest_is_newer = cstr(guest_modified) > cstr(quotation.modified)
+    changes = {change.item_code: change for change in pending or []}
+
+    rows = {}
+    for row in quotation.get("items"):
+        rows.setdefault(row.item_code, row)
+
+    for item_code, line in lines.items():
+        row = rows.get(item_code)
+        if not row:
+            changes[item_code] = frappe._dict(line, item_code=item_code)
+            continue
+
+        change = changes.setdefault(item_code, frappe._dict({
+            "item_code": item_code,
+            "additional_notes": row.additional_notes,
+            "warehouse": row.warehouse,
+        }))
+        change.qty = flt(row.qty) + line.qty
+        if line.additional_notes and (guest_is_newer or not change.additional_notes):
+            change.additional_notes = line.additional_notes
+        change.warehouse = change.warehouse or line.warehouse
+
+    return list(changes.values())
+
+
+def _drop_guest_cart(guest_id, guest_quotation=None):
+    """Delete what is left of the guest cart once the user's cart holds it"""
+    if guest_quotation:
+        guest_quotation.flags.ignore_permissions = True
+        guest_quotation.delete()
+
+    if guest_id:
+        guest_cart_store.delete_cart(guest_id)
+        cart_summary.clear_summary(f"guest:{guest_id}")
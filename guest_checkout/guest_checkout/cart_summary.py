@@ -0,0 +1,96 @@
+# guest_checkout/guest_checkout/cart_summary.py
+import frappe
+from frappe.utils import cint, flt, now
+
+
+# Count, total and last-modified of each shopper's cart, kept in cache so the
+# cart_count cookie and navbar badge never load (or insert) a Quotation.
+# Written wherever guest_cart saves or deletes a cart; "modified" is stamped
+# on every write, so it also versions what the shopper sees (buffered
+# quantity changes included).
+CART_SUMMARY_PREFIX = "guest_checkout:cart_summary"
+CART_SUMMARY_EXPIRY = 7 * 24 * 60 * 60
+
+
+def get_cart_owner():
+    """Summary owner of the current session: guest:<guest_id> or user:<user>
+
+    A guest without a guest_id has no cart yet, so there is no owner.
+    """
+    if frappe.session.user == "Guest":
+        guest_id = frappe.session.get("guest_id")
+        return f"guest:{guest_id}" if guest_id else None
+
+    return f"user:{frappe.session.user}"
+
+
+def make_summary(quotation=None):
+    """Summary of a cart Quotation (or a row with its name, total_qty, grand_total
+    and address names)
+
+    None or a cart without quantity is an empty cart.
+    """
+    if not quotation or not flt(quotation.get("total_qty")):
+        return frappe._dict({"quotation": None, "count": 0, "total": 0, "modified": now()})
+
+    return frappe._dict({
+        "quotation": quotation.name,
+        "count": cint(quotation.get("total_qty")),
+        "total": flt(quotation.get("grand_total")),
+        "customer_address": quotation.get("customer_address"),
+        "shipping_address_name": quotation.get("shipping_address_name"),
+        "modified": now(),
+    })
+
+
+def get_summary(owner=None):
+    """Return the cached summary of the owner's cart, or None if it isn't cached"""
+    owner = owner or get_cart_owner()
+    if not owner:
+        return None
+
+    summary = frappe.cache().get_value(_get_summary_key(owner))
+    return frappe._dict(summary) if summary else None
+
+
+def set_summary(quotation=None, owner=None):
+    """Cache the summary of the owner's cart after it was saved or deleted"""
+    owner = owner or get_cart_owner()
+    summary = make_summary(quotation)
+    if owner:
+        frappe.cache().set_value(_get_summary_key(owner), dict(summary), expires_in_sec=CART_SUMMARY_EXPIRY)
+
+    return summary
+
+
+def clear_summary(owner=None):
+    owner = owner or get_cart_owner()
+    if owner:
+        frappe.cache().delete_value(_get_summary_key(owner))
+
+
+def update_quotation_summary(doc, method=None):
+    """Quotation hook - refresh the summary when the shopper's own request saves their cart
+
+    Saves from workers or desk belong to another session and are skipped.
+    """
+    if doc.order_type != "Shopping Cart" or doc.docstatus != 0:
+        return
+
+    if frappe.session.user == "Guest":
+        is_own_cart = doc.name == frappe.session.get("guest_quotation_name")
+    else:
+        is_own_cart = doc.contact_email == frappe.session.user
+
+    if is_own_cart:
+        set_summary(doc)
+
+
+def clear_quotation_summary(doc, method=None):
+    """Quotation hook - drop a user's summary when their cart is ordered or deleted outside guest_cart"""
+    if doc.order_type == "Shopping Cart" and doc.contact_email:
+        clear_summary(f"user:{doc.contact_email}")
+
+
+def _get_summary_key(owner):
+    return f"{CART_SUMMARY_PREFIX}:{owner}"
@@ -0,0 +1,166 @@
+# guest_checkout/guest_checkout/catalog_index.py
+import pickle
+from collections import OrderedDict
+
+import frappe
+from frappe.utils import cint
+
+
+# Website Item -> Item resolution (item_code, warehouse, image, enabled) for
+# cart and order lines. Entries are indexed by both the Website Item name and
+# its item_code, in a shared cache hash and a process-local LRU in front of
+# it. Catalog changes bump the version stamp, which retires both layers.
+CATALOG_INDEX_KEY = "guest_checkout:catalog_index"
+CATALOG_INDEX_VERSION_KEY = "guest_checkout:catalog_index_version"
+CATALOG_INDEX_EXPIRY = 24 * 60 * 60
+LOCAL_INDEX_SIZE = 4096
+
+# Process-local LRU per site as a (version, OrderedDict keyed by code) pair.
+# A version change replaces that site's pair; other sites keep theirs.
+_local_indexes = {}
+
+
+def resolve_website_items(codes):
+    """Resolve Website Item names or item codes to their catalog entry
+
+    A whole cart costs at most one query, however many lines it has.
+    Codes without a Website Item resolve to themselves as the item_code.
+
+    Returns:
+        dict: code -> {website_item, item_code, warehouse, image, enabled}
+    """
+    codes = list(dict.fromkeys(code for code in codes if code))
+    if not codes:
+        return {}
+
+    local_index = _get_local_index()
+    entries = {}
+    missing = []
+    for code in codes:
+        entry = local_index.get(code)
+        if entry is None:
+            missing.append(code)
+            continue
+
+        entries[code] = entry
+        try:
+            local_index.move_to_end(code)
+        except KeyError:
+            # Evicted by another thread since the read
+            pass
+
+    if missing:
+        cache = frappe.cache()
+        cache_key = cache.make_key(_get_cache_key())
+
+        # One round trip for the shared layer
+        pipe = cache.pipeline()
+        for code in missing:
+            pipe.hget(cache_key, code)
+        for code, cached in zip(list(missing), pipe.execute()):
+            if cached:
+                entries[code] = frappe._dict(pickle.loads(cached))
+                missing.remove(code)
+
+        if missing:
+            fetched = _fetch_entries(missing)
+            pipe = cache.pipeline()
+            for code in missing:
+                entry = fetched.get(code) or _unknown_entry(code)
+                pipe.hset(cache_key, code, pickle.dumps(entry))
+                entries[code] = frappe._dict(entry)
+            pipe.expire(cache_key, CATALOG_INDEX_EXPIRY)
+            pipe.execute()
+
+        for code in codes:
+            local_index[code] = entries[code]
+        while len(local_index) > LOCAL_INDEX_SIZE:
+            try:
+                local_index.popitem(last=False)
+            except KeyError:
+                break
+
+    return entries
+
+
+def resolve_website_item(code):
+    """Resolve a single Website Item name or item code"""
+    return resolve_website_items([code]).get(code) or frappe._dict(_unknown_entry(code))
+
+
+def clear_catalog_index(doc=None, method=None):
+    """Invalidate resolved entries everywhere when an Item or Website Item changes
+
+    Bumped now for this transaction and again after it commits, so entries
+    another request cached from the old rows in between are retired too.
+    """
+    _bump_version()
+    frappe.db.after_commit.add(_bump_version)
+
+
+def _bump_version():
+    frappe.cache().set_value(CATALOG_INDEX_VERSION_KEY, frappe.generate_hash(length=10))
+
+
+def _get_version():
+    version = frappe.cache().get_value(CATALOG_INDEX_VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=10)
+        frappe.cache().set_value(CATALOG_INDEX_VERSION_KEY, version)
+    return version
+
+
+def _get_cache_key():
+    return f"{CATALOG_INDEX_KEY}:{_get_version()}"
+
+
+def _get_local_index():
+    """This site's LRU for the current version, started afresh when the version moves"""
+    version = _get_version()
+    cached_version, local_index = _local_indexes.get(frappe.local.site, (None, None))
+
+    if cached_version != version:
+        local_index = OrderedDict()
+        _local_indexes[frappe.local.site] = (version, local_index)
+
+    return local_index
+
+
+def _fetch_entries(codes):
+    """One query for all codes, matched on Website Item name or item_code"""
+    web_item = frappe.qb.DocType("Website Item")
+    item = frappe.qb.DocType("Item")
+
+    rows = (
+        frappe.qb.from_(web_item)
+        .left_join(item).on(item.name == web_item.item_code)
+        .select(
+            web_item.name.as_("website_item"),
+            web_item.item_code,
+            web_item.website_warehouse,
+            web_item.website_image,
+            web_item.published,
+            item.image,
+            item.disabled,
+        )
+        .where(web_item.name.isin(codes) | web_item.item_code.isin(codes))
+    ).run(as_dict=True)
+
+    entries = {}
+    for row in rows:
+        entry = {
+            "website_item": row.website_item,
+            "item_code": row.item_code,
+            "warehouse": row.website_warehouse,
+            "image": row.website_image or row.image,
+            "enabled": bool(cint(row.published) and not cint(row.disabled)),
+        }
+        entries.setdefault(row.item_code, entry)
+        # A Website Item name wins over another item's item_code
+        entries[row.website_item] = entry
+
+    return entries
+
+
+def _unknown_entry(code):
+    return {"website_item": None, "item_code": code, "warehouse": None, "image": None, "enabled": False}
@@ -0,0 +1,95 @@
+# guest_checkout/guest_checkout/checkout_bootstrap.py
+import hashlib
+
+import frappe
+from frappe.utils import cint
+from guest_checkout.delivery import get_delivery_area_catalog, get_delivery_area_version
+from guest_checkout.instrumentation import stage
+from guest_checkout.payments import get_gateway_accounts
+
+
+# Everything the checkout modal needs in one response, cached per version
+# (cart version + delivery area catalog version) so reopening the modal on an
+# unchanged cart costs cache reads only
+BOOTSTRAP_CACHE_PREFIX = "guest_checkout:checkout_bootstrap"
+BOOTSTRAP_EXPIRY = 10 * 60
+
+# Offered besides the configured payment gateways
+OFFLINE_PAYMENT_METHODS = ("Cash on Delivery",)
+
+# Webshop Settings the checkout scripts read
+SETTINGS_FIELDS = ("enabled", "company", "price_list", "show_price", "show_stock_availability")
+
+
+@frappe.whitelist(allow_guest=True)
+def get_checkout_bootstrap(if_none_match=None):
+    """Cart summary and lines, delivery areas, payment methods and settings for the checkout modal
+
+    Pass the version of the previous response as if_none_match to get
+    {"not_modified": True} back when none of it changed.
+    """
+    version = get_bootstrap_version()
+    if if_none_match and if_none_match == version:
+        return {"not_modified": True, "version": version}
+
+    cache_key = f"{BOOTSTRAP_CACHE_PREFIX}:{version}"
+    bootstrap = frappe.cache().get_value(cache_key)
+    if not bootstrap:
+        with stage("build_checkout_bootstrap"):
+            bootstrap = _build_bootstrap()
+        # Loading the cart may have saved buffered changes, which moves the version
+        version = get_bootstrap_version()
+        bootstrap["version"] = version
+        frappe.cache().set_value(f"{BOOTSTRAP_CACHE_PREFIX}:{version}", bootstrap, expires_in_sec=BOOTSTRAP_EXPIRY)
+
+    return bootstrap
+
+
+def get_bootstrap_version():
+    from guest_checkout.guest_cart import get_cart_version
+
+    key = f"{get_cart_version()}|{get_delivery_area_version()}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def _build_bootstrap():
+    from guest_checkout.guest_cart import (
+        _flush_pending_cart_changes,
+        _get_cart_quotation_for_guest_or_user,
+        get_guest_party,
+        get_shopping_cart_menu
+    )
+
+    party = get_guest_party()
+    quotation = _get_cart_quotation_for_guest_or_user(party)
+    quotation = _flush_pending_cart_changes(quotation, party)
+    menu = get_shopping_cart_menu(quotation)
+
+    return {
+        "cart": {
+            "quotation": quotation.name if quotation and not quotation.is_new() else None,
+            "count": menu["cart_count"],
+            "total": menu["total"],
+            "net_total": quotation.net_total if quotation else 0,
+            "currency": quotation.currency if quotation else None,
+        },
+        "items": menu["cart_items"],
+        "delivery_areas": get_delivery_area_catalog(),
+        "payment_methods": get_payment_methods(),
+        "settings": _get_checkout_settings(),
+    }
+
+
+def get_payment_methods():
+    """Payment gateways with an account, followed by the offline methods"""
+    methods = list(get_gateway_accounts())
+    return methods + [method for method in OFFLINE_PAYMENT_METHODS if method not in methods]
+
+
+def _get_checkout_settings():
+    settings = frappe.get_cached_doc("Webshop Settings")
+    checkout_settings = {field: settings.get(field) for field in SETTINGS_FIELDS}
+    checkout_settings["enabled"] = cint(checkout_settings["enabled"])
+    if settings.price_list:
+        checkout_settings["currency"] = frappe.get_cached_value("Price List", settings.price_list, "currency")
+    return checkout_settings
@@ -0,0 +1,148 @@
+# guest_checkout/guest_checkout/checkout_jobs.py
+import frappe
+from frappe import _
+from frappe.utils import cint
+from guest_checkout.instrumentation import profile
+
+
+# Job status is kept in cache so polling never touches the database
+CHECKOUT_JOB_CACHE_PREFIX = "guest_checkout:checkout_job"
+CHECKOUT_JOB_EXPIRY = 24 * 60 * 60
+
+
+def is_enabled():
+    """Check if guest checkout should run in a background worker"""
+    return bool(cint(frappe.get_cached_doc("Webshop Settings").get("queue_guest_checkout")))
+
+
+def enqueue_checkout(quotation, guest_data, address_data, payment_method="Bookeey", delivery_area=None, delivery_charge=0):
+    """Reserve the cart and queue the Quotation -> Sales Order -> Payment Entry chain
+
+    Saved carts are passed by name; cached guest carts (unsaved Quotation)
+    are passed as a snapshot of their lines so later cart changes in the
+    same session can't leak into the order.
+
+    Returns:
+        str: job id to poll with get_checkout_job_status
+    """
+    job_id = frappe.generate_hash(length=20)
+
+    cart = None
+    if quotation.is_new():
+        cart = {
+            "items": [
+                {
+                    "item_code": item.item_code,
+                    "item_name": item.item_name,
+                    "qty": item.qty,
+                    "rate": item.rate,
+                    "amount": item.amount,
+                    "additional_notes": item.get("additional_notes"),
+                    "warehouse": item.warehouse,
+                }
+                for item in quotation.items
+            ]
+        }
+
+    set_job_status(job_id, "queued")
+
+    frappe.enqueue(
+        "guest_checkout.checkout_jobs.process_checkout_job",
+        queue="short",
+        timeout=300,
+        enqueue_after_commit=True,
+        checkout_job_id=job_id,
+        guest_id=frappe.session.get("guest_id"),
+        quotation_name=None if cart else quotation.name,
+        cart=cart,
+        guest_data=guest_data,
+        address_data=address_data,
+        payment_method=payment_method,
+        delivery_area=delivery_area,
+        delivery_charge=delivery_charge,
+    )
+
+    return job_id
+
+
+def process_checkout_job(checkout_job_id, guest_id, quotation_name, cart, guest_data, address_data, payment_method="Bookeey", delivery_area=None, delivery_charge=0):
+    """Background worker for queued guest checkouts
+
+    The whole chain is committed or rolled back as one unit so a failure
+    never leaves a submitted Quotation without its Sales Order. If the
+    checkout fails, a reserved cached cart is saved back under the guest's
+    id and the cart references are kept on the job, so the guest's next
+    status poll puts the cart back in their session.
+    """
+    from guest_checkout import guest_cart_store
+    from guest_checkout.guest_cart import _make_guest_cart_quotation, _process_guest_checkout
+
+    set_job_status(checkout_job_id, "running")
+    # Steps that normally commit on their own (new customers) wait for the job's commit
+    frappe.flags.in_checkout_job = True
+
+    try:
+        with profile("guest_checkout.checkout_jobs.process_checkout_job"):
+            if quotation_name:
+                quotation = frappe.get_doc("Quotation", quotation_name)
+            else:
+                guest_party = frappe._dict({"doctype": "Customer", "name": f"TMP-{checkout_job_id}", "is_guest": True})
+                cart_snapshot = frappe._dict({"items": [frappe._dict(item) for item in cart["items"]]})
+                quotation = _make_guest_cart_quotation(guest_party, cart_snapshot)
+
+            result = _process_guest_checkout(
+                quotation, guest_data, address_data, payment_method, delivery_area, delivery_charge
+            )
+            frappe.db.commit()
+
+        set_job_status(checkout_job_id, "completed", result=result)
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), "Guest Checkout Job Error")
+        if cart and guest_id and not guest_cart_store.get_cart(guest_id)["items"]:
+            guest_cart_store.save_cart(guest_id, cart)
+        set_job_status(
+            checkout_job_id,
+            "failed",
+            message=_("Checkout failed: {0}").format(str(e)),
+            cart_refs={"guest_id": guest_id, "quotation_name": quotation_name},
+        )
+
+    finally:
+        frappe.flags.in_checkout_job = False
+
+
+@frappe.whitelist(allow_guest=True)
+def get_checkout_job_status(job_id):
+    """Return the status of a queued checkout (queued, running, completed or failed)"""
+    job = frappe.cache().get_value(_get_job_key(job_id)) if job_id else None
+    if not job:
+        return {"status": "not_found", "message": _("Checkout job not found")}
+
+    cart_refs = job.pop("cart_refs", None)
+    if job["status"] == "failed" and cart_refs:
+        # The cart left the session when the checkout was queued; hand it back once
+        from guest_checkout.guest_cart import _restore_guest_checkout_session
+
+        _restore_guest_checkout_session(cart_refs.get("guest_id"), cart_refs.get("quotation_name"))
+        set_job_status(job_id, "failed", message=job["message"])
+
+    return job
+
+
+def set_job_status(job_id, status, result=None, message=None, cart_refs=None):
+    """Record the current state of a checkout job
+
+    cart_refs ({guest_id, quotation_name}) of a failed job are restored to
+    the guest's session by the next status poll.
+    """
+    job = {"job_id": job_id, "status": status, "result": result, "message": message}
+    if cart_refs:
+        job["cart_refs"] = cart_refs
+
+    frappe.cache().set_value(_get_job_key(job_id), job, expires_in_sec=CHECKOUT_JOB_EXPIRY)
+
+
+def _get_job_key(job_id):
+    return f"{CHECKOUT_JOB_CACHE_PREFIX}:{job_id}"
@@ -0,0 +1,230 @@
+# guest_checkout/guest_checkout/cleanup.py
+import time
+
+import frappe
+from frappe.utils import add_days, cint, nowdate
+from guest_checkout.customer_identity import clear_identity_cache
+
+
+# Progress is checkpointed here after every chunk so an interrupted run
+# picks up after the last committed row instead of starting over
+CLEANUP_STATE_CACHE_KEY = "guest_checkout:cleanup_state"
+CLEANUP_SUMMARY_CACHE_KEY = "guest_checkout:cleanup_summary"
+
+DEFAULT_RETENTION_DAYS = 7
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_MAX_RUNTIME = 20 * 60
+
+PHASES = ("quotations", "customers")
+
+
+def run_cleanup(retention_days=DEFAULT_RETENTION_DAYS, chunk_size=DEFAULT_CHUNK_SIZE, max_runtime=DEFAULT_MAX_RUNTIME):
+    """Delete abandoned guest cart Quotations and guest Customers without orders
+
+    Rows are selected with joins and deleted in bounded chunks (child tables
+    first, then parents) with a commit per chunk. When max_runtime is hit
+    the run stops and the next run resumes from the saved checkpoint.
+
+    Returns:
+        dict: per-run summary with deleted row counts and rows/sec
+    """
+    chunk_size = cint(chunk_size) or DEFAULT_CHUNK_SIZE
+    started = time.monotonic()
+
+    state = _get_state(add_days(nowdate(), -cint(retention_days)))
+    summary = frappe._dict({
+        "cutoff": state.cutoff,
+        "resumed": bool(state.last_name or state.phase != PHASES[0]),
+        "quotations": 0,
+        "customers": 0,
+        "child_rows": 0,
+        "chunks": 0,
+        "failed_chunks": 0,
+        "completed": False,
+    })
+
+    while state.phase:
+        if time.monotonic() - started > max_runtime:
+            break
+
+        names = _get_next_chunk(state.phase, state.cutoff, state.last_name, chunk_size)
+        if not names:
+            state.phase = _get_next_phase(state.phase)
+            state.last_name = ""
+            _save_state(state)
+            continue
+
+        doctype = "Quotation" if state.phase == "quotations" else "Customer"
+        try:
+            summary.child_rows += _delete_chunk(doctype, names)
+            summary[state.phase] += len(names)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            summary.failed_chunks += 1
+            frappe.log_error(frappe.get_traceback(), f"Guest {doctype} Cleanup")
+
+        summary.chunks += 1
+        state.last_name = names[-1]
+        _save_state(state)
+
+    summary.completed = not state.phase
+    if summary.completed:
+        frappe.cache().delete_value(CLEANUP_STATE_CACHE_KEY)
+
+    elapsed = time.monotonic() - started
+    deleted_rows = summary.quotations + summary.customers + summary.child_rows
+    summary.elapsed = round(elapsed, 3)
+    summary.rows_per_sec = round(deleted_rows / elapsed, 1) if elapsed else 0
+
+    frappe.cache().set_value(CLEANUP_SUMMARY_CACHE_KEY, summary)
+    frappe.logger("guest_checkout").info(
+        f"Guest cleanup {'completed' if summary.completed else 'paused'}: "
+        f"{summary.quotations} quotations, {summary.customers} customers, "
+        f"{summary.child_rows} child rows in {summary.elapsed}s ({summary.rows_per_sec} rows/sec)"
+    )
+
+    return summary
+
+
+def get_last_summary():
+    """Return the summary of the most recent cleanup run"""
+    return frappe.cache().get_value(CLEANUP_SUMMARY_CACHE_KEY)
+
+
+def _get_next_chunk(phase, cutoff, last_name, chunk_size):
+    if phase == "quotations":
+        return _get_quotation_chunk(cutoff, last_name, chunk_size)
+    return _get_customer_chunk(cutoff, last_name, chunk_size)
+
+
+def _get_quotation_chunk(cutoff, last_name, chunk_size):
+    """Draft quotations of guest customers, plus party-less guest carts"""
+    quotation = frappe.qb.DocType("Quotation")
+    customer = frappe.qb.DocType("Customer")
+
+    query = (
+        frappe.qb.from_(quotation)
+        .left_join(customer)
+        .on((customer.name == quotation.party_name) & (quotation.quotation_to == "Customer"))
+        .select(quotation.name)
+        .where(quotation.docstatus == 0)
+        .where(quotation.modified < cutoff)
+        .where(
+            (customer.guest_checkout == 1)
+            | (quotation.party_name.isnull() & (quotation.order_type == "Shopping Cart"))
+        )
+        .where(quotation.name > last_name)
+        .orderby(quotation.name)
+        .limit(chunk_size)
+    )
+
+    return query.run(pluck=True)
+
+
+def _get_customer_chunk(cutoff, last_name, chunk_size):
+    """Guest customers not referenced by any Sales Order or Quotation"""
+    customer = frappe.qb.DocType("Customer")
+    sales_order = frappe.qb.DocType("Sales Order")
+    quotation = frappe.qb.DocType("Quotation")
+
+    query = (
+        frappe.qb.from_(customer)
+        .left_join(sales_order).on(sales_order.customer == customer.name)
+        .left_join(quotation).on(quotation.party_name == customer.name)
+        .select(customer.name)
+        .distinct()
+        .where(customer.guest_checkout == 1)
+        .where(customer.modified < cutoff)
+        .where(sales_order.name.isnull())
+        .where(quotation.name.isnull())
+        .where(customer.name > last_name)
+        .orderby(customer.name)
+        .limit(chunk_size)
+    )
+
+    return query.run(pluck=True)
+
+
+def _delete_chunk(doctype, names):
+    """Delete a chunk of documents with one statement per table
+
+    Returns:
+        int: number of child rows deleted (for customers, including their
+            Contacts and Addresses and those documents' rows)
+    """
+    child_rows = 0
+    for table_field in frappe.get_meta(doctype).get_table_fields():
+        child_rows += _delete_rows(table_field.options, {"parenttype": doctype, "parent": ("in", names)})
+
+    if doctype == "Customer":
+        # Bulk deletes skip Customer.on_trash, which would delete the Contacts
+        # and Addresses linked to nothing else; they hold the guest's details
+        for parenttype, parents in _get_linked_only_to(names).items():
+            child_rows += _delete_chunk(parenttype, parents) + len(parents)
+
+        child_rows += _delete_rows("Dynamic Link", {"link_doctype": "Customer", "link_name": ("in", names)})
+        # ...and the cached identities
+        clear_identity_cache()
+
+    _delete_rows("Version", {"ref_doctype": doctype, "docname": ("in", names)})
+    _delete_rows(doctype, {"name": ("in", names)})
+
+    return child_rows
+
+
+def _get_linked_only_to(customers):
+    """Contacts and Addresses whose every link points at one of these customers
+
+    Returns:
+        dict: parenttype -> [names]
+    """
+    link = frappe.qb.DocType("Dynamic Link")
+    other_link = frappe.qb.DocType("Dynamic Link").as_("other_link")
+
+    rows = (
+        frappe.qb.from_(link)
+        .left_join(other_link)
+        .on(
+            (other_link.parenttype == link.parenttype)
+            & (other_link.parent == link.parent)
+            & ((other_link.link_doctype != "Customer") | other_link.link_name.notin(customers))
+        )
+        .select(link.parenttype, link.parent)
+        .distinct()
+        .where(link.parenttype.isin(["Contact", "Address"]))
+        .where(link.link_doctype == "Customer")
+        .where(link.link_name.isin(customers))
+        .where(other_link.name.isnull())
+    ).run(as_dict=True)
+
+    parents = {}
+    for row in rows:
+        parents.setdefault(row.parenttype, []).append(row.parent)
+    return parents
+
+
+def _delete_rows(doctype, filters):
+    count = frappe.db.count(doctype, filters)
+    if count:
+        frappe.db.delete(doctype, filters)
+    return count
+
+
+def _get_state(cutoff):
+    """Resume an unfinished run, or start a new one for the given cutoff"""
+    state = frappe.cache().get_value(CLEANUP_STATE_CACHE_KEY)
+    if state and state.get("phase") in PHASES:
+        return frappe._dict(state)
+
+    return frappe._dict({"phase": PHASES[0], "last_name": "", "cutoff": cutoff})
+
+
+def _save_state(state):
+    if state.phase:
+        frappe.cache().set_value(CLEANUP_STATE_CACHE_KEY, dict(state))
+
+
+def _get_next_phase(phase):
+    index = PHASES.index(phase) + 1
+    return PHASES[index] if index < len(PHASES) else None
@@ -0,0 +1,193 @@
+# guest_checkout/guest_checkout/customer_identity.py
+import frappe
+from frappe import _
+from frappe.utils import cstr
+from frappe.utils.nestedset import get_root_of
+
+
+# Customer.guest_identity_key (unique) holds the normalized mobile, or the
+# normalized email when there is no mobile. This hash maps key -> Customer name.
+IDENTITY_CACHE_KEY = "guest_checkout:customer_identity"
+IDENTITY_SAVEPOINT = "guest_identity_insert"
+
+# Fewest digits a number dialled without + or 00 must have after the
+# calling code before that code is taken as a prefix rather than local digits
+MIN_NATIONAL_DIGITS = 8
+
+# country -> calling code digits; country_info is static, read it once per process
+_calling_codes = {}
+
+
+def normalize_mobile(mobile):
+    """Digits of the number in national form
+
+    "+965 5123 0001", "0096551230001", "96551230001" and "51230001" all give
+    "51230001" when the site's country is Kuwait. Numbers of other countries
+    keep their calling code.
+    """
+    value = cstr(mobile).strip()
+    digits = "".join(filter(str.isdigit, value))
+
+    international = value.startswith("+") or digits.startswith("00")
+    if digits.startswith("00"):
+        digits = digits[2:]
+
+    calling_code = get_calling_code()
+    if calling_code and digits.startswith(calling_code):
+        national = digits[len(calling_code):]
+        if international or len(national) >= MIN_NATIONAL_DIGITS:
+            return national
+
+    return digits
+
+
+def get_calling_code():
+    """Calling code digits of the site's default country, e.g. "965" """
+    country = frappe.db.get_default("country")
+    if not country:
+        return ""
+
+    if country not in _calling_codes:
+        from frappe.geo.country_info import get_country_info
+
+        isd = (get_country_info(country) or {}).get("isd")
+        _calling_codes[country] = "".join(filter(str.isdigit, cstr(isd)))
+
+    return _calling_codes[country]
+
+
+def normalize_email(email):
+    return cstr(email).strip().lower()
+
+
+def get_identity_key(mobile=None, email=None):
+    """Return the identity key for a shopper, preferring the mobile number"""
+    mobile = normalize_mobile(mobile)
+    if mobile:
+        return f"mobile:{mobile}"
+
+    email = normalize_email(email)
+    return f"email:{email}" if email else None
+
+
+def find_customer(mobile=None, email=None):
+    """Return the Customer name for a shopper, or None
+
+    Reads the cache first, then does one lookup on the unique key column.
+    """
+    key = get_identity_key(mobile, email)
+    if not key:
+        return None
+
+    customer_name = frappe.cache().hget(IDENTITY_CACHE_KEY, key)
+    if customer_name:
+        return customer_name
+
+    customer_name = frappe.db.get_value("Customer", {"guest_identity_key": key}, "name")
+    if customer_name:
+        frappe.cache().hset(IDENTITY_CACHE_KEY, key, customer_name)
+
+    return customer_name
+
+
+def resolve_customer(mobile=None, email=None, full_name=None, customer_group=None, guest_checkout=True):
+    """Find the shopper's Customer or create it
+
+    Concurrent checkouts for the same shopper race on the unique key: the
+    loser rolls back its insert and loads the winner's Customer. Only
+    Customers created with guest_checkout set are purged by the cleanup.
+
+    Returns:
+        tuple: (Customer document, True if it was created)
+    """
+    key = get_identity_key(mobile, email)
+    if not key:
+        frappe.throw(_("Mobile number or email is required"))
+
+    customer_name = find_customer(mobile, email)
+    if customer_name:
+        try:
+            return frappe.get_doc("Customer", customer_name), False
+        except frappe.DoesNotExistError:
+            # Cached name of a deleted Customer
+            frappe.cache().hdel(IDENTITY_CACHE_KEY, key)
+            customer_name = frappe.db.get_value("Customer", {"guest_identity_key": key}, "name")
+            if customer_name:
+                return frappe.get_doc("Customer", customer_name), False
+
+    customer = frappe.get_doc({
+        "doctype": "Customer",
+        "customer_name": full_name or f"Customer-{normalize_mobile(mobile)[-4:]}",
+        "mobile_no": mobile,
+        "email_id": email,
+        "customer_type": "Individual",
+        "customer_group": customer_group
+        or frappe.db.get_single_value("Selling Settings", "customer_group")
+        or "Individual",
+        "territory": get_root_of("Territory"),
+        "guest_checkout": 1 if guest_checkout else 0,
+        "guest_identity_key": key,
+        "disabled": 0
+    })
+    customer.flags.ignore_permissions = True
+    customer.flags.ignore_mandatory = True
+
+    return _insert_customer(customer)
+
+
+def _insert_customer(customer):
+    """Insert a new Customer, or load the one a concurrent checkout inserted with its key
+
+    Returns:
+        tuple: (Customer document, True if it was created)
+    """
+    key = customer.guest_identity_key
+
+    frappe.db.savepoint(IDENTITY_SAVEPOINT)
+    try:
+        customer.insert(ignore_permissions=True)
+    except (frappe.UniqueValidationError, frappe.DuplicateEntryError):
+        frappe.db.rollback(save_point=IDENTITY_SAVEPOINT)
+        # A locking read sees the winner's committed row even under
+        # REPEATABLE READ, where a plain read would reuse our older snapshot
+        customer_name = frappe.db.get_value("Customer", {"guest_identity_key": key}, "name", for_update=True)
+        if not customer_name:
+            raise
+        customer = frappe.get_doc("Customer", customer_name)
+        frappe.cache().hset(IDENTITY_CACHE_KEY, key, customer.name)
+        return customer, False
+
+    frappe.cache().hset(IDENTITY_CACHE_KEY, key, customer.name)
+    return customer, True
+
+
+def clear_identity_cache(doc=None, method=None, *args):
+    """Drop cached identities when a Customer is deleted or renamed"""
+    if doc and doc.get("guest_identity_key"):
+        frappe.cache().hdel(IDENTITY_CACHE_KEY, doc.guest_identity_key)
+    else:
+        frappe.cache().delete_value(IDENTITY_CACHE_KEY)
+
+
+def backfill_identity_keys():
+    """Set guest_identity_key on existing Customers
+
+    When several Customers share a key, the oldest one keeps it.
+    """
+    seen = set(frappe.get_all(
+        "Customer", filters={"guest_identity_key": ("is", "set")}, pluck="guest_identity_key"
+    ))
+
+    customers = frappe.get_all(
+        "Customer",
+        filters={"guest_identity_key": ("is", "not set")},
+        fields=["name", "mobile_no", "email_id"],
+        order_by="creation asc"
+    )
+    for customer in customers:
+        key = get_identity_key(customer.mobile_no, customer.email_id)
+        if key and key not in seen:
+            seen.add(key)
+            frappe.db.set_value("Customer", customer.name, "guest_identity_key", key, update_modified=False)
+
+    frappe.cache().delete_value(IDENTITY_CACHE_KEY)
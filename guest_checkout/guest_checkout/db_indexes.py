@@ -0,0 +1,67 @@
+# guest_checkout/guest_checkout/db_indexes.py
+import frappe
+
+
+# Indexes for the guest checkout hot lookups: (doctype, index name, columns).
+# Column order matters - equality filters first, then the sort column.
+GUEST_CHECKOUT_INDEXES = (
+    # _get_cart_quotation_for_guest_or_user: open cart of a party, newest first
+    ("Quotation", "guest_cart_lookup_index", ("party_name", "order_type", "docstatus", "modified")),
+    # guest_address.get_or_create_address: match an existing address by fingerprint
+    ("Address", "guest_address_fingerprint_index", ("guest_address_fingerprint",)),
+)
+
+# A representative query per index, explained by check_guest_checkout_indexes
+INDEX_QUERIES = {
+    "guest_cart_lookup_index": (
+        "select name from `tabQuotation` where party_name = %s and order_type = 'Shopping Cart' "
+        "and docstatus = 0 order by modified desc limit 1"
+    ),
+    "guest_address_fingerprint_index": (
+        "select name from `tabAddress` where guest_address_fingerprint = %s and disabled = 0 limit 1"
+    ),
+}
+
+def add_guest_checkout_indexes():
+    """Create any missing guest checkout index
+
+    Indexes on custom fields are skipped while the field is missing, so the
+    index patch runs after the patches adding those fields.
+    """
+    for doctype, index_name, columns in GUEST_CHECKOUT_INDEXES:
+        if not all(frappe.db.has_column(doctype, column) for column in columns):
+            continue
+        if not frappe.db.has_index(f"tab{doctype}", index_name):
+            frappe.db.add_index(doctype, list(columns), index_name)
+
+
+@frappe.whitelist()
+def check_guest_checkout_indexes():
+    """Report missing indexes and the query plan of each hot lookup (System Manager only)
+
+    Also runnable as:
+        bench --site <site> execute guest_checkout.db_indexes.check_guest_checkout_indexes
+    """
+    frappe.only_for("System Manager")
+
+    report = []
+    for doctype, index_name, columns in GUEST_CHECKOUT_INDEXES:
+        query = INDEX_QUERIES[index_name]
+        plan = []
+        if all(frappe.db.has_column(doctype, column) for column in columns):
+            plan = frappe.db.sql(f"explain {query}", ("",) * query.count("%s"), as_dict=True)
+
+        report.append({
+            "doctype": doctype,
+            "index": index_name,
+            "columns": list(columns),
+            "exists": bool(frappe.db.has_index(f"tab{doctype}", index_name)),
+            "used_by_query": index_name in frappe.as_json(plan),
+            "query": query,
+            "plan": plan,
+        })
+
+    return {
+        "missing": [row["index"] for row in report if not row["exists"]],
+        "indexes": report,
+    }
@@ -1,46 +1,33 @@
 import frappe
 from frappe import _
+from frappe.utils import flt
+from guest_checkout.instrumentation import stage
+from guest_checkout.item_meta import get_item_meta
+
+# Delivery areas change rarely, so the catalog is cached and only rebuilt
+# when DeliveryArea.on_update/on_trash bump the version stamp
+DELIVERY_AREA_VERSION_KEY = "guest_checkout:delivery_area_version"
+DELIVERY_AREA_CATALOG_KEY = "guest_checkout:delivery_area_catalog"
+
+# Process-local copy per site as a (version, value) pair; a request only reads
+# the stamp. Each site's pair is replaced whole, never cleared and read back,
+# so threads and other sites sharing the worker cannot evict it mid-request.
+_catalog_by_site = {}
+_areas_by_site = {}
+
+# Cart line carrying the delivery charge on carts and orders built by this app
+DELIVERY_ITEM_CODE = "Delivery Charges"
+
 
 @frappe.whitelist(allow_guest=True)
 def get_delivery_areas():
     """Fetch delivery areas for guest checkout dropdown."""
     try:
-        # Check which field exists
-        field_name = None
-        for field in ["delivery_charges", "delivery_charge"]:
-            if frappe.db.exists("DocField", {
-                "parent": "Delivery Area",
-                "fieldname": field
-            }):
-                field_name = field
-                break
-        
-        if not field_name:
-            return {"success": True, "areas": []}
-        
-        # Fetch areas
-        areas = frappe.get_all(
-            "Delivery Area",
-            filters={"disabled": 0},
-            fields=["area_name", field_name],
-            order_by="area_name"
-        )
-        
-        # Format response
-        formatted_areas = []
-        for area in areas:
-            charge = area.get(field_name, 0)
-            formatted_areas.append({
-                "area_name": area.area_name,
-                "delivery_charge": charge,
-                "delivery_charges": charge
-            })
-        
         return {
             "success": True,
-            "areas": formatted_areas
+            "areas": get_delivery_area_catalog()
         }
-        
+
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "Delivery Areas Error")
         return {
@@ -48,3 +35,227 @@ def get_delivery_areas():
             "message": str(e),
             "areas": []
         }
+
+
+def get_delivery_area_catalog():
+    """Return all delivery areas with their charges, served from cache
+
+    Each area carries both naming conventions used by the checkout scripts:
+    name, area, area_name, delivery_charge and delivery_charges.
+    """
+    version = get_delivery_area_version()
+    cached_version, areas = _catalog_by_site.get(frappe.local.site, (None, None))
+
+    if cached_version != version:
+        catalog = frappe.cache().get_value(DELIVERY_AREA_CATALOG_KEY)
+        if not catalog or catalog.get("version") != version:
+            with stage("build_delivery_area_catalog"):
+                catalog = {"version": version, "areas": _build_delivery_area_catalog()}
+            frappe.cache().set_value(DELIVERY_AREA_CATALOG_KEY, catalog)
+
+        areas = catalog["areas"]
+        _catalog_by_site[frappe.local.site] = (version, areas)
+
+    return [frappe._dict(area) for area in areas]
+
+
+def get_delivery_area(delivery_area):
+    """Return the catalog entry of an area by name or label, or None"""
+    if not delivery_area:
+        return None
+
+    version = get_delivery_area_version()
+    cached_version, areas = _areas_by_site.get(frappe.local.site, (None, None))
+
+    if cached_version != version:
+        areas = {}
+        for area in get_delivery_area_catalog():
+            areas.setdefault(area.area, area)
+            areas[area.name] = area
+
+        _areas_by_site[frappe.local.site] = (version, areas)
+
+    return areas.get(delivery_area)
+
+
+def get_delivery_charge(delivery_area, cart_total=0, total_weight=0):
+    """Delivery charge of an area for a cart, resolved from the cached catalog
+
+    Free delivery above the area's threshold wins, then the first weight
+    tier covering the cart's weight, then the area's flat charge.
+    """
+    area = get_delivery_area(delivery_area)
+    if not area:
+        return 0
+
+    if area.free_delivery_above and flt(cart_total) >= flt(area.free_delivery_above):
+        return 0
+
+    if flt(total_weight) > 0:
+        tier = next((tier for tier in area.weight_tiers if flt(total_weight) <= flt(tier["up_to_weight"])), None)
+        if tier:
+            return flt(tier["delivery_charge"])
+
+    return flt(area.delivery_charge)
+
+
+def get_cart_delivery_charge(delivery_area, doc):
+    """Delivery charge for a Quotation or Sales Order, from its own lines
+
+    The delivery line itself doesn't count towards the total or weight.
+    """
+    items = [item for item in doc.get("items") if item.item_code != DELIVERY_ITEM_CODE]
+    cart_total = sum(flt(item.amount) or flt(item.qty) * flt(item.rate) for item in items)
+
+    return get_delivery_charge(delivery_area, cart_total, get_cart_weight(items))
+
+
+def get_cart_weight(items):
+    """Total weight of cart lines
+
+    Lines of carts built from the guest cart cache carry no weight; they are
+    weighed from the Item's weight_per_unit in the cached item metadata.
+    """
+    unweighed = [
+        item.item_code for item in items
+        if not flt(item.get("total_weight")) and not flt(item.get("weight_per_unit"))
+    ]
+    meta = get_item_meta(unweighed) if unweighed else {}
+
+    total_weight = 0
+    for item in items:
+        if flt(item.get("total_weight")):
+            total_weight += flt(item.total_weight)
+            continue
+
+        weight_per_unit = flt(item.get("weight_per_unit")) or flt(meta.get(item.item_code, {}).get("weight_per_unit"))
+        total_weight += weight_per_unit * flt(item.qty) * (flt(item.get("conversion_factor")) or 1)
+
+    return total_weight
+
+
+def apply_delivery_charge(doc, delivery_area):
+    """Set the resolved delivery charge of an area on a Quotation, replacing any earlier one
+
+    The charge is added to taxes against Webshop Settings > Delivery Charges
+    Account, or as a Delivery Charges line when no account is set.
+
+    Returns the charge applied.
+    """
+    area = get_delivery_area(delivery_area)
+    if not area:
+        frappe.throw(_("Delivery Area {0} not found").format(delivery_area))
+
+    delivery_charge = get_cart_delivery_charge(area.name, doc)
+    delivery_charges_account = frappe.get_cached_doc("Webshop Settings").get("delivery_charges_account")
+
+    doc.set("taxes", [tax for tax in doc.get("taxes") if "Delivery Charges" not in (tax.description or "")])
+
+    if delivery_charges_account:
+        if delivery_charge:
+            doc.append("taxes", {
+                "charge_type": "Actual",
+                "account_head": delivery_charges_account,
+                "description": f"Delivery Charges - {area.area}",
+                "tax_amount": delivery_charge
+            })
+        return delivery_charge
+
+    # Fallback to item-based charges if tax account not set
+    delivery_item = next((item for item in doc.get("items") if item.item_code == DELIVERY_ITEM_CODE), None)
+    if not delivery_charge:
+        if delivery_item:
+            doc.set("items", [item for item in doc.get("items") if item is not delivery_item])
+    elif delivery_item:
+        delivery_item.rate = delivery_item.amount = delivery_charge
+    elif frappe.db.exists("Item", DELIVERY_ITEM_CODE):
+        doc.append("items", {
+            "item_code": DELIVERY_ITEM_CODE,
+            "item_name": f"Delivery Charges - {area.area}",
+            "description": f"Delivery to {area.area}",
+            "qty": 1,
+            "rate": delivery_charge,
+            "amount": delivery_charge
+        })
+
+    return delivery_charge
+
+
+def get_delivery_area_version():
+    """Return the current catalog version stamp, creating one if missing"""
+    version = frappe.cache().get_value(DELIVERY_AREA_VERSION_KEY)
+    if not version:
+        version = bump_delivery_area_version()
+    return version
+
+
+def bump_delivery_area_version():
+    """Invalidate the cached catalog everywhere by moving to a new version"""
+    version = frappe.generate_hash(length=10)
+    frappe.cache().set_value(DELIVERY_AREA_VERSION_KEY, version)
+    return version
+
+
+def invalidate_delivery_area_catalog():
+    """Drop the cached catalog for a Delivery Area change
+
+    Bumped now so this transaction reads its own change, and again once it
+    commits: a request that rebuilt the catalog in between read the old rows
+    and cached them under the first new version.
+    """
+    bump_delivery_area_version()
+    frappe.db.after_commit.add(bump_delivery_area_version)
+
+
+def _build_delivery_area_catalog():
+    """Query Delivery Area once, resolving which field names the schema uses"""
+    meta = frappe.get_meta("Delivery Area")
+
+    charge_field = next(
+        (field for field in ["delivery_charge", "delivery_charges"] if meta.has_field(field)), None
+    )
+    label_field = next(
+        (field for field in ["area", "area_name"] if meta.has_field(field)), "name"
+    )
+    filters = {"disabled": 0} if meta.has_field("disabled") else {}
+
+    fields = ["name", label_field]
+    if charge_field:
+        fields.append(charge_field)
+    if meta.has_field("free_delivery_above"):
+        fields.append("free_delivery_above")
+
+    areas = frappe.get_all(
+        "Delivery Area",
+        filters=filters,
+        fields=fields,
+        order_by=f"{label_field} asc"
+    )
+
+    weight_tiers = {}
+    if meta.has_field("weight_tiers"):
+        for tier in frappe.get_all(
+            "Delivery Area Weight Tier",
+            filters={"parenttype": "Delivery Area"},
+            fields=["parent", "up_to_weight", "delivery_charge"],
+            order_by="up_to_weight asc"
+        ):
+            weight_tiers.setdefault(tier.parent, []).append({
+                "up_to_weight": flt(tier.up_to_weight),
+                "delivery_charge": flt(tier.delivery_charge)
+            })
+
+    catalog = []
+    for area in areas:
+        charge = (area.get(charge_field) or 0) if charge_field else 0
+        catalog.append({
+            "name": area.name,
+            "area": area.get(label_field),
+            "area_name": area.get(label_field),
+            "delivery_charge": charge,
+            "delivery_charges": charge,
+            "free_delivery_above": flt(area.get("free_delivery_above")),
+            "weight_tiers": weight_tiers.get(area.name, [])
+        })
+
+    return catalog
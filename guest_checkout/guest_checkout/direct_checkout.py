@@ -0,0 +1,86 @@
+# guest_checkout/guest_checkout/direct_checkout.py
+import frappe
+from frappe.utils import cint, nowdate
+
+
+# Checkout normally saves and submits the cart Quotation and maps it to a
+# Sales Order, validating and versioning two documents per order. The direct
+# path builds the Sales Order from the priced cart in memory and drops the
+# draft cart once the order is in.
+HEADER_FIELDS = (
+    "company",
+    "order_type",
+    "currency",
+    "conversion_rate",
+    "selling_price_list",
+    "price_list_currency",
+    "plc_conversion_rate",
+    "ignore_pricing_rule",
+    "coupon_code",
+    "apply_discount_on",
+    "additional_discount_percentage",
+    "discount_amount",
+    "shipping_rule",
+    "taxes_and_charges",
+    "tc_name",
+    "terms",
+)
+
+ITEM_FIELDS = (
+    "item_code",
+    "item_name",
+    "description",
+    "qty",
+    "uom",
+    "stock_uom",
+    "conversion_factor",
+    "price_list_rate",
+    "discount_percentage",
+    "discount_amount",
+    "rate",
+    "warehouse",
+)
+
+TAX_FIELDS = (
+    "charge_type",
+    "account_head",
+    "description",
+    "rate",
+    "tax_amount",
+    "cost_center",
+    "included_in_print_rate",
+    "row_id",
+    "add_deduct_tax",
+    "category",
+)
+
+
+def is_enabled():
+    """Check if checkout should skip the Quotation and create the Sales Order directly"""
+    return bool(cint(frappe.get_cached_doc("Webshop Settings").get("direct_sales_order_checkout")))
+
+
+def make_sales_order(quotation):
+    """Return an unsaved Sales Order with the lines, prices and taxes of the cart Quotation"""
+    sales_order = frappe.new_doc("Sales Order")
+    sales_order.transaction_date = nowdate()
+    for field in HEADER_FIELDS:
+        if quotation.get(field) is not None:
+            sales_order.set(field, quotation.get(field))
+
+    for item in quotation.get("items"):
+        sales_order.append("items", {field: item.get(field) for field in ITEM_FIELDS})
+
+    for tax in quotation.get("taxes"):
+        sales_order.append("taxes", {field: tax.get(field) for field in TAX_FIELDS})
+
+    return sales_order
+
+
+def drop_cart(quotation):
+    """Delete the draft cart Quotation the order was built from (cached carts have none)"""
+    if quotation.is_new():
+        return
+
+    quotation.flags.ignore_permissions = True
+    quotation.delete()
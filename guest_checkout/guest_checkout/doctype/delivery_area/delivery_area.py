@@ -4,6 +4,15 @@
 import frappe
 from frappe.model.document import Document
 
+from guest_checkout.delivery import invalidate_delivery_area_catalog
+
 
 class DeliveryArea(Document):
-	pass
\ No newline at end of file
+	def on_update(self):
+		invalidate_delivery_area_catalog()
+
+	def on_trash(self):
+		invalidate_delivery_area_catalog()
+
+	def after_rename(self, old, new, merge=False):
+		invalidate_delivery_area_catalog()
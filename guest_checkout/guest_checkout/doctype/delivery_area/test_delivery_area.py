@@ -1,9 +1,87 @@
 # Copyright (c) 2026, SA7BA and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from guest_checkout import delivery
+from guest_checkout.delivery import (
+	get_cart_delivery_charge,
+	get_delivery_area_catalog,
+	get_delivery_area_version,
+	get_delivery_charge,
+)
+from guest_checkout.item_meta import clear_item_meta_cache
+from guest_checkout.tests.utils import make_test_item
+
 
 class TestDeliveryArea(FrappeTestCase):
-	pass
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_save_refreshes_catalog(self):
+		version = get_delivery_area_version()
+
+		area = frappe.get_doc({
+			"doctype": "Delivery Area",
+			"area": "Catalog Test Area",
+			"delivery_charge": 2.5,
+		}).insert(ignore_permissions=True)
+
+		self.assertNotEqual(get_delivery_area_version(), version)
+		catalog = {d.name: d for d in get_delivery_area_catalog()}
+		self.assertEqual(catalog[area.name].delivery_charge, 2.5)
+		self.assertEqual(catalog[area.name].area_name, "Catalog Test Area")
+
+		area.delete()
+		self.assertNotIn(area.name, [d.name for d in get_delivery_area_catalog()])
+
+	def test_local_catalog_is_kept_per_site(self):
+		delivery._catalog_by_site["other.site"] = ("other-version", [])
+
+		get_delivery_area_catalog()
+
+		self.assertEqual(delivery._catalog_by_site["other.site"], ("other-version", []))
+		self.assertEqual(delivery._catalog_by_site[frappe.local.site][0], get_delivery_area_version())
+		delivery._catalog_by_site.pop("other.site")
+
+	def test_delivery_rules(self):
+		area = frappe.get_doc({
+			"doctype": "Delivery Area",
+			"area": "Rules Test Area",
+			"delivery_charge": 3,
+			"free_delivery_above": 50,
+			"weight_tiers": [
+				{"up_to_weight": 5, "delivery_charge": 1},
+				{"up_to_weight": 20, "delivery_charge": 2},
+			],
+		}).insert(ignore_permissions=True)
+
+		self.assertEqual(get_delivery_charge(area.name, cart_total=10), 3)
+		self.assertEqual(get_delivery_charge("Rules Test Area", cart_total=50), 0)
+		self.assertEqual(get_delivery_charge(area.name, cart_total=10, total_weight=4), 1)
+		self.assertEqual(get_delivery_charge(area.name, cart_total=10, total_weight=12), 2)
+		self.assertEqual(get_delivery_charge(area.name, cart_total=10, total_weight=30), 3)
+		self.assertEqual(get_delivery_charge("Unknown Area", cart_total=10), 0)
+
+		area.free_delivery_above = 0
+		area.save()
+		self.assertEqual(get_delivery_charge(area.name, cart_total=50), 3)
+
+	def test_cached_cart_lines_are_weighed_from_the_item(self):
+		area = frappe.get_doc({
+			"doctype": "Delivery Area",
+			"area": "Weight Test Area",
+			"delivery_charge": 3,
+			"weight_tiers": [{"up_to_weight": 5, "delivery_charge": 1}],
+		}).insert(ignore_permissions=True)
+		item = make_test_item("Weighed Guest Checkout Item", weight_per_unit=2)
+		clear_item_meta_cache()
+
+		# Lines of a cart built from the guest cart cache have no total_weight
+		cart = frappe._dict({"items": [frappe._dict({"item_code": item.name, "qty": 2, "rate": 1, "amount": 2})]})
+		self.assertEqual(get_cart_delivery_charge(area.name, cart), 1)
+
+		cart["items"][0].qty = 3
+		cart["items"][0].amount = 3
+		self.assertEqual(get_cart_delivery_charge(area.name, cart), 3)
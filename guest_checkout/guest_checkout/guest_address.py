@@ -0,0 +1,135 @@
+# guest_checkout/guest_checkout/guest_address.py
+import hashlib
+
+import frappe
+from frappe.utils import cstr
+
+
+# Address fields a checkout may set; anything else in the payload is ignored
+ADDRESS_FIELDS = (
+    "address_line1",
+    "address_line2",
+    "city",
+    "state",
+    "country",
+    "pincode",
+    "phone",
+    "email_id",
+    "is_primary_address",
+    "is_shipping_address",
+)
+
+FINGERPRINT_FIELDS = ("address_line1", "city", "pincode", "country")
+
+
+def get_address_fingerprint(address_data):
+    """Hash of the normalized line1/city/pincode/country
+
+    Case, surrounding and repeated whitespace don't change the fingerprint.
+    """
+    parts = [" ".join(cstr(address_data.get(field)).lower().split()) for field in FINGERPRINT_FIELDS]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def set_address_fingerprint(doc, method=None):
+    """Address validate hook - keep the fingerprint in sync with edits made in desk"""
+    doc.guest_address_fingerprint = get_address_fingerprint(doc)
+
+
+def get_or_create_address(customer_name, address_data, address_type="Billing", contact_name=None):
+    """Return the customer's Address matching address_data, creating it if needed
+
+    Matching is one lookup on the indexed fingerprint, joined with the
+    customer's Dynamic Link. Addresses of other customers are never reused:
+    they would share one shopper's details with another.
+    """
+    address_data = dict(address_data)
+    if address_data.get("email") and not address_data.get("email_id"):
+        address_data["email_id"] = address_data["email"]
+
+    fingerprint = get_address_fingerprint(address_data)
+    address_name = _find_address(fingerprint, customer_name)
+
+    if address_name:
+        address = frappe.get_doc("Address", address_name)
+        if contact_name:
+            _add_missing_links(address, customer_name, contact_name)
+        return address
+
+    address = frappe.get_doc({
+        "doctype": "Address",
+        "address_title": customer_name,
+        "address_type": address_type,
+        "guest_address_fingerprint": fingerprint,
+        "links": [{
+            "link_doctype": "Customer",
+            "link_name": customer_name
+        }]
+    })
+    address.update({field: address_data[field] for field in ADDRESS_FIELDS if address_data.get(field) is not None})
+    if contact_name:
+        address.append("links", {
+            "link_doctype": "Contact",
+            "link_name": contact_name
+        })
+
+    address.flags.ignore_permissions = True
+    address.flags.ignore_mandatory = True
+    address.insert(ignore_permissions=True)
+
+    return address
+
+
+def _find_address(fingerprint, customer_name):
+    address = frappe.qb.DocType("Address")
+    link = frappe.qb.DocType("Dynamic Link")
+
+    matches = (
+        frappe.qb.from_(address)
+        .left_join(link)
+        .on(
+            (link.parent == address.name)
+            & (link.parenttype == "Address")
+            & (link.link_doctype == "Customer")
+            & (link.link_name == customer_name)
+        )
+        .select(address.name)
+        .where(address.guest_address_fingerprint == fingerprint)
+        .where(address.disabled == 0)
+        .where(link.name.isnotnull())
+        .limit(1)
+    ).run(pluck=True)
+
+    return matches[0] if matches else None
+
+
+def _add_missing_links(address, customer_name, contact_name=None):
+    linked = {(link.link_doctype, link.link_name) for link in address.links}
+    missing = [
+        (doctype, name)
+        for doctype, name in [("Customer", customer_name), ("Contact", contact_name)]
+        if name and (doctype, name) not in linked
+    ]
+    if not missing:
+        return
+
+    for doctype, name in missing:
+        address.append("links", {
+            "link_doctype": doctype,
+            "link_name": name
+        })
+    address.flags.ignore_permissions = True
+    address.save()
+
+
+def backfill_address_fingerprints():
+    """Set guest_address_fingerprint on existing Addresses"""
+    addresses = frappe.get_all(
+        "Address",
+        filters={"guest_address_fingerprint": ("is", "not set")},
+        fields=["name", *FINGERPRINT_FIELDS]
+    )
+    for address in addresses:
+        frappe.db.set_value(
+            "Address", address.name, "guest_address_fingerprint", get_address_fingerprint(address), update_modified=False
+        )
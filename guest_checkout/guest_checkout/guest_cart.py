@@ -1,12 +1,40 @@
 # guest_checkout/guest_cart.py
+import hashlib
+import random
+import time
+
 import frappe
 from frappe import _
 from frappe.utils import get_fullname, flt, cint, cstr, nowdate
 from webshop.webshop.doctype.webshop_settings.webshop_settings import get_shopping_cart_settings
-from frappe.utils.nestedset import get_root_of
+from guest_checkout import (
+    cart_coalescer,
+    cart_summary,
+    checkout_jobs,
+    direct_checkout,
+    guest_cart_store,
+    idempotency,
+    large_cart,
+    payments,
+    stock_check
+)
+from guest_checkout.catalog_index import resolve_website_items
+from guest_checkout.customer_identity import resolve_customer
+from guest_checkout.guest_address import get_or_create_address
+from guest_checkout.instrumentation import stage
+from guest_checkout.item_meta import decorate_quotation_doc, get_item_meta
 import json
 
 
+# Upper bound on the changes accepted by one bulk cart update
+MAX_CART_CHANGES = 100
+
+# Saves that lose a race with a concurrent save of the same cart are retried
+# on the reloaded cart, backing off from CART_SAVE_BACKOFF seconds
+MAX_CART_SAVE_ATTEMPTS = 3
+CART_SAVE_BACKOFF = 0.05
+
+
 # Using a session-based approach for guest identification
 def get_guest_id():
     """Generate or retrieve unique guest ID for the session"""
@@ -40,37 +68,17 @@ def get_guest_party(user=None, mobile_no=None, email=None, full_name=None):
         
         # Check if we're in the final checkout stage with customer information
         if mobile_no and email and full_name:
-            # First check if customer exists with this mobile number
-            existing_customer = frappe.db.get_value(
-                "Customer",
-                {"mobile_no": mobile_no},
-                "name"
-            )
-            
-            if existing_customer:
-                # Customer exists, update email and name if needed
-                customer = frappe.get_doc("Customer", existing_customer)
-                # Update email if different
-                if customer.email_id != email:
-                    customer.email_id = email
-                    customer.flags.ignore_permissions = True
-                    customer.save()
-            else:
-                # Create new customer with mobile as unique identifier
-                customer = frappe.get_doc({
-                    "doctype": "Customer",
-                    "customer_name": full_name,
-                    "mobile_no": mobile_no,
-                    "email_id": email,
-                    "customer_type": "Individual",
-                    "customer_group": frappe.db.get_single_value("Selling Settings", "customer_group") or "Individual",
-                    "territory": get_root_of("Territory"),
-                    "disabled": 0
-                })
-                customer.flags.ignore_permissions = True
-                customer.flags.ignore_mandatory = True
-                customer.insert(ignore_permissions=True)
+            # Mobile number is the unique identifier, resolved through the identity key
+            customer, created = resolve_customer(mobile_no, email, full_name)
+
+            # A queued checkout commits the customer with the rest of its order
+            if created and not frappe.flags.in_checkout_job:
                 frappe.db.commit()
+            elif customer.email_id != email:
+                # Customer exists, update email if different
+                customer.email_id = email
+                customer.flags.ignore_permissions = True
+                customer.save()
                 
             party = customer
             party.is_guest = False  # This is a real customer now
@@ -95,12 +103,21 @@ def get_guest_party(user=None, mobile_no=None, email=None, full_name=None):
 
 
 @frappe.whitelist(allow_guest=True)
-def get_cart_quotation_allow_guest(doc=None):
-    """Get cart quotation for both guest and logged-in users"""
+def get_cart_quotation_allow_guest(doc=None, if_none_match=None):
+    """Get cart quotation for both guest and logged-in users
+
+    Pass the version of the previous response as if_none_match to get
+    {"not_modified": True} back, without loading the cart, if nothing changed.
+    """
+    if not doc and if_none_match and if_none_match == get_cart_version():
+        return {"not_modified": True, "version": if_none_match}
+
     party = get_guest_party()
 
     if not doc:
         quotation = _get_cart_quotation_for_guest_or_user(party)
+        # The cart page shows totals, so buffered quantity changes are saved first
+        quotation = _flush_pending_cart_changes(quotation, party)
         doc = quotation
         set_cart_count_allow_guest(quotation)
 
@@ -119,71 +136,256 @@ def get_cart_quotation_allow_guest(doc=None):
             from webshop.webshop.shopping_cart.cart import update_cart_address
             update_cart_address("billing", addresses[0].name)
 
-    from webshop.webshop.shopping_cart.cart import decorate_quotation_doc
     return {
         "doc": decorate_quotation_doc(doc),
         "shipping_addresses": shipping_addresses,
         "billing_addresses": billing_addresses,
         "shipping_rules": [],
         "cart_settings": frappe.get_cached_doc("Webshop Settings"),
+        "version": get_cart_version(),
     }
 
 
 @frappe.whitelist(allow_guest=True)
-def update_cart_allow_guest(item_code, qty, additional_notes=None, with_items=False):
-    """Update cart for both guest and logged-in users"""
+def update_cart_allow_guest(item_code, qty, additional_notes=None, with_items=False, base_qty=None, version=None):
+    """Update cart for both guest and logged-in users
+
+    Args:
+        base_qty: quantity of the line when the client last saw it; if the
+            cart changed since version and the line no longer has it, the
+            change is returned under "conflicts" instead of being applied
+        version: cart version of the client's last response
+    """
+    changes = [frappe._dict({
+        "item_code": item_code,
+        "qty": flt(qty),
+        "additional_notes": additional_notes,
+        "base_qty": base_qty
+    })]
+    return _update_cart(changes, with_items, version)
+
+
+@frappe.whitelist(allow_guest=True)
+def update_cart_items_allow_guest(items, with_items=False, version=None):
+    """Apply several cart changes with a single recalculation and save
+
+    Args:
+        items: list (or JSON string) of {item_code, qty, additional_notes, base_qty}; qty 0 removes the line
+        version: cart version of the client's last response
+
+    Returns the same response as update_cart_allow_guest.
+    """
+    return _update_cart(_parse_cart_changes(items), with_items, version)
+
+
+def _parse_cart_changes(items):
+    """Validate a bulk cart payload; later changes to the same item win"""
+    if isinstance(items, str):
+        items = json.loads(items)
+
+    if not isinstance(items, list) or not items:
+        frappe.throw(_("No cart changes given"))
+    if len(items) > MAX_CART_CHANGES:
+        frappe.throw(_("At most {0} cart changes can be sent at once").format(MAX_CART_CHANGES))
+
+    changes = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get("item_code"):
+            frappe.throw(_("Each cart change needs an item_code"))
+        changes.append(frappe._dict({
+            "item_code": item["item_code"],
+            "qty": flt(item.get("qty")),
+            "additional_notes": item.get("additional_notes"),
+            "base_qty": item.get("base_qty")
+        }))
+
+    return changes
+
+
+def _update_cart(changes, with_items=False, version=None):
+    """Apply item changes to the guest or user cart, then recalculate and save once
+
+    Changes to lines another tab or request changed in the meantime come
+    back as conflicts; everything else is merged into the current cart. A
+    save that loses the race against a concurrent one is retried on the
+    reloaded cart.
+    """
     party = get_guest_party()
+
+    catalog = resolve_website_items([change.item_code for change in changes if change.qty])
+    for change in changes:
+        change.warehouse = catalog[change.item_code].warehouse if change.qty else None
+
+    if _uses_guest_cart_store(party):
+        return _update_guest_cart_store(party, changes, with_items, version)
+
     quotation = _get_cart_quotation_for_guest_or_user(party)
+    changes, conflicts = _split_conflicts(quotation.get("items"), changes, version)
+    if not changes:
+        set_cart_count_allow_guest(quotation)
+        return _get_update_cart_response(quotation, with_items, conflicts)
 
-    empty_card = False
-    qty = flt(qty)
-    
-    if qty == 0:
-        quotation_items = quotation.get("items", {"item_code": ["!=", item_code]})
-        if quotation_items:
-            quotation.set("items", quotation_items)
-        else:
-            empty_card = True
-    else:
-        warehouse = frappe.get_cached_value(
-            "Website Item", {"item_code": item_code}, "website_warehouse"
-        )
+    if cart_coalescer.is_enabled():
+        if not cint(with_items) and cart_coalescer.can_buffer(quotation, changes):
+            # Quantity-only change: saved with the next ones once the cart goes quiet
+            cart_coalescer.buffer_changes(quotation.name, changes)
+            cart_coalescer.overlay_pending(quotation)
+            cart_summary.set_summary(quotation)
+            set_cart_count_allow_guest(quotation)
+            return _get_update_cart_response(quotation, with_items, conflicts)
 
-        quotation_items = quotation.get("items", {"item_code": item_code})
-        if not quotation_items:
-            quotation.append(
-                "items",
-                {
-                    "doctype": "Quotation Item",
-                    "item_code": item_code,
-                    "qty": qty,
-                    "additional_notes": additional_notes,
-                    "warehouse": warehouse,
-                },
-            )
-        else:
-            quotation_items[0].qty = qty
-            quotation_items[0].warehouse = warehouse
-            quotation_items[0].additional_notes = additional_notes
+        if not quotation.is_new():
+            changes = cart_coalescer.pop_pending(quotation.name) + changes
+
+    quotation, more_conflicts = _save_cart_changes_with_retry(quotation, party, changes)
+    conflicts += more_conflicts
+
+    set_cart_count_allow_guest(quotation)
+
+    return _get_update_cart_response(quotation, with_items, conflicts)
+
+
+def _save_cart_changes_with_retry(quotation, party, changes):
+    """Save changes, retrying with backoff on the reloaded cart when a concurrent save wins
+
+    Returns:
+        tuple: (saved Quotation or None if it was emptied, conflicts found on reload)
+    """
+    conflicts = []
+    for attempt in range(1, MAX_CART_SAVE_ATTEMPTS + 1):
+        try:
+            return _save_cart_changes(quotation, party, changes), conflicts
+        except frappe.TimestampMismatchError:
+            if attempt == MAX_CART_SAVE_ATTEMPTS:
+                raise
+
+            # Another request saved the cart first: back off, reload and merge again
+            time.sleep(CART_SAVE_BACKOFF * 2 ** (attempt - 1) * random.uniform(1, 2))
+            quotation = frappe.get_doc("Quotation", quotation.name)
+            changes, more_conflicts = _split_conflicts(quotation.get("items"), changes)
+            conflicts += more_conflicts
+
+
+def _save_cart_changes(quotation, party, changes):
+    """Apply changes to a loaded cart and save it; returns None if the cart was emptied and deleted"""
+    if large_cart.is_large_cart(quotation) and large_cart.can_update(quotation, changes):
+        # Only the changed lines are repriced; checkout does the full recalculation
+        with stage("large_cart.apply_changes"):
+            return large_cart.apply_changes(quotation, changes)
+
+    for change in changes:
+        _apply_cart_change(quotation, change)
+
+    empty_card = not quotation.get("items")
 
     # Apply cart settings for both guests and users
     from webshop.webshop.shopping_cart.cart import apply_cart_settings
-    apply_cart_settings(party, quotation)
+    with stage("apply_cart_settings"):
+        apply_cart_settings(party, quotation)
 
     quotation.flags.ignore_permissions = True
     quotation.payment_schedule = []
     
     if not empty_card:
-        quotation.save()
+        with stage("quotation.save"):
+            quotation.save()
+        return quotation
+
+    quotation.delete()
+    cart_summary.set_summary(None)
+    return None
+
+
+def _split_conflicts(lines, changes, version=None):
+    """Separate changes that can be merged from those whose line changed since the client saw it
+
+    Nothing conflicts while the client's version is current. Otherwise a
+    change carrying base_qty conflicts when its line now has a different
+    quantity, unless that is already the requested one.
+
+    Returns:
+        tuple: (changes to apply, [{item_code, qty, requested_qty}])
+    """
+    if version and version == get_cart_version():
+        return changes, []
+
+    current = {}
+    for line in lines or []:
+        current.setdefault(line.item_code, flt(line.qty))
+
+    merged, conflicts = [], []
+    for change in changes:
+        qty = current.get(change.item_code, 0)
+        if change.get("base_qty") is None or qty in (flt(change.base_qty), change.qty):
+            merged.append(change)
+        else:
+            conflicts.append({"item_code": change.item_code, "qty": qty, "requested_qty": change.qty})
+
+    return merged, conflicts
+
+
+def _apply_cart_change(quotation, change):
+    """Add, update or remove (qty 0) one line of the cart Quotation"""
+    if change.qty == 0:
+        quotation.set("items", quotation.get("items", {"item_code": ["!=", change.item_code]}))
+        return
+
+    quotation_items = quotation.get("items", {"item_code": change.item_code})
+    if not quotation_items:
+        quotation.append(
+            "items",
+            {
+                "doctype": "Quotation Item",
+                "item_code": change.item_code,
+                "qty": change.qty,
+                "additional_notes": change.additional_notes,
+                "warehouse": change.warehouse,
+            },
+        )
     else:
-        quotation.delete()
-        quotation = None
+        quotation_items[0].qty = change.qty
+        quotation_items[0].warehouse = change.warehouse
+        quotation_items[0].additional_notes = change.additional_notes
+
+
+def _flush_pending_cart_changes(quotation, party):
+    """Save the buffered quantity changes of a cart Quotation, if there are any
 
+    Returns the saved cart, which is a reloaded document if the save had to be retried.
+    """
+    if not quotation or quotation.is_new() or not cart_coalescer.is_enabled():
+        return quotation
+
+    changes = cart_coalescer.pop_pending(quotation.name)
+    if not changes:
+        return quotation
+
+    quotation, _conflicts = _save_cart_changes_with_retry(quotation, party, changes)
+    return quotation
+
+
+def _update_guest_cart_store(party, changes, with_items=False, version=None):
+    """Update the cached guest cart without creating a Quotation"""
+    guest_id = get_guest_id()
+    changes, conflicts = _split_conflicts(guest_cart_store.get_cart(guest_id)["items"], changes, version)
+
+    cart = guest_cart_store.update_items(guest_id, changes)
+    quotation = _make_guest_cart_quotation(party, cart) if cart["items"] else None
+
+    cart_summary.set_summary(quotation)
     set_cart_count_allow_guest(quotation)
 
+    return _get_update_cart_response(quotation, with_items, conflicts)
+
+
+def _get_update_cart_response(quotation, with_items=False, conflicts=None):
+    """Build the update_cart response with either rendered fragments or the navbar menu
+
+    Conflicting changes that were not applied are listed under "conflicts".
+    """
     if cint(with_items):
         context = get_cart_quotation_allow_guest(quotation)
-        return {
+        response = {
             "items": frappe.render_template(
                 "templates/includes/cart/cart_items.html", context
             ),
@@ -195,32 +397,100 @@ def update_cart_allow_guest(item_code, qty, additional_notes=None, with_items=Fa
             ),
         }
     else:
-        return {
+        response = {
             "name": quotation.name if quotation else None,
             "shopping_cart_menu": get_shopping_cart_menu(quotation)
         }
 
+    response["version"] = get_cart_version()
+    if conflicts:
+        response["conflicts"] = conflicts
+    return response
+
 
 def set_cart_count_allow_guest(quotation=None):
-    """Set cart count in cookie for both guest and logged-in users"""
+    """Set cart count in cookie for both guest and logged-in users
+
+    Without a quotation the count comes from the cart summary cache, so no
+    cart is loaded or created just to write the cookie.
+    """
     from webshop.webshop.doctype.webshop_settings.webshop_settings import get_shopping_cart_settings
 
     if cint(get_shopping_cart_settings().enabled):
-        if not quotation:
-            quotation = _get_cart_quotation_for_guest_or_user()
-
-        cart_count = cstr(cint(quotation.get("total_qty"))) if quotation else "0"
+        summary = cart_summary.make_summary(quotation) if quotation else get_cart_summary()
+        cart_count = cstr(summary.count)
 
         if hasattr(frappe.local, "cookie_manager"):
             frappe.local.cookie_manager.set_cookie("cart_count", cart_count)
 
 
+def get_cart_version():
+    """Version of the shopper's cart page
+
+    Hashes the session user, the cart and its address names from the cart
+    summary stamp, and the Webshop Settings version.
+    """
+    summary = get_cart_summary()
+    settings_version = frappe.get_cached_doc("Webshop Settings").modified
+    key = "|".join(
+        str(value)
+        for value in (
+            frappe.session.user,
+            summary.quotation,
+            summary.customer_address,
+            summary.shipping_address_name,
+            summary.modified,
+            settings_version,
+        )
+    )
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def get_cart_summary():
+    """Return {quotation, count, total, modified} of the current shopper's cart
+
+    Served from cache; on a miss the open cart is read with a single query
+    (never loaded as a document) and the summary cached.
+    """
+    summary = cart_summary.get_summary()
+    if summary:
+        return summary
+
+    owner = cart_summary.get_cart_owner()
+    if not owner:
+        return cart_summary.make_summary(None)
+
+    party = get_guest_party()
+    if _uses_guest_cart_store(party):
+        cart = guest_cart_store.get_cart(get_guest_id())
+        quotation = _make_guest_cart_quotation(party, cart) if cart["items"] else None
+        return cart_summary.set_summary(quotation, owner)
+
+    if getattr(party, "is_guest", False):
+        filters = {"name": frappe.session.get("guest_quotation_name") or ""}
+    else:
+        filters = {"party_name": party.name}
+
+    cart = frappe.db.get_value(
+        "Quotation",
+        filters=dict(filters, order_type="Shopping Cart", docstatus=0),
+        fieldname=["name", "total_qty", "grand_total", "customer_address", "shipping_address_name", "modified"],
+        order_by="modified desc",
+        as_dict=True,
+    )
+    return cart_summary.set_summary(cart, owner)
+
+
 def _get_cart_quotation_for_guest_or_user(party=None):
     """Return the open Quotation of type Shopping Cart or make a new one"""
     if not party:
         party = get_guest_party()
 
     quotation = None
+
+    # Cached guest carts are only turned into a Quotation at checkout
+    if _uses_guest_cart_store(party):
+        return _make_guest_cart_quotation(party)
     
     # Handle true guest users differently (temporary party with no DB record)
     if getattr(party, "is_guest", False) and party.name.startswith("TMP-"):
@@ -247,24 +517,14 @@ def _get_cart_quotation_for_guest_or_user(party=None):
         
         if quotation_name:
             quotation = frappe.get_doc("Quotation", quotation_name)
+
+    if quotation and cart_coalescer.is_enabled():
+        cart_coalescer.overlay_pending(quotation)
     
     # Create new quotation if none exists
     if not quotation:
-        company = frappe.db.get_single_value("Webshop Settings", "company")
-        
         # Create new quotation
-        qdoc = frappe.get_doc({
-            "doctype": "Quotation",
-            "naming_series": get_shopping_cart_settings().quotation_series or "QTN-CART-",
-            "quotation_to": "Customer",
-            "company": company,
-            "order_type": "Shopping Cart",
-            "status": "Draft",
-            "docstatus": 0,
-            "__islocal": 1,
-            "party_name": party.name if not getattr(party, "is_guest", False) else None,
-            "contact_email": frappe.session.user if frappe.session.user != "Guest" else ""
-        })
+        qdoc = _new_cart_quotation(party)
 
         # Only set contact person for logged-in users
         if not getattr(party, "is_guest", False):
@@ -272,18 +532,21 @@ def _get_cart_quotation_for_guest_or_user(party=None):
                 "Contact", {"email_id": frappe.session.user}
             )
 
-        qdoc.flags.ignore_permissions = True
-        qdoc.run_method("set_missing_values")
+        with stage("set_missing_values"):
+            qdoc.run_method("set_missing_values")
         
         # Clear payment schedule to prevent grand_total None error
         qdoc.payment_schedule = []
         
         # Apply cart settings
         from webshop.webshop.shopping_cart.cart import apply_cart_settings
-        apply_cart_settings(party, qdoc)
+        with stage("apply_cart_settings"):
+            apply_cart_settings(party, qdoc)
         
         # Insert the quotation
-        qdoc.insert(ignore_permissions=True)
+        with stage("quotation.insert"):
+            qdoc.insert(ignore_permissions=True)
+        cart_summary.set_summary(qdoc)
         
         quotation = qdoc
         
@@ -294,6 +557,73 @@ def _get_cart_quotation_for_guest_or_user(party=None):
     return quotation
 
 
+def _new_cart_quotation(party):
+    """Return an unsaved Shopping Cart Quotation for the party"""
+    cart_settings = get_shopping_cart_settings()
+
+    qdoc = frappe.get_doc({
+        "doctype": "Quotation",
+        "naming_series": cart_settings.quotation_series or "QTN-CART-",
+        "quotation_to": "Customer",
+        "company": cart_settings.company,
+        "order_type": "Shopping Cart",
+        "status": "Draft",
+        "docstatus": 0,
+        "__islocal": 1,
+        "party_name": party.name if not getattr(party, "is_guest", False) else None,
+        "contact_email": frappe.session.user if frappe.session.user != "Guest" else ""
+    })
+    qdoc.flags.ignore_permissions = True
+
+    return qdoc
+
+
+def _uses_guest_cart_store(party):
+    """Check if the party is an anonymous guest whose cart lives in cache"""
+    return (
+        getattr(party, "is_guest", False)
+        and party.name.startswith("TMP-")
+        and guest_cart_store.is_enabled()
+    )
+
+
+def _make_guest_cart_quotation(party, cart=None):
+    """Build an unsaved Quotation from the cached guest cart
+
+    Totals are taken from the cached rates so rendering the cart never
+    touches the database. Saving the returned document inserts it, which
+    only happens in complete_guest_checkout.
+    """
+    if cart is None:
+        cart = guest_cart_store.get_cart(get_guest_id())
+
+    qdoc = _new_cart_quotation(party)
+    cart_settings = get_shopping_cart_settings()
+    if cart_settings.price_list:
+        qdoc.selling_price_list = cart_settings.price_list
+        qdoc.currency = frappe.get_cached_value("Price List", cart_settings.price_list, "currency")
+
+    for item in cart["items"]:
+        qdoc.append("items", {
+            "doctype": "Quotation Item",
+            "item_code": item.item_code,
+            "item_name": item.item_name,
+            "qty": item.qty,
+            "rate": item.rate,
+            "amount": item.amount,
+            "additional_notes": item.additional_notes,
+            "warehouse": item.warehouse,
+        })
+
+    totals = guest_cart_store.get_totals(cart)
+    qdoc.total_qty = totals.total_qty
+    qdoc.total = qdoc.net_total = totals.total
+    qdoc.grand_total = qdoc.rounded_total = totals.grand_total
+    qdoc.payment_schedule = []
+
+    return qdoc
+
+
 @frappe.whitelist(allow_guest=True)
 def get_shopping_cart_menu(quotation=None):
     """Get shopping cart menu data for navbar"""
@@ -307,15 +637,19 @@ def get_shopping_cart_menu(quotation=None):
             "total": 0
         }
     
+    item_meta = get_item_meta([item.item_code for item in quotation.items])
+
     items = []
     for item in quotation.items:
+        meta = item_meta.get(item.item_code) or {}
         items.append({
             "item_code": item.item_code,
-            "item_name": item.item_name,
+            "item_name": item.item_name or meta.get("item_name"),
             "qty": item.qty,
             "rate": item.rate,
             "amount": item.amount,
-            "image": frappe.db.get_value("Item", item.item_code, "image")
+            "image": meta.get("image"),
+            "route": meta.get("route")
         })
     
     return {
@@ -326,7 +660,7 @@ def get_shopping_cart_menu(quotation=None):
 
 
 @frappe.whitelist(allow_guest=True)
-def complete_guest_checkout(guest_data, address_data, payment_method="Bookeey", delivery_area=None, delivery_charge=0):
+def complete_guest_checkout(guest_data, address_data, payment_method="Bookeey", delivery_area=None, delivery_charge=0, idempotency_key=None):
     """
     Complete checkout for guest user with delivery area support
     Creates or updates Customer with provided information and converts Quotation to Sales Order
@@ -336,8 +670,14 @@ def complete_guest_checkout(guest_data, address_data, payment_method="Bookeey",
         address_data: JSON string with {address_line1, city, state, country, pincode, phone}
         payment_method: Payment method (default: Bookeey)
         delivery_area: Delivery Area name from Delivery Area doctype
-        delivery_charge: Delivery charge amount
+        delivery_charge: Ignored - the charge is resolved from the Delivery Area rules
+        idempotency_key: Client generated key; repeat calls with the same key return the first result
     """
+    idempotency_key = idempotency.get_session_key(idempotency_key)
+    replayed = idempotency.get_replayed_response("complete_guest_checkout", idempotency_key)
+    if replayed:
+        return replayed
+
     try:
         # Parse JSON data
         if isinstance(guest_data, str):
@@ -361,188 +701,196 @@ def complete_guest_checkout(guest_data, address_data, payment_method="Bookeey",
         quotation_name = frappe.session.get("guest_quotation_name")
         if quotation_name:
             quotation = frappe.get_doc("Quotation", quotation_name) if frappe.db.exists("Quotation", quotation_name) else None
+
+        if quotation:
+            quotation = _flush_pending_cart_changes(quotation, get_guest_party())
+
+        if not quotation and guest_cart_store.is_enabled():
+            # Cached guest cart - the Quotation is only created now, at checkout
+            quotation = _make_guest_cart_quotation(get_guest_party())
         
         if not quotation or not quotation.items:
             frappe.throw(_("Cart is empty"))
+
+        if stock_check.is_enabled():
+            # Over-sold lines are refused before any document is written
+            with stage("validate_stock"):
+                stock_check.validate_stock(quotation.get("items"))
+
+        if checkout_jobs.is_enabled():
+            # Queued mode - the Quotation -> Sales Order -> Payment Entry chain runs in a worker
+            job_id = checkout_jobs.enqueue_checkout(
+                quotation, guest_data, address_data, payment_method, delivery_area, delivery_charge
+            )
+            _clear_guest_checkout_session()
+            result = {
+                "success": True,
+                "queued": True,
+                "job_id": job_id,
+                "message": _("Your order is being processed")
+            }
+        else:
+            result = _process_guest_checkout(
+                quotation, guest_data, address_data, payment_method, delivery_area, delivery_charge
+            )
+            _clear_guest_checkout_session()
+
+        if idempotency_key:
+            idempotency.set_result("complete_guest_checkout", idempotency_key, result)
+
+        return result
         
-        # Get or create customer using mobile number as primary identifier
+    except Exception as e:
+        if idempotency_key:
+            idempotency.release("complete_guest_checkout", idempotency_key)
+        frappe.log_error(frappe.get_traceback(), "Guest Checkout Error")
+        frappe.throw(_("Checkout failed: {0}").format(str(e)))
+
+
+def _process_guest_checkout(quotation, guest_data, address_data, payment_method="Bookeey", delivery_area=None, delivery_charge=0):
+    """Convert the guest cart Quotation into a submitted Sales Order and Payment Entry
+
+    Runs inline from complete_guest_checkout, or from a background worker
+    when checkout is queued.
+    """
+    # Get or create customer using mobile number as primary identifier
+    with stage("get_guest_party"):
         party = get_guest_party(
             mobile_no=guest_data['mobile'], 
             email=guest_data['email'], 
             full_name=guest_data['full_name']
         )
-        
-        customer_name = party.name
-        
-        # Create or update address
+    
+    customer_name = party.name
+    
+    # Create or update address
+    with stage("create_or_update_address"):
         address = create_or_update_address(customer_name, address_data)
-        
-        # Update quotation with real customer info
-        quotation.party_name = customer_name
-        quotation.customer_name = guest_data['full_name']
-        quotation.contact_email = guest_data['email']
-        quotation.contact_mobile = guest_data['mobile']
-        quotation.customer_address = address.name
-        quotation.address_display = address.get_display()
-        quotation.shipping_address_name = address.name
-        quotation.shipping_address = address.get_display()
-        
-        # Add delivery charges if provided
-        if delivery_area and flt(delivery_charge) > 0:
-            # Get delivery area details
-            delivery_area_doc = frappe.get_doc("Delivery Area", delivery_area)
-            
-            # Check webshop settings for delivery charges account
-            webshop_settings = frappe.get_cached_doc("Webshop Settings")
-            delivery_charges_account = webshop_settings.get("delivery_charges_account")
-            
-            if delivery_charges_account:
-                # Remove existing delivery charges if any
-                existing_taxes = []
-                for tax in quotation.get("taxes", []):
-                    if "Delivery Charges" not in tax.description:
-                        existing_taxes.append(tax)
-                
-                quotation.taxes = existing_taxes
-                
-                # Add delivery charge as tax
-                quotation.append("taxes", {
-                    "charge_type": "Actual",
-                    "account_head": delivery_charges_account,
-                    "description": f"Delivery Charges - {delivery_area_doc.area}",
-                    "tax_amount": flt(delivery_charge)
-                })
-            else:
-                # Fallback to item-based charges if tax account not set
-                delivery_item_exists = False
-                
-                # Check if delivery charge item already exists
-                for item in quotation.items:
-                    if item.item_code == "Delivery Charges":
-                        item.rate = flt(delivery_charge)
-                        item.amount = flt(delivery_charge)
-                        delivery_item_exists = True
-                        break
-                
-                if not delivery_item_exists and frappe.db.exists("Item", "Delivery Charges"):
-                    quotation.append("items", {
-                        "item_code": "Delivery Charges",
-                        "item_name": f"Delivery Charges - {delivery_area_doc.area}",
-                        "description": f"Delivery to {delivery_area_doc.area}",
-                        "qty": 1,
-                        "rate": flt(delivery_charge),
-                        "amount": flt(delivery_charge)
-                    })
-        
-        # Apply cart settings with real customer
-        real_party = frappe.get_doc("Customer", customer_name)
-        from webshop.webshop.shopping_cart.cart import apply_cart_settings
+    
+    # Update quotation with real customer info
+    quotation.party_name = customer_name
+    quotation.customer_name = guest_data['full_name']
+    quotation.contact_email = guest_data['email']
+    quotation.contact_mobile = guest_data['mobile']
+    quotation.customer_address = address.name
+    quotation.address_display = address.get_display()
+    quotation.shipping_address_name = address.name
+    quotation.shipping_address = address.get_display()
+    
+    # Delivery charge is resolved server side from the area's rules; the
+    # client-sent delivery_charge is only kept for older callers
+    if delivery_area:
+        from guest_checkout.delivery import apply_delivery_charge
+        delivery_charge = apply_delivery_charge(quotation, delivery_area)
+    
+    # Apply cart settings with real customer
+    real_party = frappe.get_doc("Customer", customer_name)
+    from webshop.webshop.shopping_cart.cart import apply_cart_settings
+    with stage("apply_cart_settings"):
         apply_cart_settings(real_party, quotation)
-        
+    
+    direct = direct_checkout.is_enabled()
+    if direct:
+        # Fast path - the priced cart goes straight into the Sales Order
+        with stage("make_sales_order"):
+            sales_order = direct_checkout.make_sales_order(quotation)
+    else:
         quotation.flags.ignore_permissions = True
-        quotation.save()
+        with stage("quotation.save"):
+            quotation.save()
         
         # Submit quotation
-        quotation.submit()
+        with stage("quotation.submit"):
+            quotation.submit()
         
         # Create Sales Order from Quotation
         from erpnext.selling.doctype.quotation.quotation import _make_sales_order
-        sales_order = frappe.get_doc(_make_sales_order(quotation.name))
-        sales_order.customer = customer_name
-        sales_order.customer_name = guest_data['full_name']
-        sales_order.contact_email = guest_data['email']
-        sales_order.contact_mobile = guest_data['mobile']
-        sales_order.customer_address = address.name
-        sales_order.address_display = address.get_display()
-        sales_order.shipping_address_name = address.name
-        sales_order.shipping_address = address.get_display()
-        
-        # Add delivery area if custom field exists
-        if delivery_area and frappe.db.exists("Custom Field", {"dt": "Sales Order", "fieldname": "delivery_area"}):
-            sales_order.set("delivery_area", delivery_area)
-        
-        sales_order.flags.ignore_permissions = True
+        with stage("make_sales_order"):
+            sales_order = frappe.get_doc(_make_sales_order(quotation.name))
+    sales_order.customer = customer_name
+    sales_order.customer_name = guest_data['full_name']
+    sales_order.contact_email = guest_data['email']
+    sales_order.contact_mobile = guest_data['mobile']
+    sales_order.customer_address = address.name
+    sales_order.address_display = address.get_display()
+    sales_order.shipping_address_name = address.name
+    sales_order.shipping_address = address.get_display()
+    
+    # Add delivery area if custom field exists
+    if delivery_area and frappe.db.exists("Custom Field", {"dt": "Sales Order", "fieldname": "delivery_area"}):
+        sales_order.set("delivery_area", delivery_area)
+    
+    sales_order.flags.ignore_permissions = True
+    with stage("sales_order.insert"):
         sales_order.insert(ignore_permissions=True)
+    with stage("sales_order.submit"):
         sales_order.submit()
-        
-        # Create Payment Entry
-        payment_entry = create_payment_entry(sales_order, payment_method)
-        
-        # Clear guest session
-        if frappe.session.get("guest_id"):
-            frappe.session.pop("guest_id")
-        
-        set_cart_count_allow_guest(None)
-        
-        return {
-            "success": True,
-            "customer": customer_name,
-            "sales_order": sales_order.name,
-            "payment_entry": payment_entry.name if payment_entry else None,
-            "grand_total": sales_order.grand_total,
-            "delivery_charge": delivery_charge,
-            "delivery_area": delivery_area,
-            "message": _("Order placed successfully!")
-        }
-        
-    except Exception as e:
-        frappe.log_error(frappe.get_traceback(), "Guest Checkout Error")
-        frappe.throw(_("Checkout failed: {0}").format(str(e)))
+    
+    if direct:
+        with stage("drop_cart"):
+            direct_checkout.drop_cart(quotation)
+    
+    # Create Payment Entry, unless the gateway callback will have it posted
+    payment_entry = None
+    payment_pending = payments.is_deferred()
+    if not payment_pending:
+        with stage("create_payment_entry"):
+            payment_entry = create_payment_entry(sales_order, payment_method)
+    
+    return {
+        "success": True,
+        "customer": customer_name,
+        "sales_order": sales_order.name,
+        "payment_entry": payment_entry.name if payment_entry else None,
+        "payment_pending": payment_pending,
+        "grand_total": sales_order.grand_total,
+        "delivery_charge": delivery_charge,
+        "delivery_area": delivery_area,
+        "message": _("Order placed successfully!")
+    }
+
+
+def _clear_guest_checkout_session():
+    """Drop the guest cart and session references once checkout has taken the cart"""
+    cart_summary.clear_summary()
+    if frappe.session.get("guest_id"):
+        guest_cart_store.delete_cart(frappe.session.get("guest_id"))
+        frappe.session.pop("guest_id")
+    frappe.session.pop("guest_quotation_name", None)
+
+    set_cart_count_allow_guest(None)
+
+
+def _restore_guest_checkout_session(guest_id=None, quotation_name=None):
+    """Give the guest back the cart a failed queued checkout had taken, unless they started another one"""
+    if frappe.session.get("guest_quotation_name"):
+        return
+
+    current_guest_id = frappe.session.get("guest_id")
+    if current_guest_id and current_guest_id != guest_id and guest_cart_store.get_cart(current_guest_id)["items"]:
+        return
+
+    if guest_id:
+        frappe.session["guest_id"] = guest_id
+    if quotation_name and frappe.db.exists("Quotation", {"name": quotation_name, "docstatus": 0}):
+        frappe.session["guest_quotation_name"] = quotation_name
+
+    cart_summary.clear_summary()
+    set_cart_count_allow_guest()
 
 
 def create_or_update_address(customer_name, address_data):
-    """Create or update address for customer"""
-    existing_address = frappe.db.get_value(
-        "Address",
-        {
-            "address_line1": address_data['address_line1'],
-            "city": address_data['city'],
-            "pincode": address_data.get('pincode')
-        },
-        "name"
-    )
-    
-    if existing_address:
-        address = frappe.get_doc("Address", existing_address)
-        if not any(link.link_doctype == "Customer" and link.link_name == customer_name for link in address.links):
-            address.append("links", {
-                "link_doctype": "Customer",
-                "link_name": customer_name
-            })
-            address.flags.ignore_permissions = True
-            address.save()
-    else:
-        address = frappe.get_doc({
-            "doctype": "Address",
-            "address_title": customer_name,
-            "address_type": "Billing",
-            "address_line1": address_data['address_line1'],
-            "address_line2": address_data.get('address_line2', ''),
-            "city": address_data['city'],
-            "state": address_data.get('state', ''),
-            "country": address_data['country'],
-            "pincode": address_data.get('pincode', ''),
-            "phone": address_data.get('phone', ''),
-            "email_id": address_data.get('email', ''),
-            "links": [{
-                "link_doctype": "Customer",
-                "link_name": customer_name
-            }]
-        })
-        address.flags.ignore_permissions = True
-        address.insert(ignore_permissions=True)
-    
-    return address
+    """Create or update address for customer
+
+    Repeat orders to the same address reuse it through the address fingerprint.
+    """
+    return get_or_create_address(customer_name, address_data, address_type="Billing")
 
 
 def create_payment_entry(sales_order, payment_method="Bookeey"):
     """Create payment entry for sales order"""
     try:
-        payment_gateway_account = frappe.db.get_value(
-            "Payment Gateway Account",
-            {"payment_gateway": payment_method},
-            ["name", "payment_account"]
-        )
+        payment_gateway_account = payments.get_gateway_account(payment_method)
         
         if not payment_gateway_account:
             frappe.log_error(f"Payment Gateway Account not found for {payment_method}", "Payment Entry Creation")
@@ -566,54 +914,18 @@ def create_payment_entry(sales_order, payment_method="Bookeey"):
 
 
 def cleanup_guest_quotations():
-    """Delete abandoned guest quotations and customers older than 7 days"""
-    from frappe.utils import add_days
-    
-    old_date = add_days(nowdate(), -7)
-    
-    # Delete old guest quotations
-    guest_quotations = frappe.get_all(
-        "Quotation",
-        filters={
-            "modified": ["<", old_date],
-            "docstatus": 0,
-            "party_name": ["in", frappe.get_all("Customer", {"guest_checkout": 1}, pluck="name")]
-        },
-        pluck="name"
-    )
-    
-    for quotation_name in guest_quotations:
-        try:
-            frappe.delete_doc("Quotation", quotation_name, force=1, ignore_permissions=True)
-        except Exception as e:
-            frappe.log_error(f"Error deleting quotation {quotation_name}: {str(e)}", "Guest Quotation Cleanup")
-    
-    # Delete old temporary guest customers (no orders)
-    guest_customers = frappe.get_all(
-        "Customer",
-        filters={
-            "modified": ["<", old_date],
-            "guest_checkout": 1
-        },
-        pluck="name"
-    )
-    
-    for customer_name in guest_customers:
-        try:
-            # Only delete if no sales orders exist
-            has_orders = frappe.db.exists("Sales Order", {"customer": customer_name})
-            if not has_orders:
-                frappe.delete_doc("Customer", customer_name, force=1, ignore_permissions=True)
-        except Exception as e:
-            frappe.log_error(f"Error deleting customer {customer_name}: {str(e)}", "Guest Customer Cleanup")
-    
-    frappe.db.commit()
-    
-    if guest_quotations or guest_customers:
-        frappe.logger().info(f"Cleaned up {len(guest_quotations)} quotations and {len(guest_customers)} guest customers")
+    """Delete abandoned guest quotations and customers older than 7 days
+
+    Runs the chunked cleanup engine; a run that hits its time budget is
+    resumed by the next scheduled run.
+    """
+    from guest_checkout.cleanup import run_cleanup
+
+    return run_cleanup(retention_days=7)
 
 
 def get_delivery_areas_for_context(context):
     """Add delivery areas to context for guest checkout form"""
     if frappe.session.user == "Guest":
-        context.delivery_areas = frappe.get_all("Delivery Area", fields=["name", "area", "delivery_charge"])
+        from guest_checkout.delivery import get_delivery_area_catalog
+        context.delivery_areas = get_delivery_area_catalog()
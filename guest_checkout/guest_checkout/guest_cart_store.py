@@ -0,0 +1,112 @@
+# guest_checkout/guest_checkout/guest_cart_store.py
+import frappe
+from frappe.utils import cint, flt, now
+from guest_checkout.item_meta import get_item_meta
+
+
+# Guest carts live in cache under one key per guest_id so abandoned carts
+# expire on their own instead of leaving draft Quotations behind
+CART_CACHE_PREFIX = "guest_checkout:cart"
+CART_EXPIRY = 7 * 24 * 60 * 60
+
+
+def is_enabled():
+    """Check if anonymous carts should be kept in cache instead of draft Quotations"""
+    return bool(cint(frappe.get_cached_doc("Webshop Settings").get("guest_cart_in_cache")))
+
+
+def get_cart(guest_id):
+    """Return the cached cart for a guest, or an empty cart"""
+    cart = frappe.cache().get_value(_get_cart_key(guest_id)) if guest_id else None
+    if not cart:
+        cart = {"items": [], "modified": None}
+
+    cart = frappe._dict(cart)
+    cart["items"] = [frappe._dict(item) for item in cart.get("items") or []]
+    return cart
+
+
+def save_cart(guest_id, cart):
+    """Write the cart back to cache, dropping the key once the cart is empty"""
+    if not cart.get("items"):
+        delete_cart(guest_id)
+        return
+
+    cart["modified"] = now()
+    frappe.cache().set_value(
+        _get_cart_key(guest_id),
+        {"items": [dict(item) for item in cart["items"]], "modified": cart["modified"]},
+        expires_in_sec=CART_EXPIRY,
+    )
+
+
+def delete_cart(guest_id):
+    """Remove the cached cart for a guest"""
+    if guest_id:
+        frappe.cache().delete_value(_get_cart_key(guest_id))
+
+
+def update_items(guest_id, changes):
+    """Apply a list of {item_code, qty, additional_notes, warehouse} changes and save once
+
+    The rate is looked up once when a line is first added, so reading
+    the cart and its totals afterwards never needs the database.
+    """
+    cart = get_cart(guest_id)
+    existing_codes = {item.item_code for item in cart["items"]}
+    item_meta = get_item_meta([
+        change["item_code"] for change in changes
+        if flt(change.get("qty")) and change["item_code"] not in existing_codes
+    ])
+
+    for change in changes:
+        item_code = change["item_code"]
+        qty = flt(change.get("qty"))
+        existing = next((item for item in cart["items"] if item.item_code == item_code), None)
+
+        if qty == 0:
+            cart["items"] = [item for item in cart["items"] if item.item_code != item_code]
+        elif existing:
+            existing.qty = qty
+            existing.warehouse = change.get("warehouse")
+            existing.additional_notes = change.get("additional_notes")
+            existing.amount = flt(existing.rate) * qty
+        else:
+            rate = get_item_rate(item_code)
+            cart["items"].append(
+                frappe._dict(
+                    {
+                        "item_code": item_code,
+                        "item_name": (item_meta.get(item_code) or {}).get("item_name") or item_code,
+                        "qty": qty,
+                        "rate": rate,
+                        "amount": rate * qty,
+                        "additional_notes": change.get("additional_notes"),
+                        "warehouse": change.get("warehouse"),
+                    }
+                )
+            )
+
+    save_cart(guest_id, cart)
+    return cart
+
+
+def get_totals(cart):
+    """Compute cart totals from the cached lines"""
+    total_qty = sum(flt(item.qty) for item in cart.get("items") or [])
+    total = sum(flt(item.qty) * flt(item.rate) for item in cart.get("items") or [])
+
+    return frappe._dict({"total_qty": total_qty, "total": total, "grand_total": total})
+
+
+def get_item_rate(item_code):
+    """Get the website price for an item using the webshop price list"""
+    from webshop.webshop.shopping_cart.product_info import get_product_info_for_website
+
+    product_info = get_product_info_for_website(item_code, skip_quotation_creation=True)
+    price = (product_info.get("product_info") or {}).get("price") or {}
+    return flt(price.get("price_list_rate"))
+
+
+def _get_cart_key(guest_id):
+    return f"{CART_CACHE_PREFIX}:{guest_id}"
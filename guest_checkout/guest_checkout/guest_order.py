@@ -1,13 +1,26 @@
 import frappe
 from frappe import _
+from guest_checkout import idempotency, stock_check
+from guest_checkout.catalog_index import resolve_website_item, resolve_website_items
+from guest_checkout.customer_identity import resolve_customer
+from guest_checkout.delivery import DELIVERY_ITEM_CODE, get_cart_delivery_charge
+from guest_checkout.delivery import get_delivery_charge as resolve_delivery_charge
+from guest_checkout.guest_address import get_or_create_address
+from guest_checkout.instrumentation import stage
 
 @frappe.whitelist(allow_guest=True)
-def create_guest_sales_order(guest_data, cart_items):
+def create_guest_sales_order(guest_data, cart_items, idempotency_key=None):
     """
     Guest checkout for SA7BA website.
     Uses mobile number as unique identifier.
-    Delivery Area doctype fields: area_name, delivery_charges
+    delivery_area is a Delivery Area name or label; its charge follows the area's rules.
+    A repeated idempotency_key returns the first order instead of creating another.
     """
+    idempotency_key = idempotency.get_session_key(idempotency_key)
+    replayed = idempotency.get_replayed_response("create_guest_sales_order", idempotency_key)
+    if replayed:
+        return replayed
+
     try:
         frappe.flags.ignore_permissions = True
 
@@ -19,19 +32,26 @@ def create_guest_sales_order(guest_data, cart_items):
         if not guest_data.get("delivery_area"):
             frappe.throw(_("Please select delivery area (Jabriya/Hawally)."))
 
+        if stock_check.is_enabled():
+            with stage("validate_stock"):
+                validate_cart_stock(cart_items)
+
         # 2. GET/CREATE CUSTOMER BY MOBILE
         mobile = guest_data.get("phone").strip()
-        customer = get_or_create_customer_by_mobile(mobile, guest_data)
+        with stage("get_or_create_customer"):
+            customer = get_or_create_customer_by_mobile(mobile, guest_data)
         
         # 3. CREATE/UPDATE CONTACT AND ADDRESS
-        create_or_update_contact(customer.name, guest_data)
+        with stage("create_or_update_contact"):
+            create_or_update_contact(customer.name, guest_data)
 
         # 4. CREATE SALES ORDER WITH DELIVERY CHARGES
-        sales_order = create_sales_order(customer.name, cart_items, guest_data)
+        with stage("create_sales_order"):
+            sales_order = create_sales_order(customer.name, cart_items, guest_data)
         frappe.db.commit()
 
         # 5. RETURN SUCCESS
-        return {
+        result = {
             "success": True,
             "message": _("Order placed successfully. Order #{}").format(sales_order.name),
             "sales_order": sales_order.name,
@@ -39,11 +59,18 @@ def create_guest_sales_order(guest_data, cart_items):
             "customer": customer.customer_name,
             "customer_mobile": mobile,
             "delivery_area": guest_data.get("delivery_area"),
-            "delivery_charge": get_delivery_charge(guest_data.get("delivery_area"))
+            "delivery_charge": sales_order.flags.delivery_charge
         }
 
+        if idempotency_key:
+            idempotency.set_result("create_guest_sales_order", idempotency_key, result)
+
+        return result
+
     except Exception as e:
         frappe.db.rollback()
+        if idempotency_key:
+            idempotency.release("create_guest_sales_order", idempotency_key)
         return {"success": False, "message": str(e)}
     finally:
         frappe.flags.ignore_permissions = False
@@ -57,28 +84,15 @@ def get_or_create_customer_by_mobile(mobile, data):
     """
     clean_mobile = ''.join(filter(str.isdigit, mobile))
     
-    # Try to find existing customer by mobile number
-    customer_name = frappe.db.get_value("Customer", 
-                                       {"mobile_no": clean_mobile}, 
-                                       "name")
-    
-    if customer_name:
-        customer = frappe.get_doc("Customer", customer_name)
-        # Update name if provided and different
-        if data.get("full_name") and data.get("full_name") != customer.customer_name:
-            customer.customer_name = data.get("full_name")
-            customer.save(ignore_permissions=True)
-        return customer
+    # Resolve through the normalized identity key shared with the cart checkout
+    customer, created = resolve_customer(clean_mobile, data.get("email", ""), data.get("full_name"))
     
-    # CREATE NEW CUSTOMER
-    cust = frappe.new_doc("Customer")
-    cust.customer_name = data.get("full_name") or f"Customer-{clean_mobile[-4:]}"
-    cust.customer_type = "Individual"
-    cust.mobile_no = clean_mobile
-    cust.email_id = data.get("email", "")
+    # Update name if provided and different
+    if not created and data.get("full_name") and data.get("full_name") != customer.customer_name:
+        customer.customer_name = data.get("full_name")
+        customer.save(ignore_permissions=True)
     
-    cust.insert(ignore_permissions=True)
-    return cust
+    return customer
 
 
 def create_or_update_contact(customer_name, data):
@@ -129,6 +143,8 @@ def create_or_update_contact(customer_name, data):
 def create_address(customer_name, contact_name, data):
     """
     Create address with delivery area as city.
+    Reuses the customer's own address with the same fingerprint, so the
+    "Delivery to <area>" placeholder is one Address per customer and area.
     """
     address_line1 = data.get("shipping_address", {}).get("address_line1", "")
     delivery_area = data.get("delivery_area", "")
@@ -136,56 +152,45 @@ def create_address(customer_name, contact_name, data):
     if not address_line1:
         address_line1 = f"Delivery to {delivery_area}" if delivery_area else "Address"
     
-    addr = frappe.new_doc("Address")
-    addr.address_line1 = address_line1
-    
     # Use delivery area as city (Jabriya/Hawally)
-    if delivery_area:
-        addr.city = delivery_area
-    
-    addr.address_type = "Shipping"
-    addr.is_primary_address = 1
-    
-    # Link to customer
-    addr.append("links", {
-        "link_doctype": "Customer",
-        "link_name": customer_name
-    })
-    
-    # Link to contact
-    if contact_name:
-        addr.append("links", {
-            "link_doctype": "Contact",
-            "link_name": contact_name
-        })
+    address_data = {
+        "address_line1": address_line1,
+        "city": delivery_area or None,
+        "is_primary_address": 1
+    }
     
-    addr.insert(ignore_permissions=True)
+    return get_or_create_address(customer_name, address_data, address_type="Shipping", contact_name=contact_name)
 
 
-def get_delivery_charge(area_name):
+def get_delivery_charge(area_name, cart_total=0):
     """
-    Fetch delivery charge from Delivery Area doctype.
-    Fields: area_name, delivery_charges
+    Delivery charge of a Delivery Area (by name or label) for a cart total,
+    resolved from the cached delivery area catalog.
     """
-    if not area_name:
-        return 0
-    
-    # Get delivery charge by area_name
-    charge = frappe.db.get_value("Delivery Area", 
-                                {"area_name": area_name}, 
-                                "delivery_charges")
-    
-    return float(charge) if charge else 0
+    return resolve_delivery_charge(area_name, cart_total)
 
 
 def get_actual_item_code(website_item_code):
     """
     Convert Website Item code to actual Item code.
     """
-    actual_item_code = frappe.db.get_value("Website Item", 
-                                          website_item_code, 
-                                          "item_code")
-    return actual_item_code or website_item_code
+    return resolve_website_item(website_item_code).item_code
+
+
+def validate_cart_stock(cart_items):
+    """
+    Refuse over-sold items before the customer or order is created.
+    """
+    catalog = resolve_website_items([item.get("item_code") for item in cart_items])
+    stock_check.validate_stock([
+        {
+            "item_code": catalog[item.get("item_code")].item_code,
+            "qty": item.get("qty"),
+            "warehouse": catalog[item.get("item_code")].warehouse,
+        }
+        for item in cart_items
+        if item.get("item_code")
+    ])
 
 
 def create_sales_order(customer_name, cart_items, data):
@@ -197,22 +202,24 @@ def create_sales_order(customer_name, cart_items, data):
     so.order_type = "Sales"
     so.delivery_date = frappe.utils.add_days(frappe.utils.nowdate(), 7)
     
-    # Add cart items
+    # Add cart items, resolving all Website Items at once
+    catalog = resolve_website_items([item.get("item_code") for item in cart_items])
     for item in cart_items:
-        actual_item_code = get_actual_item_code(item.get("item_code"))
+        actual_item_code = catalog[item.get("item_code")].item_code
         so.append("items", {
             "item_code": actual_item_code,
             "qty": item.get("qty"),
             "rate": item.get("rate")
         })
     
-    # Add delivery charge based on selected area
+    # Add delivery charge based on selected area and the order's lines
     delivery_area = data.get("delivery_area")
-    delivery_charge = get_delivery_charge(delivery_area)
+    delivery_charge = get_cart_delivery_charge(delivery_area, so)
+    so.flags.delivery_charge = delivery_charge
     
     if delivery_charge > 0:
         so.append("items", {
-            "item_code": "Delivery Charges",  # Your service item code
+            "item_code": DELIVERY_ITEM_CODE,  # Your service item code
             "qty": 1,
             "rate": delivery_charge,
             "description": f"Delivery to {delivery_area}",
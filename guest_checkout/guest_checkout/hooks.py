@@ -32,10 +32,80 @@ website_context = {
 # Scheduled Tasks
 # ---------------
 # Daily cleanup of old guest quotations (older than 7 days)
+# Every minute: save buffered cart quantity changes of idle carts
 scheduler_events = {
     "daily": [
         "guest_checkout.guest_cart.cleanup_guest_quotations"
-    ]
+    ],
+    "cron": {
+        "* * * * *": [
+            "guest_checkout.cart_coalescer.flush_idle_carts",
+            "guest_checkout.payments.reconcile_payments"
+        ]
+    }
+}
+
+# Request Events
+# --------------
+# Per-guest rate limiting (Webshop Settings > Rate Limit Guest Endpoints) and
+# per-stage latency profiling of guest checkout endpoints (Webshop Settings > Profile Guest Checkout)
+before_request = [
+    "guest_checkout.rate_limit.check_rate_limit",
+    "guest_checkout.instrumentation.start_request_profile"
+]
+after_request = [
+    "guest_checkout.rate_limit.add_retry_after_header",
+    "guest_checkout.instrumentation.finish_request_profile"
+]
+
+# Session Events
+# --------------
+# Merge the guest cart into the user's cart when a guest logs in
+on_login = "guest_checkout.cart_merge.remember_guest_cart"
+on_session_creation = "guest_checkout.cart_merge.merge_guest_cart"
+
+# Document Events
+# ---------------
+# Invalidate cached cart line metadata and the catalog index when catalog data
+# changes, keep cached cart summaries in step with cart saves, orders and deletes,
+# and drop the cached gateway account mapping when an account changes
+doc_events = {
+    "Item": {
+        "on_update": [
+            "guest_checkout.item_meta.clear_item_meta_cache",
+            "guest_checkout.catalog_index.clear_catalog_index"
+        ],
+        "on_trash": [
+            "guest_checkout.item_meta.clear_item_meta_cache",
+            "guest_checkout.catalog_index.clear_catalog_index"
+        ]
+    },
+    "Website Item": {
+        "on_update": [
+            "guest_checkout.item_meta.clear_item_meta_cache",
+            "guest_checkout.catalog_index.clear_catalog_index"
+        ],
+        "on_trash": [
+            "guest_checkout.item_meta.clear_item_meta_cache",
+            "guest_checkout.catalog_index.clear_catalog_index"
+        ]
+    },
+    "Customer": {
+        "on_trash": "guest_checkout.customer_identity.clear_identity_cache",
+        "after_rename": "guest_checkout.customer_identity.clear_identity_cache"
+    },
+    "Address": {
+        "validate": "guest_checkout.guest_address.set_address_fingerprint"
+    },
+    "Quotation": {
+        "on_update": "guest_checkout.cart_summary.update_quotation_summary",
+        "on_submit": "guest_checkout.cart_summary.clear_quotation_summary",
+        "on_trash": "guest_checkout.cart_summary.clear_quotation_summary"
+    },
+    "Payment Gateway Account": {
+        "on_update": "guest_checkout.payments.clear_gateway_accounts",
+        "on_trash": "guest_checkout.payments.clear_gateway_accounts"
+    }
 }
 
 # Overriding Methods
@@ -0,0 +1,102 @@
+# guest_checkout/guest_checkout/idempotency.py
+import pickle
+
+import frappe
+from frappe import _
+
+
+# Results of order-creating calls are kept per session and client-generated
+# key so a double click or client retry gets the original order back, and a
+# key seen by one guest can never replay another guest's order
+IDEMPOTENCY_CACHE_PREFIX = "guest_checkout:idempotency"
+IDEMPOTENCY_EXPIRY = 24 * 60 * 60
+PENDING_EXPIRY = 10 * 60
+
+
+def get_session_key(key):
+    """Scope a client key to the calling guest or user
+
+    Resolve it once at the start of a request - checkout drops the guest id
+    from the session before the result is stored.
+    """
+    if not key:
+        return None
+
+    if frappe.session.user == "Guest":
+        from guest_checkout.guest_cart import get_guest_id
+
+        owner = get_guest_id()
+    else:
+        owner = frappe.session.user
+
+    return f"{owner}:{key}"
+
+
+def get_result(scope, key):
+    """Return the stored response for a key, a pending marker, or None"""
+    if not key:
+        return None
+
+    return frappe.cache().get_value(_get_key(scope, key))
+
+
+def claim(scope, key):
+    """Atomically mark a key as in progress
+
+    Returns:
+        bool: True if this call owns the key and should do the work
+    """
+    cache = frappe.cache()
+    return bool(
+        cache.set(
+            cache.make_key(_get_key(scope, key)),
+            pickle.dumps({"pending": True}),
+            ex=PENDING_EXPIRY,
+            nx=True,
+        )
+    )
+
+
+def set_result(scope, key, result):
+    """Store the response for a key once the work has been committed
+
+    A rolled back request releases the claim instead, so a retry is never
+    answered with an order that does not exist.
+    """
+    cache_key = _get_key(scope, key)
+    frappe.db.after_commit.add(
+        lambda: frappe.cache().set_value(cache_key, result, expires_in_sec=IDEMPOTENCY_EXPIRY)
+    )
+    frappe.db.after_rollback.add(lambda: frappe.cache().delete_value(cache_key))
+
+
+def release(scope, key):
+    """Drop a claim after a failure so the client can retry with the same key"""
+    frappe.cache().delete_value(_get_key(scope, key))
+
+
+def get_replayed_response(scope, key):
+    """Claim the key, or return the response a repeat call should get
+
+    Returns None when the caller owns the key and should run the work.
+    """
+    if not key:
+        return None
+
+    stored = get_result(scope, key)
+    if stored is None and claim(scope, key):
+        return None
+
+    stored = stored or get_result(scope, key)
+    if not stored or stored.get("pending"):
+        return {
+            "success": False,
+            "pending": True,
+            "message": _("This order is already being processed"),
+        }
+
+    return stored
+
+
+def _get_key(scope, key):
+    return f"{IDEMPOTENCY_CACHE_PREFIX}:{scope}:{key}"
@@ -0,0 +1,302 @@
+# guest_checkout/guest_checkout/instrumentation.py
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint, flt
+
+
+# Per-endpoint and per-stage latency histograms are aggregated in cache hashes
+PROFILE_CACHE_PREFIX = "guest_checkout:profile"
+PROFILE_ENDPOINTS_KEY = f"{PROFILE_CACHE_PREFIX}:endpoints"
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+API_METHOD_PREFIX = "/api/method/"
+
+
+def is_enabled():
+    """Check if guest checkout endpoints should be profiled"""
+    return bool(cint(frappe.get_cached_doc("Webshop Settings").get("profile_guest_checkout")))
+
+
+def start_request_profile():
+    """before_request hook - start profiling calls to guest checkout endpoints"""
+    endpoint = _get_request_endpoint()
+    if endpoint and is_enabled():
+        start_profile(endpoint)
+
+
+def finish_request_profile(response=None, request=None):
+    """after_request hook - record the profile of the finished request"""
+    finish_profile()
+
+
+@contextmanager
+def profile(endpoint):
+    """Profile a block outside of a web request, e.g. a background job"""
+    if not is_enabled():
+        yield
+        return
+
+    start_profile(endpoint)
+    try:
+        yield
+    finally:
+        finish_profile()
+
+
+@contextmanager
+def stage(name):
+    """Record wall time, query count and DB time of a stage in the current profile
+
+    A no-op when nothing is being profiled, so stages can wrap hot code paths.
+    """
+    current = getattr(frappe.local, "guest_checkout_profile", None)
+    if not current:
+        yield
+        return
+
+    started = time.perf_counter()
+    queries, db_time = current.queries, current.db_time
+    try:
+        yield
+    finally:
+        stats = current.stages.setdefault(name, frappe._dict({"wall": 0.0, "queries": 0, "db_time": 0.0}))
+        stats.wall += time.perf_counter() - started
+        stats.queries += current.queries - queries
+        stats.db_time += current.db_time - db_time
+
+
+def start_profile(endpoint):
+    frappe.local.guest_checkout_profile = frappe._dict({
+        "endpoint": endpoint,
+        "started": time.perf_counter(),
+        "queries": 0,
+        "db_time": 0.0,
+        "stages": {},
+    })
+    _patch_db_sql()
+
+
+def finish_profile():
+    current = getattr(frappe.local, "guest_checkout_profile", None)
+    if not current:
+        return
+
+    frappe.local.guest_checkout_profile = None
+    _unpatch_db_sql()
+
+    try:
+        _record_profile(current, time.perf_counter() - current.started)
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Guest Checkout Profiling Error")
+
+
+@frappe.whitelist()
+def get_checkout_profile():
+    """Return aggregated latency histograms for guest checkout endpoints (System Manager only)"""
+    frappe.only_for("System Manager")
+    return _get_profiles()
+
+
+@frappe.whitelist()
+def get_checkout_metrics():
+    """Return the aggregated histograms in Prometheus text format (System Manager only)"""
+    from werkzeug.wrappers import Response
+
+    frappe.only_for("System Manager")
+
+    profiles = _get_profiles()
+    lines = []
+    for metric, help_text in [
+        ("guest_checkout_request_seconds", "Guest checkout endpoint wall time"),
+        ("guest_checkout_stage_seconds", "Guest checkout stage wall time"),
+    ]:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+
+        for endpoint, data in profiles.items():
+            series = [({"endpoint": endpoint}, data["wall"])] if metric == "guest_checkout_request_seconds" else [
+                ({"endpoint": endpoint, "stage": stage_name}, stats["wall"])
+                for stage_name, stats in data["stages"].items()
+            ]
+            for labels, histogram in series:
+                lines.extend(_format_prometheus_histogram(metric, labels, histogram))
+
+    for metric, field, help_text in [
+        ("guest_checkout_db_queries_total", "queries", "Database queries run by guest checkout endpoints"),
+        ("guest_checkout_db_seconds_total", "db_time", "Database time spent in guest checkout endpoints"),
+    ]:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for endpoint, data in profiles.items():
+            lines.append(f'{metric}{{endpoint="{endpoint}"}} {data[field]}')
+
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+@frappe.whitelist()
+def reset_checkout_profile():
+    """Clear all aggregated profiles (System Manager only)"""
+    frappe.only_for("System Manager")
+
+    cache = frappe.cache()
+    for endpoint in _get_endpoints():
+        cache.delete(cache.make_key(_get_profile_key(endpoint)))
+    cache.delete(cache.make_key(PROFILE_ENDPOINTS_KEY))
+
+
+def _get_request_endpoint():
+    """Resolve the guest checkout method a web request will run, if any"""
+    request = getattr(frappe.local, "request", None)
+    method = frappe.form_dict.get("cmd")
+    if not method and request and request.path.startswith(API_METHOD_PREFIX):
+        method = request.path[len(API_METHOD_PREFIX):].strip("/")
+
+    if not method:
+        return None
+
+    overrides = frappe.get_hooks("override_whitelisted_methods") or {}
+    if method in overrides:
+        method = overrides[method][-1]
+
+    return method if method.startswith("guest_checkout.") else None
+
+
+def _patch_db_sql():
+    """Count and time every query of the profiled request
+
+    Same approach as frappe.recorder: wrap sql on the request's db object.
+    """
+    db = frappe.db
+    if not db or getattr(db, "_guest_checkout_sql", None):
+        return
+
+    original_sql = db.sql
+
+    def sql(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original_sql(*args, **kwargs)
+        finally:
+            current = getattr(frappe.local, "guest_checkout_profile", None)
+            if current:
+                current.queries += 1
+                current.db_time += time.perf_counter() - started
+
+    db._guest_checkout_sql = original_sql
+    db.sql = sql
+
+
+def _unpatch_db_sql():
+    db = frappe.db
+    original_sql = getattr(db, "_guest_checkout_sql", None) if db else None
+    if original_sql:
+        db.sql = original_sql
+        db._guest_checkout_sql = None
+
+
+def _record_profile(current, wall):
+    cache = frappe.cache()
+    key = cache.make_key(_get_profile_key(current.endpoint))
+
+    pipe = cache.pipeline()
+    pipe.sadd(cache.make_key(PROFILE_ENDPOINTS_KEY), current.endpoint)
+    _add_observation(pipe, key, "wall", wall)
+    pipe.hincrby(key, "queries", current.queries)
+    pipe.hincrbyfloat(key, "db_time", current.db_time)
+
+    for stage_name, stats in current.stages.items():
+        _add_observation(pipe, key, f"stage:{stage_name}", stats.wall)
+        pipe.hincrby(key, f"stage:{stage_name}:queries", stats.queries)
+        pipe.hincrbyfloat(key, f"stage:{stage_name}:db_time", stats.db_time)
+
+    pipe.execute()
+
+
+def _add_observation(pipe, key, prefix, seconds):
+    milliseconds = seconds * 1000
+    bucket = next((str(bound) for bound in LATENCY_BUCKETS if milliseconds <= bound), "inf")
+
+    pipe.hincrby(key, f"{prefix}:count", 1)
+    pipe.hincrbyfloat(key, f"{prefix}:sum", seconds)
+    pipe.hincrby(key, f"{prefix}:le_{bucket}", 1)
+
+
+def _get_profiles():
+    cache = frappe.cache()
+    profiles = {}
+
+    for endpoint in sorted(_get_endpoints()):
+        # Counters are raw hincrby values, so bypass the unpickling hgetall wrapper
+        pipe = cache.pipeline()
+        pipe.hgetall(cache.make_key(_get_profile_key(endpoint)))
+        (counters,) = pipe.execute()
+        raw = {frappe.safe_decode(field): frappe.safe_decode(value) for field, value in counters.items()}
+        if not raw:
+            continue
+
+        stage_names = sorted({
+            field.split(":")[1] for field in raw if field.startswith("stage:") and field.endswith(":count")
+        })
+
+        profiles[endpoint] = {
+            "wall": _parse_histogram(raw, "wall"),
+            "queries": cint(raw.get("queries")),
+            "db_time": flt(raw.get("db_time")),
+            "stages": {
+                stage_name: dict(
+                    _parse_histogram(raw, f"stage:{stage_name}"),
+                    queries=cint(raw.get(f"stage:{stage_name}:queries")),
+                    db_time=flt(raw.get(f"stage:{stage_name}:db_time")),
+                )
+                for stage_name in stage_names
+            },
+        }
+
+    return profiles
+
+
+def _parse_histogram(raw, prefix):
+    count = cint(raw.get(f"{prefix}:count"))
+    total = flt(raw.get(f"{prefix}:sum"))
+
+    buckets = {}
+    for bound in [*LATENCY_BUCKETS, "inf"]:
+        buckets[str(bound)] = cint(raw.get(f"{prefix}:le_{bound}"))
+
+    return {
+        "count": count,
+        "sum": total,
+        "avg": total / count if count else 0,
+        "buckets": buckets,
+    }
+
+
+def _format_prometheus_histogram(metric, labels, histogram):
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+    lines = []
+    cumulative = 0
+    for bound, count in histogram["buckets"].items():
+        cumulative += count
+        le = "+Inf" if bound == "inf" else str(int(bound) / 1000)
+        lines.append(f'{metric}_bucket{{{label_text},le="{le}"}} {cumulative}')
+
+    lines.append(f"{metric}_sum{{{label_text}}} {histogram['sum']}")
+    lines.append(f"{metric}_count{{{label_text}}} {histogram['count']}")
+    return lines
+
+
+def _get_endpoints():
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.smembers(cache.make_key(PROFILE_ENDPOINTS_KEY))
+    (endpoints,) = pipe.execute()
+    return [frappe.safe_decode(endpoint) for endpoint in endpoints]
+
+
+def _get_profile_key(endpoint):
+    return f"{PROFILE_CACHE_PREFIX}:{endpoint}"
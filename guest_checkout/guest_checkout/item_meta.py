@@ -0,0 +1,130 @@
+# guest_checkout/guest_checkout/item_meta.py
+import frappe
+
+
+# Display metadata (image, name, route) and weight for cart lines, one hash field per item_code
+ITEM_META_CACHE_KEY = "guest_checkout:item_meta"
+
+
+def get_item_meta(item_codes):
+    """Return display metadata for a list of item codes
+
+    Cached entries are served from the shared cache; everything else is
+    fetched with a single query and written back to the cache.
+
+    Returns:
+        dict: item_code -> {item_code, item_name, image, web_item_name,
+            thumbnail, website_image, description, route, weight_per_unit}
+    """
+    item_codes = list(dict.fromkeys(code for code in item_codes if code))
+    if not item_codes:
+        return {}
+
+    cache = frappe.cache()
+    meta = {}
+    missing = []
+    for item_code in item_codes:
+        cached = cache.hget(ITEM_META_CACHE_KEY, item_code)
+        # Entries cached before weight_per_unit was added are refetched
+        if cached and "weight_per_unit" in cached:
+            meta[item_code] = frappe._dict(cached)
+        else:
+            missing.append(item_code)
+
+    if missing:
+        for item_code, item_meta in _fetch_item_meta(missing).items():
+            cache.hset(ITEM_META_CACHE_KEY, item_code, item_meta)
+            meta[item_code] = frappe._dict(item_meta)
+
+    return meta
+
+
+def decorate_quotation_doc(doc):
+    """Add website display fields to cart lines using the batched item metadata
+
+    Drop-in replacement for webshop's decorate_quotation_doc, which runs
+    several queries per line.
+    """
+    if not doc:
+        return doc
+
+    items = doc.get("items", [])
+    meta = get_item_meta([d.item_code for d in items])
+
+    for d in items:
+        item_meta = meta.get(d.item_code)
+        if not item_meta:
+            continue
+
+        d.update({
+            "web_item_name": item_meta.web_item_name or d.item_name,
+            "thumbnail": item_meta.thumbnail,
+            "website_image": item_meta.website_image,
+            "description": item_meta.description or d.get("description"),
+            "route": item_meta.route,
+        })
+
+    return doc
+
+
+def clear_item_meta_cache(doc=None, method=None):
+    """Invalidate cached item metadata when an Item or Website Item changes"""
+    frappe.cache().delete_value(ITEM_META_CACHE_KEY)
+
+
+def _fetch_item_meta(item_codes):
+    """Fetch item and website item fields for all item codes in one query
+
+    Variants without their own Website Item fall back to the template's.
+    """
+    item = frappe.qb.DocType("Item")
+    web_item = frappe.qb.DocType("Website Item")
+    template = frappe.qb.DocType("Website Item").as_("template_web_item")
+
+    rows = (
+        frappe.qb.from_(item)
+        .left_join(web_item).on(web_item.item_code == item.name)
+        .left_join(template).on(template.item_code == item.variant_of)
+        .select(
+            item.name.as_("item_code"),
+            item.item_name,
+            item.image,
+            item.weight_per_unit,
+            web_item.name.as_("website_item"),
+            web_item.web_item_name,
+            web_item.thumbnail,
+            web_item.website_image,
+            web_item.description,
+            web_item.route,
+            template.thumbnail.as_("template_thumbnail"),
+            template.website_image.as_("template_website_image"),
+            template.description.as_("template_description"),
+            template.route.as_("template_route"),
+        )
+        .where(item.name.isin(item_codes))
+    ).run(as_dict=True)
+
+    meta = {}
+    for row in rows:
+        if row.website_item:
+            thumbnail, website_image, description, route = (
+                row.thumbnail, row.website_image, row.description, row.route
+            )
+        else:
+            thumbnail, website_image, description, route = (
+                row.template_thumbnail, row.template_website_image, row.template_description, row.template_route
+            )
+
+        meta[row.item_code] = {
+            "item_code": row.item_code,
+            "item_name": row.item_name,
+            "image": row.image,
+            "web_item_name": row.web_item_name,
+            "thumbnail": thumbnail,
+            "website_image": website_image,
+            "description": description,
+            "route": route,
+            "weight_per_unit": row.weight_per_unit,
+        }
+
+    return meta
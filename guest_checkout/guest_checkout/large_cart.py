@@ -0,0 +1,271 @@
+# guest_checkout/guest_checkout/large_cart.py
+import frappe
+from frappe import _
+from frappe.utils import cint, cstr, flt, now, round_based_on_smallest_currency_fraction
+from guest_checkout import cart_summary
+
+
+# Wholesale carts run to hundreds of lines, where apply_cart_settings and a
+# full save reprice and re-total every line on each click. From the
+# configured line count on, cart updates reprice only the changed lines
+# (pricing rules and coupon included), recompute taxes and totals from the
+# difference and write just the touched rows. The full recalculation still
+# runs when the cart is checked out.
+INCREMENTAL_TAX_TYPES = ("On Net Total", "Actual")
+
+
+def get_threshold():
+    """Line count from which a cart is updated incrementally (0 disables it)"""
+    return cint(frappe.get_cached_doc("Webshop Settings").get("large_cart_threshold"))
+
+
+def is_large_cart(quotation):
+    threshold = get_threshold()
+    return bool(
+        threshold
+        and quotation
+        and not quotation.is_new()
+        and len(quotation.get("items")) >= threshold
+    )
+
+
+def can_update(quotation, changes):
+    """Check that the changes can be applied without the full recalculation
+
+    Taxes must be plain net-total percentages or fixed amounts, there must
+    be no document discount, and the cart must keep at least one line.
+    """
+    if flt(quotation.discount_amount) or flt(quotation.additional_discount_percentage):
+        return False
+
+    for tax in quotation.get("taxes"):
+        if tax.charge_type not in INCREMENTAL_TAX_TYPES or cint(tax.included_in_print_rate):
+            return False
+
+    index = get_row_index(quotation)
+    final = _get_final_changes(changes)
+    if any(index.get(code) and index[code].item_tax_template for code in final):
+        return False
+
+    removed = [code for code, change in final.items() if not change.qty and code in index]
+    return len(removed) < len(index)
+
+
+def get_row_index(quotation):
+    """item_code -> first cart line with it, built once per loaded Quotation"""
+    index = quotation.flags.row_index
+    if index is None:
+        index = {}
+        for row in quotation.get("items"):
+            index.setdefault(row.item_code, row)
+        quotation.flags.row_index = index
+
+    return index
+
+
+def apply_changes(quotation, changes):
+    """Apply cart changes to a large cart and write only the rows they touch"""
+    index = get_row_index(quotation)
+    final = _get_final_changes(changes)
+    precision = quotation.precision("net_total")
+
+    new_lines = _get_new_line_details([
+        code for code, change in final.items() if change.qty and code not in index
+    ])
+
+    added, updated, removed = [], [], []
+    delta_qty = delta_amount = 0
+
+    for item_code, change in final.items():
+        row = index.get(item_code)
+
+        if not change.qty:
+            if row:
+                delta_qty -= flt(row.qty)
+                delta_amount -= flt(row.amount)
+                quotation.items.remove(row)
+                del index[item_code]
+                removed.append(row)
+            continue
+
+        if row:
+            delta_qty -= flt(row.qty)
+            delta_amount -= flt(row.amount)
+            updated.append(row)
+        else:
+            row = _append_line(quotation, item_code, new_lines.get(item_code))
+            index[item_code] = row
+            added.append(row)
+
+        row.qty = change.qty
+        row.warehouse = change.warehouse
+        row.additional_notes = change.additional_notes
+        _price_line(quotation, row, precision)
+
+        delta_qty += flt(row.qty)
+        delta_amount += flt(row.amount)
+
+    quotation.total_qty = flt(quotation.total_qty) + delta_qty
+    quotation.total = quotation.net_total = flt(flt(quotation.net_total) + delta_amount, precision)
+    _set_taxes_and_totals(quotation, precision)
+
+    _save(quotation, added, updated, removed)
+    return quotation
+
+
+def _get_final_changes(changes):
+    """Later changes to the same item win, like the full update path"""
+    final = {}
+    for change in changes:
+        final[change.item_code] = change
+    return final
+
+
+def _get_new_line_details(item_codes):
+    """Mandatory Quotation Item fields for new lines, one query for all of them"""
+    if not item_codes:
+        return {}
+
+    items = frappe.get_all(
+        "Item",
+        filters={"name": ["in", item_codes]},
+        fields=["name", "item_name", "description", "stock_uom"],
+    )
+    return {item.name: item for item in items}
+
+
+def _append_line(quotation, item_code, item=None):
+    item = item or frappe._dict()
+    last_idx = cint(quotation.items[-1].idx) if quotation.get("items") else 0
+
+    row = quotation.append("items", {
+        "doctype": "Quotation Item",
+        "item_code": item_code,
+        "item_name": item.item_name or item_code,
+        "description": item.description or item.item_name or item_code,
+        "uom": item.stock_uom,
+        "stock_uom": item.stock_uom,
+        "conversion_factor": 1,
+    })
+    # Removed lines leave gaps in idx; keep new lines at the end
+    row.idx = last_idx + 1
+    return row
+
+
+def _price_line(quotation, row, precision):
+    """Reprice one line like the full save: price list rate, pricing rules and coupon
+
+    Free items of product discount rules are left to the full recalculation
+    at checkout.
+    """
+    from erpnext.stock.get_item_details import get_item_details
+
+    details = get_item_details(
+        _get_pricing_args(quotation, row), quotation, for_validate=True, overwrite_warehouse=False
+    )
+    row.price_list_rate = flt(details.get("price_list_rate")) or flt(row.price_list_rate)
+    row.discount_percentage = flt(details.get("discount_percentage"))
+    row.discount_amount = flt(details.get("discount_amount"))
+    row.margin_type = details.get("margin_type")
+    row.margin_rate_or_amount = flt(details.get("margin_rate_or_amount"))
+    row.pricing_rules = details.get("pricing_rules") or ""
+
+    # Same order as calculate_taxes_and_totals: margin first, then the discount on it
+    rate = flt(row.price_list_rate)
+    if row.margin_type == "Percentage":
+        rate += rate * row.margin_rate_or_amount / 100
+    elif row.margin_type == "Amount":
+        rate += row.margin_rate_or_amount
+    row.rate_with_margin = flt(rate, precision) if row.margin_type else 0
+
+    if row.discount_percentage:
+        row.discount_amount = flt(rate * row.discount_percentage / 100, precision)
+    row.rate = flt(rate - row.discount_amount, precision)
+    row.amount = row.net_amount = flt(row.rate * flt(row.qty), precision)
+    row.net_rate = row.rate
+    row.stock_qty = flt(row.qty) * flt(row.conversion_factor or 1)
+
+    conversion_rate = flt(quotation.conversion_rate) or 1
+    for field in ("price_list_rate", "rate", "amount", "net_rate", "net_amount"):
+        row.set(f"base_{field}", flt(flt(row.get(field)) * conversion_rate, precision))
+
+
+def _get_pricing_args(quotation, row):
+    """get_item_details arguments for one line, built like set_missing_item_details does"""
+    args = frappe._dict({
+        fieldname: quotation.get(fieldname)
+        for fieldname in frappe.get_meta(quotation.doctype).get_valid_columns()
+    })
+    args.update(row.as_dict())
+    args.update({
+        "doctype": quotation.doctype,
+        "name": quotation.name,
+        "document_type": "Quotation Item",
+        "child_doctype": "Quotation Item",
+        "child_docname": row.name,
+        "ignore_pricing_rule": cint(quotation.get("ignore_pricing_rule")),
+    })
+    return args
+
+
+def _set_taxes_and_totals(quotation, precision):
+    """Recompute tax rows and document totals from the (already shifted) net total"""
+    conversion_rate = flt(quotation.conversion_rate) or 1
+    running_total = flt(quotation.net_total)
+    total_taxes = 0
+
+    for tax in quotation.get("taxes"):
+        if tax.charge_type == "On Net Total":
+            tax.tax_amount = flt(flt(quotation.net_total) * flt(tax.rate) / 100, precision)
+        tax.tax_amount_after_discount_amount = tax.tax_amount
+
+        amount = -flt(tax.tax_amount) if tax.add_deduct_tax == "Deduct" else flt(tax.tax_amount)
+        running_total = flt(running_total + amount, precision)
+        total_taxes += amount
+        tax.total = running_total
+
+        for field in ("tax_amount", "tax_amount_after_discount_amount", "total"):
+            tax.set(f"base_{field}", flt(flt(tax.get(field)) * conversion_rate, precision))
+
+    quotation.total_taxes_and_charges = flt(total_taxes, precision)
+    quotation.grand_total = flt(flt(quotation.net_total) + total_taxes, precision)
+    if cint(quotation.disable_rounded_total):
+        quotation.rounded_total = 0
+    else:
+        quotation.rounded_total = round_based_on_smallest_currency_fraction(
+            quotation.grand_total, quotation.currency, precision
+        )
+    quotation.rounding_adjustment = flt(
+        flt(quotation.rounded_total) - quotation.grand_total if quotation.rounded_total else 0, precision
+    )
+
+    for field in (
+        "total", "net_total", "total_taxes_and_charges", "grand_total", "rounded_total", "rounding_adjustment"
+    ):
+        quotation.set(f"base_{field}", flt(flt(quotation.get(field)) * conversion_rate, precision))
+
+
+def _save(quotation, added, updated, removed):
+    """Write the touched lines, the tax rows and the header instead of the whole document
+
+    Like Document.save, refuses to overwrite a cart another request saved
+    since it was loaded.
+    """
+    modified = frappe.db.get_value("Quotation", quotation.name, "modified", for_update=True)
+    if cstr(modified) != cstr(quotation.modified):
+        frappe.throw(_("Cart was changed by another request"), frappe.TimestampMismatchError)
+
+    quotation.modified = now()
+
+    if removed:
+        frappe.db.delete("Quotation Item", {"name": ["in", [row.name for row in removed]]})
+    for row in added:
+        row.db_insert()
+    for row in updated:
+        row.db_update()
+    for tax in quotation.get("taxes"):
+        tax.db_update()
+    quotation.db_update()
+
+    # db_update skips the Quotation hooks that keep the summary current
+    cart_summary.update_quotation_summary(quotation)
@@ -0,0 +1,19 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+from guest_checkout.guest_address import backfill_address_fingerprints
+
+def execute():
+    # Hash of the normalized address so checkout deduplication is one indexed lookup
+    create_custom_field(
+        "Address",
+        {
+            "fieldname": "guest_address_fingerprint",
+            "label": "Address Fingerprint",
+            "fieldtype": "Data",
+            "insert_after": "pincode",
+            "read_only": 1,
+            "hidden": 1,
+            "no_copy": 1,
+        },
+    )
+    backfill_address_fingerprints()
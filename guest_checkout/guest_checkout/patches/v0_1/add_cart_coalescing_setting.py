@@ -0,0 +1,16 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+    # Buffer rapid cart quantity changes and save them together
+    create_custom_field(
+        "Webshop Settings",
+        {
+            "fieldname": "coalesce_cart_updates",
+            "label": "Coalesce Cart Updates",
+            "fieldtype": "Check",
+            "default": "0",
+            "insert_after": "profile_guest_checkout",
+            "description": "Keep quantity changes to lines already in the cart in cache and save them once the cart has been idle for a few seconds or the cart page is opened",
+        },
+    )
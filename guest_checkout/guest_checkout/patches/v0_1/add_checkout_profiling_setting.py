@@ -0,0 +1,16 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+    # Record per-stage latency of guest checkout endpoints
+    create_custom_field(
+        "Webshop Settings",
+        {
+            "fieldname": "profile_guest_checkout",
+            "label": "Profile Guest Checkout",
+            "fieldtype": "Check",
+            "default": "0",
+            "insert_after": "queue_guest_checkout",
+            "description": "Record wall time, query count and DB time per stage of the guest checkout endpoints",
+        },
+    )
@@ -0,0 +1,20 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+from guest_checkout.customer_identity import backfill_identity_keys
+
+def execute():
+    # Normalized mobile/email key so every checkout path resolves the same Customer
+    create_custom_field(
+        "Customer",
+        {
+            "fieldname": "guest_identity_key",
+            "label": "Guest Identity Key",
+            "fieldtype": "Data",
+            "insert_after": "mobile_no",
+            "unique": 1,
+            "read_only": 1,
+            "no_copy": 1,
+            "description": "Normalized mobile number (or email) used to match guest checkouts to this Customer",
+        },
+    )
+    backfill_identity_keys()
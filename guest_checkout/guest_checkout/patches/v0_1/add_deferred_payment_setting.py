@@ -0,0 +1,16 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+    # Post Payment Entries from gateway callbacks instead of at checkout
+    create_custom_field(
+        "Webshop Settings",
+        {
+            "fieldname": "defer_payment_entries",
+            "label": "Defer Payment Entries",
+            "fieldtype": "Check",
+            "default": "0",
+            "insert_after": "direct_sales_order_checkout",
+            "description": "Don't post a Payment Entry at checkout. Payments confirmed by the gateway callback are queued and posted in batches every minute",
+        },
+    )
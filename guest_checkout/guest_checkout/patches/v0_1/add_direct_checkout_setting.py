@@ -0,0 +1,16 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+    # Build the Sales Order straight from the cart at checkout
+    create_custom_field(
+        "Webshop Settings",
+        {
+            "fieldname": "direct_sales_order_checkout",
+            "label": "Direct Sales Order Checkout",
+            "fieldtype": "Check",
+            "default": "0",
+            "insert_after": "large_cart_threshold",
+            "description": "Create the Sales Order directly from the cart at checkout instead of submitting the cart Quotation first. The draft cart Quotation is deleted once the order is placed",
+        },
+    )
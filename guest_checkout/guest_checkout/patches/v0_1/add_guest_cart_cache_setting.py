@@ -0,0 +1,16 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+    # Keep anonymous carts in cache until checkout instead of draft Quotations
+    create_custom_field(
+        "Webshop Settings",
+        {
+            "fieldname": "guest_cart_in_cache",
+            "label": "Keep Guest Carts in Cache",
+            "fieldtype": "Check",
+            "default": "0",
+            "insert_after": "delivery_charges_account",
+            "description": "Guest carts are stored in cache and only saved as a Quotation at checkout",
+        },
+    )
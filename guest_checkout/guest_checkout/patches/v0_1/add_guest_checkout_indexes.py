@@ -0,0 +1,5 @@
+from guest_checkout.db_indexes import add_guest_checkout_indexes
+
+def execute():
+    # Composite indexes for the guest cart and address lookups
+    add_guest_checkout_indexes()
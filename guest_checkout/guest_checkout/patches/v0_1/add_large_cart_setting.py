@@ -0,0 +1,16 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+    # Line count from which cart updates reprice and re-total incrementally
+    create_custom_field(
+        "Webshop Settings",
+        {
+            "fieldname": "large_cart_threshold",
+            "label": "Large Cart Threshold",
+            "fieldtype": "Int",
+            "default": "0",
+            "insert_after": "coalesce_cart_updates",
+            "description": "Carts with at least this many lines only reprice the changed lines and update taxes and totals incrementally; the full recalculation runs at checkout. 0 disables",
+        },
+    )
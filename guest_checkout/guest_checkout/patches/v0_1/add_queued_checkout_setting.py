@@ -0,0 +1,16 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+    # Run the guest checkout submit chain in a background worker
+    create_custom_field(
+        "Webshop Settings",
+        {
+            "fieldname": "queue_guest_checkout",
+            "label": "Queue Guest Checkout",
+            "fieldtype": "Check",
+            "default": "0",
+            "insert_after": "guest_cart_in_cache",
+            "description": "Guest orders are created by a background job and the checkout form polls for the result",
+        },
+    )
@@ -0,0 +1,16 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+    # Token-bucket limits on the guest cart and checkout endpoints
+    create_custom_field(
+        "Webshop Settings",
+        {
+            "fieldname": "rate_limit_guest_endpoints",
+            "label": "Rate Limit Guest Endpoints",
+            "fieldtype": "Check",
+            "default": "0",
+            "insert_after": "defer_payment_entries",
+            "description": "Limit cart reads, cart updates and checkouts per guest and per IP address; requests over the limit get a 429 response",
+        },
+    )
@@ -0,0 +1,16 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+    # Refuse carts with over-sold lines before checkout writes anything
+    create_custom_field(
+        "Webshop Settings",
+        {
+            "fieldname": "check_stock_before_checkout",
+            "label": "Check Stock Before Checkout",
+            "fieldtype": "Check",
+            "default": "0",
+            "insert_after": "rate_limit_guest_endpoints",
+            "description": "Check cart lines against available stock (actual minus reserved) in their website warehouse before an order is placed",
+        },
+    )
@@ -0,0 +1,228 @@
+# guest_checkout/guest_checkout/payments.py
+import hashlib
+import hmac
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now, nowdate
+
+
+# With deferred payments, checkout no longer posts a Payment Entry. The
+# gateway's callback is verified and queued (one hash field per transaction,
+# so repeated callbacks collapse), and the scheduled reconciler posts the
+# queued payments in batches, committing once per batch. A payment leaves the
+# queue only after its batch is committed, so a crashed run loses nothing.
+PAYMENT_QUEUE_KEY = "guest_checkout:payment_queue"
+GATEWAY_ACCOUNTS_KEY = "guest_checkout:payment_gateway_accounts"
+RECONCILE_BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+
+# Callback statuses that mean the customer has paid
+PAID_STATUSES = ("Paid", "Captured", "Success")
+
+# site_config.json key holding the secret gateways sign their callbacks with
+CALLBACK_SECRET_CONF_KEY = "guest_checkout_payment_secret"
+
+
+def is_deferred():
+    """Check if Payment Entries should wait for the gateway callback instead of being posted at checkout"""
+    return bool(cint(frappe.get_cached_doc("Webshop Settings").get("defer_payment_entries")))
+
+
+def get_gateway_accounts():
+    """Payment Gateway Account per payment gateway, cached until an account changes
+
+    Returns:
+        dict: payment_gateway -> {name, payment_account, currency}
+    """
+    accounts = frappe.cache().get_value(GATEWAY_ACCOUNTS_KEY)
+    if accounts is None:
+        accounts = {}
+        for row in frappe.get_all(
+            "Payment Gateway Account",
+            fields=["name", "payment_gateway", "payment_account", "currency"],
+            order_by="is_default desc",
+        ):
+            accounts.setdefault(row.payment_gateway, dict(row))
+        frappe.cache().set_value(GATEWAY_ACCOUNTS_KEY, accounts)
+
+    return {gateway: frappe._dict(account) for gateway, account in accounts.items()}
+
+
+def get_gateway_account(payment_gateway):
+    return get_gateway_accounts().get(payment_gateway)
+
+
+def clear_gateway_accounts(doc=None, method=None):
+    """Payment Gateway Account hook - drop the cached mapping"""
+    frappe.cache().delete_value(GATEWAY_ACCOUNTS_KEY)
+
+
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+def payment_callback(gateway, sales_order, transaction_id, amount, status, signature):
+    """Gateway notification of a payment for a Sales Order
+
+    Only the signature is checked here; the payment is queued for the
+    reconciler, so the gateway gets its answer without any document work.
+    """
+    expected = sign_callback(gateway, sales_order, transaction_id, amount, status)
+    if not hmac.compare_digest(expected, signature or ""):
+        frappe.throw(_("Invalid payment callback signature"), frappe.PermissionError)
+
+    if status not in PAID_STATUSES:
+        return {"status": "ignored"}
+
+    queue_payment(gateway, sales_order, transaction_id, amount)
+    return {"status": "queued"}
+
+
+def sign_callback(gateway, sales_order, transaction_id, amount, status):
+    """HMAC-SHA256 of the callback fields with the site's callback secret"""
+    secret = frappe.conf.get(CALLBACK_SECRET_CONF_KEY)
+    if not secret:
+        frappe.throw(_("Payment callbacks are not configured for this site"))
+
+    message = "|".join([gateway, sales_order, transaction_id, str(flt(amount)), status])
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def queue_payment(gateway, sales_order, transaction_id, amount, attempts=0):
+    """Add a confirmed payment to the reconciliation queue"""
+    frappe.cache().hset(PAYMENT_QUEUE_KEY, transaction_id, {
+        "gateway": gateway,
+        "sales_order": sales_order,
+        "transaction_id": transaction_id,
+        "amount": flt(amount),
+        "attempts": attempts,
+        "queued_at": now(),
+    })
+
+
+def get_queued_payments():
+    """Return the queued {transaction_id: payment}"""
+    queued = frappe.cache().hgetall(PAYMENT_QUEUE_KEY)
+    return {frappe.safe_decode(transaction_id): payment for transaction_id, payment in queued.items()}
+
+
+def reconcile_payments():
+    """Post Payment Entries for the queued payments in batches (scheduled every minute)
+
+    A payment that fails stays queued and is retried by later runs, up to
+    MAX_ATTEMPTS, after which it is left to the error log.
+    """
+    payments = []
+    for key, payment in get_queued_payments().items():
+        payment = frappe._dict(payment, queue_key=key)
+        # Entries queued before the queue was keyed by transaction are keyed by Sales Order
+        payment.sales_order = payment.sales_order or key
+        payments.append(payment)
+
+    posted = 0
+
+    for start in range(0, len(payments), RECONCILE_BATCH_SIZE):
+        posted += _post_batch(payments[start:start + RECONCILE_BATCH_SIZE])
+
+    return posted
+
+
+@frappe.whitelist()
+def simulate_payment(sales_order, gateway="Bookeey", amount=None, status="Paid"):
+    """Local stand-in gateway: pay a Sales Order through the real callback
+
+    Only available to System Managers, in tests and developer mode.
+    """
+    frappe.only_for("System Manager")
+    if not (frappe.flags.in_test or frappe.conf.get("developer_mode")):
+        frappe.throw(_("The local payment gateway is only available in developer mode"), frappe.PermissionError)
+
+    if amount is None:
+        amount = frappe.db.get_value("Sales Order", sales_order, "grand_total")
+
+    transaction_id = f"LOCAL-{frappe.generate_hash(length=12)}"
+    signature = sign_callback(gateway, sales_order, transaction_id, amount, status)
+    return payment_callback(gateway, sales_order, transaction_id, amount, status, signature)
+
+
+def _post_batch(batch):
+    """Post one batch of payments, commit them together, then take them off the queue"""
+    orders = {
+        row.name: row
+        for row in frappe.get_all(
+            "Sales Order",
+            filters={"name": ["in", list({payment.sales_order for payment in batch})]},
+            fields=["name", "docstatus", "grand_total", "advance_paid"],
+        )
+    }
+    # Gateways resend callbacks, and a run that crashed after its commit
+    # leaves its payments queued; a transaction already posted is skipped
+    posted_transactions = set(frappe.get_all(
+        "Payment Entry",
+        filters={"reference_no": ["in", [payment.transaction_id for payment in batch]], "docstatus": 1},
+        pluck="reference_no",
+    ))
+
+    posted = 0
+    done, retry = [], []
+    for payment in batch:
+        order = orders.get(payment.sales_order)
+        if not order or order.docstatus != 1 or payment.transaction_id in posted_transactions:
+            done.append(payment.queue_key)
+            continue
+
+        frappe.db.savepoint("guest_checkout_payment")
+        try:
+            payment_entry = _make_payment_entry(order, payment)
+            # Later payments of the same order see this one as paid
+            order.advance_paid = flt(order.advance_paid) + flt(payment_entry.paid_amount)
+            posted += 1
+            done.append(payment.queue_key)
+        except Exception:
+            frappe.db.rollback(save_point="guest_checkout_payment")
+            frappe.log_error(frappe.get_traceback(), "Payment Reconciliation Error")
+            if payment.attempts + 1 < MAX_ATTEMPTS:
+                retry.append(payment)
+            if payment.attempts + 1 >= MAX_ATTEMPTS or payment.queue_key != payment.transaction_id:
+                done.append(payment.queue_key)
+
+    frappe.db.commit()
+
+    for payment in retry:
+        queue_payment(
+            payment.gateway, payment.sales_order, payment.transaction_id, payment.amount, payment.attempts + 1
+        )
+    _dequeue(done)
+    return posted
+
+
+def _dequeue(keys):
+    if not keys:
+        return
+
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.hdel(cache.make_key(PAYMENT_QUEUE_KEY), *keys)
+    pipe.execute()
+
+
+def _make_payment_entry(order, payment):
+    """Submit a Payment Entry for a gateway payment against a Sales Order"""
+    from erpnext.accounts.doctype.payment_entry.payment_entry import get_payment_entry
+
+    account = get_gateway_account(payment.gateway)
+    if not account:
+        frappe.throw(_("Payment Gateway Account not found for {0}").format(payment.gateway))
+
+    outstanding = flt(order.grand_total) - flt(order.advance_paid)
+    amount = min(flt(payment.amount), outstanding) if outstanding > 0 else flt(payment.amount)
+
+    payment_entry = get_payment_entry("Sales Order", order.name, party_amount=amount)
+    payment_entry.mode_of_payment = payment.gateway
+    payment_entry.paid_to = account.payment_account
+    payment_entry.paid_amount = payment_entry.received_amount = amount
+    payment_entry.reference_no = payment.transaction_id
+    payment_entry.reference_date = nowdate()
+
+    payment_entry.flags.ignore_permissions = True
+    payment_entry.insert(ignore_permissions=True)
+    payment_entry.submit()
+    return payment_entry
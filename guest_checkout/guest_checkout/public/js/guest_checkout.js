@@ -257,6 +257,44 @@ guest_checkout.addToGuestCart = function(item_code, qty) {
     });
 };
 
+// Apply several cart changes in one request (quick order, re-order last basket)
+// items: [{item_code, qty, additional_notes}], qty 0 removes the line
+guest_checkout.update_cart_items = function(items, callback) {
+    return frappe.call({
+        type: "POST",
+        method: "guest_checkout.guest_cart.update_cart_items_allow_guest",
+        args: {
+            items: items
+        },
+        callback: function(r) {
+            guest_checkout.update_cart_count();
+            
+            if (callback) {
+                callback(r);
+            }
+        }
+    });
+};
+
+// Load cart, delivery areas, payment methods and settings for checkout in one call.
+// The last response is kept and only re-sent by the server when its version changed.
+guest_checkout.get_checkout_bootstrap = function(callback) {
+    return frappe.call({
+        method: "guest_checkout.checkout_bootstrap.get_checkout_bootstrap",
+        args: {
+            if_none_match: guest_checkout.bootstrap ? guest_checkout.bootstrap.version : null
+        },
+        callback: function(r) {
+            if (r.message && !r.message.not_modified) {
+                guest_checkout.bootstrap = r.message;
+            }
+            if (callback) {
+                callback(guest_checkout.bootstrap || {});
+            }
+        }
+    });
+};
+
 // Update cart count in navbar
 guest_checkout.updateCartCount = function() {
     frappe.call({
@@ -270,6 +308,12 @@ guest_checkout.updateCartCount = function() {
     });
 };
 
+// Last quantity this tab saw per cart line and the cart version of the last
+// update, sent with each change so the server can tell a change to the same
+// line in another tab from an unrelated one
+guest_checkout.cart_lines = {};
+guest_checkout.cart_write_version = null;
+
 // Override default shopping cart update_cart function
 guest_checkout.override_shopping_cart = function() {
     shopping_cart.update_cart = function(opts) {
@@ -284,7 +328,9 @@ guest_checkout.override_shopping_cart = function() {
                 item_code: opts.item_code,
                 qty: opts.qty,
                 additional_notes: opts.additional_notes,
-                with_items: opts.with_items || 0
+                with_items: opts.with_items || 0,
+                base_qty: guest_checkout.cart_lines[opts.item_code],
+                version: guest_checkout.cart_write_version
             },
             btn: opts.btn,
             callback: function(r) {
@@ -292,6 +338,8 @@ guest_checkout.override_shopping_cart = function() {
                     $(opts.btn).prop("disabled", false);
                 }
                 
+                guest_checkout.track_cart_write(opts, r.message);
+                
                 // Update cart count
                 guest_checkout.update_cart_count();
                 
@@ -303,6 +351,22 @@ guest_checkout.override_shopping_cart = function() {
     };
 };
 
+// Remember what the server applied; a conflicting line shows its current quantity
+guest_checkout.track_cart_write = function(opts, response) {
+    if (!response) return;
+
+    guest_checkout.cart_write_version = response.version;
+    guest_checkout.cart_lines[opts.item_code] = opts.qty;
+
+    (response.conflicts || []).forEach(function(conflict) {
+        guest_checkout.cart_lines[conflict.item_code] = conflict.qty;
+        frappe.show_alert({
+            message: __("{0} was changed in another window, quantity is now {1}", [conflict.item_code, conflict.qty]),
+            indicator: "orange"
+        });
+    });
+};
+
 // Update cart count in navbar
 guest_checkout.update_cart_count = function() {
     frappe.call({
@@ -407,151 +471,154 @@ guest_checkout.setup_checkout_handlers = function() {
 
 // Show guest checkout modal WITH DELIVERY AREA
 guest_checkout.show_checkout_modal = function() {
-    // First, fetch delivery areas
-    frappe.call({
-        method: "frappe.client.get_list",
-        args: {
-            doctype: "Delivery Area",
-            fields: ["name", "area", "delivery_charge"],
-            limit_page_length: 999
-        },
-        callback: function(r) {
-            const delivery_areas = r.message || [];
-            
-            // Build delivery area options
-            let delivery_options = delivery_areas.map(area => {
-                return `${area.area} - KD ${parseFloat(area.delivery_charge).toFixed(3)}`;
-            });
-            
-            const d = new frappe.ui.Dialog({
-                title: __('Complete Your Order'),
-                fields: [
-                    {
-                        fieldtype: 'Section Break',
-                        label: __('Personal Information')
-                    },
-                    {
-                        fieldname: 'full_name',
-                        fieldtype: 'Data',
-                        label: __('Full Name'),
-                        reqd: 1,
-                        description: __('Enter your full name')
-                    },
-                    {
-                        fieldname: 'email',
-                        fieldtype: 'Data',
-                        label: __('Email Address'),
-                        reqd: 1,
-                        options: 'Email',
-                        description: __('We will send order confirmation to this email')
-                    },
-                    {
-                        fieldname: 'mobile',
-                        fieldtype: 'Data',
-                        label: __('Mobile Number'),
-                        reqd: 1,
-                        description: __('Enter mobile with country code (e.g., +96512345678)')
-                    },
-                    {
-                        fieldtype: 'Column Break'
-                    },
-                    {
-                        fieldtype: 'Section Break',
-                        label: __('Delivery Address')
-                    },
-                    {
-                        fieldname: 'delivery_area',
-                        fieldtype: 'Select',
-                        label: __('Delivery Area'),
-                        options: delivery_options,
-                        reqd: 1,
-                        description: __('Select your delivery area')
-                    },
-                    {
-                        fieldname: 'address_line1',
-                        fieldtype: 'Data',
-                        label: __('Address Line 1'),
-                        reqd: 1,
-                        description: __('Block, Street, Building number')
-                    },
-                    {
-                        fieldname: 'address_line2',
-                        fieldtype: 'Data',
-                        label: __('Address Line 2'),
-                        description: __('Apartment, Floor (optional)')
-                    },
-                    {
-                        fieldname: 'city',
-                        fieldtype: 'Data',
-                        label: __('City'),
-                        reqd: 1,
-                        default: 'Kuwait City'
-                    },
-                    {
-                        fieldtype: 'Column Break'
-                    },
-                    {
-                        fieldname: 'state',
-                        fieldtype: 'Data',
-                        label: __('State/Province'),
-                        description: __('Optional')
-                    },
-                    {
-                        fieldname: 'pincode',
-                        fieldtype: 'Data',
-                        label: __('Postal Code'),
-                        description: __('Optional')
-                    },
-                    {
-                        fieldname: 'country',
-                        fieldtype: 'Link',
-                        label: __('Country'),
-                        options: 'Country',
-                        reqd: 1,
-                        default: 'Kuwait'
-                    },
-                    {
-                        fieldtype: 'Section Break',
-                        label: __('Additional Information')
-                    },
-                    {
-                        fieldname: 'phone',
-                        fieldtype: 'Data',
-                        label: __('Alternative Phone'),
-                        description: __('Optional')
-                    },
-                    {
-                        fieldname: 'payment_method',
-                        fieldtype: 'Select',
-                        label: __('Payment Method'),
-                        options: ['Bookeey', 'Cash on Delivery'],
-                        default: 'Bookeey',
-                        reqd: 1
-                    }
-                ],
-                size: 'large',
-                primary_action_label: __('Place Order'),
-                primary_action: function(values) {
-                    // Find the selected delivery area details
-                    const selected_area_text = values.delivery_area;
-                    const selected_area = delivery_areas.find(area => 
-                        selected_area_text.includes(area.area)
-                    );
-                    
-                    values.delivery_area_name = selected_area ? selected_area.name : null;
-                    values.delivery_charge = selected_area ? selected_area.delivery_charge : 0;
-                    
-                    d.hide();
-                    guest_checkout.process_checkout(values);
+    // First, fetch delivery areas, payment methods and the cart in one call
+    guest_checkout.get_checkout_bootstrap(function(bootstrap) {
+        const delivery_areas = bootstrap.delivery_areas || [];
+        const payment_methods = bootstrap.payment_methods || ['Bookeey', 'Cash on Delivery'];
+
+        guest_checkout.update_cart_display({
+            count: bootstrap.cart ? bootstrap.cart.count : 0,
+            items: bootstrap.items || [],
+            total: bootstrap.cart ? bootstrap.cart.total : 0
+        });
+
+        // One key per checkout attempt so double clicks and retries can't place two orders
+        const idempotency_key = frappe.utils.get_random(20);
+        
+        // Build delivery area options
+        let delivery_options = delivery_areas.map(area => {
+            return `${area.area} - KD ${parseFloat(area.delivery_charge).toFixed(3)}`;
+        });
+        
+        const d = new frappe.ui.Dialog({
+            title: __('Complete Your Order'),
+            fields: [
+                {
+                    fieldtype: 'Section Break',
+                    label: __('Personal Information')
+                },
+                {
+                    fieldname: 'full_name',
+                    fieldtype: 'Data',
+                    label: __('Full Name'),
+                    reqd: 1,
+                    description: __('Enter your full name')
+                },
+                {
+                    fieldname: 'email',
+                    fieldtype: 'Data',
+                    label: __('Email Address'),
+                    reqd: 1,
+                    options: 'Email',
+                    description: __('We will send order confirmation to this email')
+                },
+                {
+                    fieldname: 'mobile',
+                    fieldtype: 'Data',
+                    label: __('Mobile Number'),
+                    reqd: 1,
+                    description: __('Enter mobile with country code (e.g., +96512345678)')
+                },
+                {
+                    fieldtype: 'Column Break'
+                },
+                {
+                    fieldtype: 'Section Break',
+                    label: __('Delivery Address')
+                },
+                {
+                    fieldname: 'delivery_area',
+                    fieldtype: 'Select',
+                    label: __('Delivery Area'),
+                    options: delivery_options,
+                    reqd: 1,
+                    description: __('Select your delivery area')
+                },
+                {
+                    fieldname: 'address_line1',
+                    fieldtype: 'Data',
+                    label: __('Address Line 1'),
+                    reqd: 1,
+                    description: __('Block, Street, Building number')
+                },
+                {
+                    fieldname: 'address_line2',
+                    fieldtype: 'Data',
+                    label: __('Address Line 2'),
+                    description: __('Apartment, Floor (optional)')
                 },
-                secondary_action_label: __('Cancel'),
-                secondary_action: function() {
-                    d.hide();
+                {
+                    fieldname: 'city',
+                    fieldtype: 'Data',
+                    label: __('City'),
+                    reqd: 1,
+                    default: 'Kuwait City'
+                },
+                {
+                    fieldtype: 'Column Break'
+                },
+                {
+                    fieldname: 'state',
+                    fieldtype: 'Data',
+                    label: __('State/Province'),
+                    description: __('Optional')
+                },
+                {
+                    fieldname: 'pincode',
+                    fieldtype: 'Data',
+                    label: __('Postal Code'),
+                    description: __('Optional')
+                },
+                {
+                    fieldname: 'country',
+                    fieldtype: 'Link',
+                    label: __('Country'),
+                    options: 'Country',
+                    reqd: 1,
+                    default: 'Kuwait'
+                },
+                {
+                    fieldtype: 'Section Break',
+                    label: __('Additional Information')
+                },
+                {
+                    fieldname: 'phone',
+                    fieldtype: 'Data',
+                    label: __('Alternative Phone'),
+                    description: __('Optional')
+                },
+                {
+                    fieldname: 'payment_method',
+                    fieldtype: 'Select',
+                    label: __('Payment Method'),
+                    options: payment_methods,
+                    default: payment_methods[0],
+                    reqd: 1
                 }
-            });
-            
-            d.show();
-        }
+            ],
+            size: 'large',
+            primary_action_label: __('Place Order'),
+            primary_action: function(values) {
+                // Find the selected delivery area details
+                const selected_area_text = values.delivery_area;
+                const selected_area = delivery_areas.find(area => 
+                    selected_area_text.includes(area.area)
+                );
+                
+                values.delivery_area_name = selected_area ? selected_area.name : null;
+                values.delivery_charge = selected_area ? selected_area.delivery_charge : 0;
+                values.idempotency_key = idempotency_key;
+                
+                d.hide();
+                guest_checkout.process_checkout(values);
+            },
+            secondary_action_label: __('Cancel'),
+            secondary_action: function() {
+                d.hide();
+            }
+        });
+        
+        d.show();
     });
 };
 
@@ -587,32 +654,32 @@ guest_checkout.process_checkout = function(values) {
             address_data: JSON.stringify(address_data),
             payment_method: values.payment_method,
             delivery_area: values.delivery_area_name,
-            delivery_charge: values.delivery_charge
+            delivery_charge: values.delivery_charge,
+            idempotency_key: values.idempotency_key
         },
         freeze: true,
         freeze_message: __('Creating your order...'),
         callback: function(r) {
-            if (r.message && r.message.success) {
-                // Show success message
+            // Queued checkout - wait for the background job to finish
+            if (r.message && r.message.queued) {
+                frappe.freeze(__('Creating your order...'));
+                guest_checkout.poll_checkout_job(r.message.job_id, function(result) {
+                    frappe.unfreeze();
+                    guest_checkout.on_checkout_complete(result);
+                });
+                return;
+            }
+
+            // Same order is still being placed by an earlier click
+            if (r.message && r.message.pending) {
                 frappe.show_alert({
-                    message: __('Order placed successfully! Order ID: {0}', [r.message.sales_order]),
-                    indicator: 'green'
-                }, 10);
-                
-                // Clear cart count
-                guest_checkout.update_cart_count();
-                
-                // Redirect to order confirmation or thank you page
-                setTimeout(function() {
-                    window.location.href = `/order-confirmation?order=${r.message.sales_order}`;
-                }, 2000);
-            } else {
-                frappe.msgprint({
-                    title: __('Checkout Failed'),
-                    message: __('Unable to complete your order. Please try again or contact support.'),
-                    indicator: 'red'
+                    message: r.message.message,
+                    indicator: 'orange'
                 });
+                return;
             }
+
+            guest_checkout.on_checkout_complete(r.message);
         },
         error: function(r) {
             frappe.msgprint({
@@ -624,5 +691,57 @@ guest_checkout.process_checkout = function(values) {
     });
 };
 
+// Handle the result of a completed guest checkout
+guest_checkout.on_checkout_complete = function(result) {
+    if (result && result.success) {
+        // Show success message
+        frappe.show_alert({
+            message: __('Order placed successfully! Order ID: {0}', [result.sales_order]),
+            indicator: 'green'
+        }, 10);
+        
+        // Clear cart count
+        guest_checkout.update_cart_count();
+        
+        // Redirect to order confirmation or thank you page
+        setTimeout(function() {
+            window.location.href = `/order-confirmation?order=${result.sales_order}`;
+        }, 2000);
+    } else {
+        frappe.msgprint({
+            title: __('Checkout Failed'),
+            message: __('Unable to complete your order. Please try again or contact support.'),
+            indicator: 'red'
+        });
+    }
+};
+
+// Poll a queued checkout until the background job completes or fails
+guest_checkout.poll_checkout_job = function(job_id, callback, interval) {
+    interval = interval || 1500;
+
+    frappe.call({
+        method: "guest_checkout.checkout_jobs.get_checkout_job_status",
+        args: {
+            job_id: job_id
+        },
+        callback: function(r) {
+            const job = r.message || {};
+
+            if (job.status === "queued" || job.status === "running") {
+                setTimeout(function() {
+                    guest_checkout.poll_checkout_job(job_id, callback, interval);
+                }, interval);
+                return;
+            }
+
+            callback(job.result || { success: false, message: job.message });
+        },
+        error: function() {
+            callback({ success: false });
+        }
+    });
+};
+
 // Export for use in other scripts
 window.guest_checkout = guest_checkout;
@@ -138,28 +138,25 @@ guest_checkout.setup_checkout_form = function() {
     }
 };
 
-// Load delivery areas from backend
+// Load delivery areas from the checkout bootstrap
 guest_checkout.load_delivery_areas = function() {
-    frappe.call({
-        method: "guest_checkout.delivery.get_delivery_areas",
-        callback: function(r) {
-            if (r.message && r.message.success) {
-                const areas = r.message.areas || [];
-                const select = $('#guest-delivery-area');
-                
-                // Clear existing options except first
-                select.find('option:not(:first)').remove();
-                
-                // Add new options
-                areas.forEach(function(area) {
-                    const charge = area.delivery_charge || area.delivery_charges || 0;
-                    select.append(`
-                        <option value="${area.area_name}" data-charge="${charge}">
-                            ${area.area_name} - ${frappe.format_currency(charge)}
-                        </option>
-                    `);
-                });
-            }
+    guest_checkout.get_checkout_bootstrap(function(bootstrap) {
+        if (bootstrap.delivery_areas) {
+            const areas = bootstrap.delivery_areas;
+            const select = $('#guest-delivery-area');
+            
+            // Clear existing options except first
+            select.find('option:not(:first)').remove();
+            
+            // Add new options
+            areas.forEach(function(area) {
+                const charge = area.delivery_charge || area.delivery_charges || 0;
+                select.append(`
+                    <option value="${area.area_name}" data-charge="${charge}">
+                        ${area.area_name} - ${frappe.format_currency(charge)}
+                    </option>
+                `);
+            });
         }
     });
 };
@@ -189,8 +186,13 @@ guest_checkout.refresh_cart_totals = function() {
     // This could be improved to update only specific sections
     frappe.call({
         method: "webshop.webshop.shopping_cart.cart.get_cart_quotation",
+        args: {
+            if_none_match: guest_checkout.cart_version
+        },
         callback: function(r) {
+            if (r.message && r.message.not_modified) return;
             if (r.message) {
+                guest_checkout.cart_version = r.message.version;
                 $('.cart-tax-items').html(r.message.taxes);
                 $('.cart-grand-total').html(r.message.grand_total_formatted);
                 
@@ -241,56 +243,113 @@ guest_checkout.submit_guest_order = function() {
     const delivery_area = $('#guest-delivery-area').val();
     const delivery_charge = $('#guest-delivery-area option:selected').data('charge') || 0;
     
+    // Reuse the key across retries so a repeated submit returns the same order
+    guest_checkout.order_idempotency_key = guest_checkout.order_idempotency_key || frappe.utils.get_random(20);
+    
     // Show loading state
     frappe.freeze(__("Processing your order..."));
     
-    // Submit order
-    frappe.call({
-        method: "guest_checkout.guest_cart.complete_guest_checkout",
-        args: {
-            guest_data: guest_data,
-            address_data: address_data,
-            payment_method: "Bookeey", // Default payment method
-            delivery_area: delivery_area,
-            delivery_charge: delivery_charge
-        },
-        callback: function(r) {
-            frappe.unfreeze();
-            
-            if (r.message && r.message.success) {
-                frappe.show_alert({
-                    message: __("Order placed successfully! Order ID: {0}", [r.message.sales_order]),
-                    indicator: 'green'
-                });
-                
-                // Clear cart cookie and redirect to success page
-                document.cookie = "cart_count=0; path=/";
-                
-                // Redirect to order success page
-                if (r.message.sales_order) {
-                    window.location.href = '/orders/' + r.message.sales_order;
-                } else {
-                    window.location.href = '/my-orders';
+    // Over-sold lines are reported before anything is written
+    guest_checkout.check_cart_stock(function() {
+        // Submit order
+        frappe.call({
+            method: "guest_checkout.guest_cart.complete_guest_checkout",
+            args: {
+                guest_data: guest_data,
+                address_data: address_data,
+                payment_method: "Bookeey", // Default payment method
+                delivery_area: delivery_area,
+                delivery_charge: delivery_charge,
+                idempotency_key: guest_checkout.order_idempotency_key
+            },
+            callback: function(r) {
+                // Queued checkout - keep the form frozen until the background job finishes
+                if (r.message && r.message.queued) {
+                    guest_checkout.poll_checkout_job(r.message.job_id, function(result) {
+                        frappe.unfreeze();
+                        guest_checkout.handle_guest_order_result(result);
+                    });
+                    return;
                 }
-            } else {
+
+                frappe.unfreeze();
+
+                // Same order is still being placed by an earlier submit
+                if (r.message && r.message.pending) {
+                    frappe.show_alert({
+                        message: r.message.message,
+                        indicator: 'orange'
+                    });
+                    return;
+                }
+
+                guest_checkout.handle_guest_order_result(r.message);
+            },
+            error: function() {
+                frappe.unfreeze();
                 frappe.msgprint({
                     title: __('Checkout Error'),
                     indicator: 'red',
-                    message: r.message?.message || __("There was a problem processing your order. Please try again.")
+                    message: __("There was a problem processing your order. Please try again.")
+                });
+            }
+        });
+    });
+};
+
+// Check the cart against available stock, calling on_available if every line can be ordered
+guest_checkout.check_cart_stock = function(on_available) {
+    frappe.call({
+        method: "guest_checkout.stock_check.check_cart_stock",
+        callback: function(r) {
+            if (r.message && !r.message.available) {
+                frappe.unfreeze();
+                frappe.msgprint({
+                    title: __('Insufficient Stock'),
+                    indicator: 'orange',
+                    message: __("Please update your cart, these items are not available in the requested quantity:")
+                        + "<ul>" + r.message.shortages.map(function(shortage) {
+                            return "<li>" + __("{0}: {1} available", [frappe.utils.escape_html(shortage.item_name), shortage.available_qty]) + "</li>";
+                        }).join("") + "</ul>"
                 });
+                return;
             }
+
+            on_available();
         },
+        // Checkout validates stock again, so a failed check does not block the order
         error: function() {
-            frappe.unfreeze();
-            frappe.msgprint({
-                title: __('Checkout Error'),
-                indicator: 'red',
-                message: __("There was a problem processing your order. Please try again.")
-            });
+            on_available();
         }
     });
 };
 
+// Show the outcome of a guest order and redirect on success
+guest_checkout.handle_guest_order_result = function(result) {
+    if (result && result.success) {
+        frappe.show_alert({
+            message: __("Order placed successfully! Order ID: {0}", [result.sales_order]),
+            indicator: 'green'
+        });
+        
+        // Clear cart cookie and redirect to success page
+        document.cookie = "cart_count=0; path=/";
+        
+        // Redirect to order success page
+        if (result.sales_order) {
+            window.location.href = '/orders/' + result.sales_order;
+        } else {
+            window.location.href = '/my-orders';
+        }
+    } else {
+        frappe.msgprint({
+            title: __('Checkout Error'),
+            indicator: 'red',
+            message: result?.message || __("There was a problem processing your order. Please try again.")
+        });
+    }
+};
+
 // Initialize on document ready
 $(document).ready(function() {
     guest_checkout.setup_checkout_form();
@@ -0,0 +1,168 @@
+# guest_checkout/guest_checkout/rate_limit.py
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+from guest_checkout.instrumentation import _get_request_endpoint
+
+
+# Token buckets in the shared cache, one per budget and caller. A guest is
+# limited by its guest_id and, since a scraper can drop the cookie, by its
+# IP with a larger budget shared by everyone behind it. Requests over budget
+# are refused in before_request, before any document is loaded.
+RATE_LIMIT_PREFIX = "guest_checkout:rate_limit"
+RATE_LIMIT_STATS_KEY = f"{RATE_LIMIT_PREFIX}:stats"
+
+# budget -> (burst capacity, tokens refilled per second)
+RATE_LIMIT_BUDGETS = {
+    "read": (120, 2.0),
+    "cart_write": (60, 1.0),
+    "checkout": (5, 0.1),
+}
+
+# The IP bucket of a budget holds this many times the guest bucket
+IP_BUDGET_FACTOR = 10
+
+ENDPOINT_BUDGETS = {
+    "guest_checkout.guest_cart.get_cart_quotation_allow_guest": "read",
+    "guest_checkout.guest_cart.get_shopping_cart_menu": "read",
+    "guest_checkout.guest_cart.set_cart_count_allow_guest": "read",
+    "guest_checkout.checkout_bootstrap.get_checkout_bootstrap": "read",
+    "guest_checkout.checkout_jobs.get_checkout_job_status": "read",
+    "guest_checkout.delivery.get_delivery_areas": "read",
+    "guest_checkout.stock_check.check_cart_stock": "read",
+    "guest_checkout.guest_cart.update_cart_allow_guest": "cart_write",
+    "guest_checkout.guest_cart.update_cart_items_allow_guest": "cart_write",
+    "guest_checkout.api.apply_delivery_charges_to_cart": "cart_write",
+    "guest_checkout.guest_cart.complete_guest_checkout": "checkout",
+    "guest_checkout.guest_order.create_guest_sales_order": "checkout",
+    "guest_checkout.api.create_customer_and_link_cart": "checkout",
+}
+
+# Takes one token from every bucket in KEYS, or none if any of them is empty,
+# and counts the outcome in the stats hash. ARGV: stats field prefix, now,
+# then capacity and refill rate per key.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[2])
+local allowed = 1
+local retry_after = 0
+local buckets = {}
+
+for i, key in ipairs(KEYS) do
+    if i < #KEYS then
+        local capacity = tonumber(ARGV[i * 2 + 1])
+        local rate = tonumber(ARGV[i * 2 + 2])
+        local state = redis.call("HMGET", key, "tokens", "ts")
+        local tokens = tonumber(state[1]) or capacity
+        local ts = tonumber(state[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+        if tokens < 1 then
+            allowed = 0
+            retry_after = math.max(retry_after, (1 - tokens) / rate)
+        end
+        buckets[i] = {key, tokens, math.ceil(capacity / rate) + 1}
+    end
+end
+
+for _, bucket in ipairs(buckets) do
+    redis.call("HSET", bucket[1], "tokens", tostring(bucket[2] - allowed), "ts", tostring(now))
+    redis.call("EXPIRE", bucket[1], bucket[3])
+end
+
+local outcome = allowed == 1 and ":allowed" or ":limited"
+redis.call("HINCRBY", KEYS[#KEYS], ARGV[1] .. outcome, 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+def is_enabled():
+    """Check if guest cart and checkout endpoints should be rate limited"""
+    return bool(cint(frappe.get_cached_doc("Webshop Settings").get("rate_limit_guest_endpoints")))
+
+
+def check_rate_limit():
+    """before_request hook - refuse guest checkout calls over their budget with a 429"""
+    endpoint = _get_request_endpoint()
+    budget = ENDPOINT_BUDGETS.get(endpoint)
+    if not budget or not is_enabled():
+        return
+
+    allowed, retry_after = consume(budget)
+    if not allowed:
+        frappe.local.guest_checkout_retry_after = retry_after
+        frappe.throw(_("Too many requests, please try again shortly"), frappe.TooManyRequestsError)
+
+
+def add_retry_after_header(response=None, request=None):
+    """after_request hook - tell a limited client when to come back"""
+    retry_after = getattr(frappe.local, "guest_checkout_retry_after", None)
+    if retry_after is not None and response is not None:
+        response.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+
+
+def consume(budget):
+    """Take a token from the caller's buckets for a budget
+
+    Returns:
+        tuple: (allowed, seconds until a token is available)
+    """
+    capacity, rate = RATE_LIMIT_BUDGETS[budget]
+    cache = frappe.cache()
+
+    keys, args = [], [budget, time.time()]
+    for identity, factor in _get_identities():
+        keys.append(cache.make_key(f"{RATE_LIMIT_PREFIX}:{budget}:{identity}"))
+        args.extend([capacity * factor, rate * factor])
+    keys.append(cache.make_key(RATE_LIMIT_STATS_KEY))
+
+    allowed, retry_after = cache.eval(TOKEN_BUCKET_SCRIPT, len(keys), *keys, *args)
+    return bool(cint(allowed)), flt(frappe.safe_decode(retry_after))
+
+
+@frappe.whitelist()
+def get_rate_limit_stats():
+    """Return allowed and limited request counts per budget (System Manager only)"""
+    frappe.only_for("System Manager")
+
+    cache = frappe.cache()
+    # Counters are raw hincrby values, so bypass the unpickling hgetall wrapper
+    pipe = cache.pipeline()
+    pipe.hgetall(cache.make_key(RATE_LIMIT_STATS_KEY))
+    (counters,) = pipe.execute()
+    raw = {frappe.safe_decode(field): cint(frappe.safe_decode(value)) for field, value in counters.items()}
+
+    return {
+        budget: {
+            "allowed": raw.get(f"{budget}:allowed", 0),
+            "limited": raw.get(f"{budget}:limited", 0),
+            "capacity": capacity,
+            "refill_per_second": rate,
+        }
+        for budget, (capacity, rate) in RATE_LIMIT_BUDGETS.items()
+    }
+
+
+@frappe.whitelist()
+def reset_rate_limit_stats():
+    """Clear the request counters (System Manager only)"""
+    frappe.only_for("System Manager")
+
+    cache = frappe.cache()
+    cache.delete(cache.make_key(RATE_LIMIT_STATS_KEY))
+
+
+def _get_identities():
+    """(identity, budget factor) pairs the current caller is limited by"""
+    if frappe.session.user != "Guest":
+        return [(f"user:{frappe.session.user}", 1)]
+
+    identities = []
+    guest_id = frappe.session.get("guest_id")
+    if not guest_id and getattr(frappe, "request", None):
+        guest_id = frappe.request.cookies.get("guest_id")
+    if guest_id:
+        identities.append((f"guest:{guest_id}", 1))
+
+    identities.append((f"ip:{getattr(frappe.local, 'request_ip', None) or 'unknown'}", IP_BUDGET_FACTOR))
+    return identities
@@ -0,0 +1,174 @@
+# guest_checkout/guest_checkout/stock_check.py
+import pickle
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+
+# Stock is checked before checkout writes anything. Available quantity (Bin
+# actual_qty - reserved_qty) of every cart line in its website warehouse is
+# read for the whole cart in one query. The check_cart_stock endpoint, polled
+# by the checkout form, serves it from a per-item cache of a few seconds;
+# checkout itself always reads the Bins, so an order submitted a moment ago
+# can't let the next one oversell.
+STOCK_CACHE_PREFIX = "guest_checkout:stock"
+STOCK_CACHE_TTL = 15
+
+
+def is_enabled():
+    """Check if carts should be checked against available stock before checkout"""
+    return bool(cint(frappe.get_cached_doc("Webshop Settings").get("check_stock_before_checkout")))
+
+
+@frappe.whitelist(allow_guest=True)
+def check_cart_stock():
+    """Check the shopper's cart against available stock, without loading or writing the cart
+
+    Returns:
+        dict: {available, shortages: [{item_code, item_name, warehouse, qty, available_qty}]}
+    """
+    if not is_enabled():
+        return {"available": True, "shortages": []}
+
+    shortages = get_shortages(_get_cart_lines())
+    return {"available": not shortages, "shortages": shortages}
+
+
+def validate_stock(lines):
+    """Throw if any line asks for more than is available, reading the Bins fresh"""
+    shortages = get_shortages(lines, cached=False)
+    if shortages:
+        frappe.throw(
+            _("Not enough stock for {0}").format(
+                ", ".join(_("{0} ({1} available)").format(s["item_name"], s["available_qty"]) for s in shortages)
+            ),
+            title=_("Insufficient Stock"),
+        )
+
+
+def get_shortages(lines, cached=True):
+    """Lines ({item_code, qty, warehouse}) that ask for more than is available
+
+    Lines of the same item and warehouse are added up. A line without a
+    warehouse is checked against all warehouses, and items that are not
+    stock items are never short. See get_stock for cached.
+    """
+    requested = {}
+    for line in lines:
+        key = (line.get("item_code"), line.get("warehouse") or None)
+        qty = flt(line.get("stock_qty")) or flt(line.get("qty")) * (flt(line.get("conversion_factor")) or 1)
+        entry = requested.setdefault(key, {"item_name": line.get("item_name") or key[0], "qty": 0})
+        entry["qty"] += qty
+
+    stock = get_stock([item_code for item_code, _warehouse in requested], cached=cached)
+
+    shortages = []
+    for (item_code, warehouse), entry in requested.items():
+        item_stock = stock[item_code]
+        if not item_stock["is_stock_item"]:
+            continue
+
+        bins = item_stock["warehouses"]
+        available = bins.get(warehouse, 0) if warehouse else sum(bins.values())
+        if entry["qty"] > available:
+            shortages.append({
+                "item_code": item_code,
+                "item_name": entry["item_name"],
+                "warehouse": warehouse,
+                "qty": entry["qty"],
+                "available_qty": max(available, 0),
+            })
+
+    return shortages
+
+
+def get_stock(item_codes, cached=True):
+    """Available stock per warehouse of items, cached for STOCK_CACHE_TTL seconds
+
+    With cached=False the Bins are read for every item and the cache is
+    refreshed with what was read.
+
+    Returns:
+        dict: item_code -> {is_stock_item, warehouses: {warehouse: actual_qty - reserved_qty}}
+    """
+    item_codes = list(dict.fromkeys(code for code in item_codes if code))
+    if not item_codes:
+        return {}
+
+    cache = frappe.cache()
+    keys = {item_code: cache.make_key(f"{STOCK_CACHE_PREFIX}:{item_code}") for item_code in item_codes}
+
+    stock, missing = {}, list(item_codes)
+    if cached:
+        # One round trip for the cached items
+        pipe = cache.pipeline()
+        for item_code in item_codes:
+            pipe.get(keys[item_code])
+
+        missing = []
+        for item_code, entry in zip(item_codes, pipe.execute()):
+            if entry:
+                stock[item_code] = pickle.loads(entry)
+            else:
+                missing.append(item_code)
+
+    if missing:
+        fetched = _fetch_stock(missing)
+        pipe = cache.pipeline()
+        for item_code in missing:
+            stock[item_code] = fetched.get(item_code) or {"is_stock_item": False, "warehouses": {}}
+            pipe.set(keys[item_code], pickle.dumps(stock[item_code]), ex=STOCK_CACHE_TTL)
+        pipe.execute()
+
+    return stock
+
+
+def _fetch_stock(item_codes):
+    """One query for the items and all their Bins (one Bin per item and warehouse)"""
+    item = frappe.qb.DocType("Item")
+    bin = frappe.qb.DocType("Bin")
+
+    rows = (
+        frappe.qb.from_(item)
+        .left_join(bin).on(bin.item_code == item.name)
+        .select(item.name, item.is_stock_item, bin.warehouse, bin.actual_qty, bin.reserved_qty)
+        .where(item.name.isin(item_codes))
+    ).run(as_dict=True)
+
+    stock = {}
+    for row in rows:
+        entry = stock.setdefault(row.name, {"is_stock_item": bool(cint(row.is_stock_item)), "warehouses": {}})
+        if row.warehouse:
+            entry["warehouses"][row.warehouse] = flt(row.actual_qty) - flt(row.reserved_qty)
+
+    return stock
+
+
+def _get_cart_lines():
+    """Lines of the shopper's cart, read from the cart cache or the Quotation Item table"""
+    from guest_checkout import cart_coalescer, guest_cart_store
+    from guest_checkout.guest_cart import get_cart_summary
+
+    if frappe.session.user == "Guest" and guest_cart_store.is_enabled():
+        return guest_cart_store.get_cart(frappe.session.get("guest_id"))["items"]
+
+    quotation = get_cart_summary().quotation
+    if not quotation:
+        return []
+
+    lines = frappe.get_all(
+        "Quotation Item",
+        filters={"parent": quotation, "parenttype": "Quotation"},
+        fields=["item_code", "item_name", "qty", "stock_qty", "conversion_factor", "warehouse"],
+    )
+
+    if cart_coalescer.is_enabled():
+        # Buffered quantities are what checkout will order
+        pending = cart_coalescer.get_pending(quotation)
+        for line in lines:
+            if line.item_code in pending:
+                line.qty = pending[line.item_code]["qty"]
+                line.stock_qty = None
+
+    return lines
@@ -0,0 +1,73 @@
+# guest_checkout/guest_checkout/tests/test_cart_coalescer.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import cart_coalescer
+from guest_checkout.checkout_bootstrap import get_checkout_bootstrap
+from guest_checkout.guest_cart import (
+    get_cart_quotation_allow_guest,
+    get_shopping_cart_menu,
+    update_cart_allow_guest
+)
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestCartCoalescer(FrappeTestCase):
+    def setUp(self):
+        frappe.db.set_single_value("Webshop Settings", "enabled", 1)
+        frappe.db.set_single_value("Webshop Settings", "guest_cart_in_cache", 0)
+        frappe.db.set_single_value("Webshop Settings", "coalesce_cart_updates", 1)
+
+        self.item = make_test_item()
+
+        self.original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+
+    def tearDown(self):
+        quotation_name = frappe.session.get("guest_quotation_name")
+        if quotation_name:
+            cart_coalescer.pop_pending(quotation_name)
+        frappe.session.user = self.original_session_user
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+        frappe.db.rollback()
+
+    def test_quantity_change_is_buffered(self):
+        response = update_cart_allow_guest(self.item.item_code, 1)
+        quotation_name = response["name"]
+
+        response = update_cart_allow_guest(self.item.item_code, 4)
+
+        self.assertEqual(response["shopping_cart_menu"]["cart_count"], 4)
+        self.assertEqual(frappe.db.get_value("Quotation", quotation_name, "total_qty"), 1)
+        self.assertEqual(get_shopping_cart_menu()["cart_items"][0]["qty"], 4)
+
+    def test_cart_page_saves_buffered_changes(self):
+        quotation_name = update_cart_allow_guest(self.item.item_code, 1)["name"]
+        update_cart_allow_guest(self.item.item_code, 2)
+        update_cart_allow_guest(self.item.item_code, 3)
+
+        get_cart_quotation_allow_guest()
+
+        self.assertEqual(frappe.db.get_value("Quotation", quotation_name, "total_qty"), 3)
+        self.assertFalse(cart_coalescer.get_pending(quotation_name))
+
+    def test_checkout_bootstrap_saves_buffered_changes(self):
+        quotation_name = update_cart_allow_guest(self.item.item_code, 1)["name"]
+        update_cart_allow_guest(self.item.item_code, 5)
+
+        bootstrap = get_checkout_bootstrap()
+
+        self.assertEqual(bootstrap["cart"]["count"], 5)
+        self.assertEqual(frappe.db.get_value("Quotation", quotation_name, "total_qty"), 5)
+        self.assertFalse(cart_coalescer.get_pending(quotation_name))
+
+    def test_removal_saves_buffered_changes(self):
+        quotation_name = update_cart_allow_guest(self.item.item_code, 1)["name"]
+        update_cart_allow_guest(self.item.item_code, 2)
+
+        update_cart_allow_guest(self.item.item_code, 0)
+
+        self.assertFalse(frappe.db.exists("Quotation", quotation_name))
+        self.assertFalse(cart_coalescer.get_pending(quotation_name))
@@ -0,0 +1,54 @@
+# guest_checkout/guest_checkout/tests/test_cart_conflicts.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout.guest_cart import update_cart_allow_guest, update_cart_items_allow_guest
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestCartConflicts(FrappeTestCase):
+    def setUp(self):
+        frappe.db.set_single_value("Webshop Settings", "enabled", 1)
+        frappe.db.set_single_value("Webshop Settings", "guest_cart_in_cache", 0)
+        frappe.db.set_single_value("Webshop Settings", "coalesce_cart_updates", 0)
+        frappe.db.set_single_value("Webshop Settings", "large_cart_threshold", 0)
+
+        self.item_codes = [make_test_item(f"Test Cart Conflict Item {i}").name for i in range(1, 3)]
+
+        self.original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+
+    def tearDown(self):
+        frappe.session.user = self.original_session_user
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+        frappe.db.rollback()
+
+    def _get_qtys(self, quotation_name):
+        quotation = frappe.get_doc("Quotation", quotation_name)
+        return {item.item_code: item.qty for item in quotation.items}
+
+    def test_change_to_same_line_is_a_conflict(self):
+        response = update_cart_items_allow_guest([{"item_code": code, "qty": 1} for code in self.item_codes])
+        stale_version = response["version"]
+
+        # Another tab changes the first line
+        update_cart_allow_guest(self.item_codes[0], 4, base_qty=1, version=stale_version)
+
+        response = update_cart_allow_guest(self.item_codes[0], 2, base_qty=1, version=stale_version)
+        self.assertEqual(
+            response["conflicts"], [{"item_code": self.item_codes[0], "qty": 4, "requested_qty": 2}]
+        )
+        self.assertEqual(self._get_qtys(response["name"])[self.item_codes[0]], 4)
+
+    def test_change_to_other_line_is_merged(self):
+        response = update_cart_items_allow_guest([{"item_code": code, "qty": 1} for code in self.item_codes])
+        stale_version = response["version"]
+
+        update_cart_allow_guest(self.item_codes[0], 4, base_qty=1, version=stale_version)
+
+        response = update_cart_allow_guest(self.item_codes[1], 3, base_qty=1, version=stale_version)
+        self.assertNotIn("conflicts", response)
+        self.assertEqual(self._get_qtys(response["name"]), {self.item_codes[0]: 4, self.item_codes[1]: 3})
+
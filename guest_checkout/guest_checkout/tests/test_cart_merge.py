@@ -0,0 +1,80 @@
+# guest_checkout/guest_checkout/tests/test_cart_merge.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout.cart_merge import merge_guest_cart, remember_guest_cart
+from guest_checkout.guest_cart import update_cart_allow_guest
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestCartMerge(FrappeTestCase):
+    def setUp(self):
+        frappe.db.set_single_value("Webshop Settings", "enabled", 1)
+        frappe.db.set_single_value("Webshop Settings", "guest_cart_in_cache", 0)
+        frappe.db.set_single_value("Webshop Settings", "coalesce_cart_updates", 0)
+
+        self.item_codes = [make_test_item(f"Test Cart Merge Item {i}").name for i in range(1, 4)]
+
+        self.user = "test_cart_merge@example.com"
+        if not frappe.db.exists("User", self.user):
+            frappe.get_doc({
+                "doctype": "User",
+                "email": self.user,
+                "first_name": "Cart Merge",
+                "user_type": "Website User",
+                "send_welcome_email": 0,
+            }).insert(ignore_permissions=True)
+
+        self.original_session_user = frappe.session.user
+        self._start_guest_session()
+
+    def tearDown(self):
+        frappe.session.user = self.original_session_user
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+        frappe.db.rollback()
+
+    def _start_guest_session(self):
+        frappe.session.user = "Guest"
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+
+    def _login(self):
+        remember_guest_cart()
+        # Login replaces the guest session
+        self._start_guest_session()
+        frappe.session.user = self.user
+        return merge_guest_cart()
+
+    def _get_lines(self, quotation):
+        return {item.item_code: (item.qty, item.additional_notes) for item in quotation.items}
+
+    def test_guest_lines_are_added_to_user_cart(self):
+        frappe.session.user = self.user
+        user_cart = update_cart_allow_guest(self.item_codes[0], 1, "user note")["name"]
+        update_cart_allow_guest(self.item_codes[1], 1)
+
+        self._start_guest_session()
+        update_cart_allow_guest(self.item_codes[0], 2, "guest note")
+        update_cart_allow_guest(self.item_codes[2], 3)
+        guest_cart = frappe.session.get("guest_quotation_name")
+
+        quotation = self._login()
+
+        self.assertEqual(quotation.name, user_cart)
+        self.assertEqual(self._get_lines(quotation), {
+            self.item_codes[0]: (3, "guest note"),
+            self.item_codes[1]: (1, None),
+            self.item_codes[2]: (3, None),
+        })
+        self.assertFalse(frappe.db.exists("Quotation", guest_cart))
+
+    def test_guest_draft_becomes_user_cart(self):
+        update_cart_allow_guest(self.item_codes[0], 2)
+        guest_cart = frappe.session.get("guest_quotation_name")
+
+        quotation = self._login()
+
+        self.assertEqual(quotation.name, guest_cart)
+        self.assertEqual(quotation.contact_email, self.user)
+        self.assertTrue(quotation.party_name)
+        self.assertEqual(self._get_lines(quotation), {self.item_codes[0]: (2, None)})
@@ -0,0 +1,98 @@
+# guest_checkout/guest_checkout/tests/test_cart_summary.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import cart_summary
+from guest_checkout.guest_cart import (
+    get_cart_quotation_allow_guest,
+    get_cart_summary,
+    get_guest_id,
+    set_cart_count_allow_guest,
+    update_cart_allow_guest
+)
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestCartSummary(FrappeTestCase):
+    def setUp(self):
+        frappe.db.set_single_value("Webshop Settings", "enabled", 1)
+        frappe.db.set_single_value("Webshop Settings", "guest_cart_in_cache", 0)
+
+        self.item = make_test_item()
+
+        self.original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+
+    def tearDown(self):
+        cart_summary.clear_summary()
+        frappe.session.user = self.original_session_user
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+        frappe.db.rollback()
+
+    def test_cart_count_without_cart_inserts_nothing(self):
+        quotation_count = frappe.db.count("Quotation")
+
+        get_guest_id()
+        set_cart_count_allow_guest()
+
+        self.assertEqual(get_cart_summary().count, 0)
+        self.assertEqual(frappe.db.count("Quotation"), quotation_count)
+
+    def test_summary_follows_cart_updates(self):
+        response = update_cart_allow_guest(self.item.item_code, 3)
+
+        summary = cart_summary.get_summary()
+        self.assertEqual(summary.quotation, response["name"])
+        self.assertEqual(summary.count, 3)
+
+        update_cart_allow_guest(self.item.item_code, 0)
+        self.assertEqual(cart_summary.get_summary().count, 0)
+
+    def test_summary_is_rebuilt_from_the_open_cart(self):
+        response = update_cart_allow_guest(self.item.item_code, 2)
+        cart_summary.clear_summary()
+
+        summary = get_cart_summary()
+
+        self.assertEqual(summary.quotation, response["name"])
+        self.assertEqual(summary.count, 2)
+
+    def test_unchanged_cart_is_not_modified(self):
+        update_cart_allow_guest(self.item.item_code, 1)
+        version = get_cart_quotation_allow_guest()["version"]
+
+        response = get_cart_quotation_allow_guest(if_none_match=version)
+
+        self.assertTrue(response["not_modified"])
+        self.assertNotIn("doc", response)
+
+    def test_cart_update_changes_version(self):
+        update_cart_allow_guest(self.item.item_code, 1)
+        version = get_cart_quotation_allow_guest()["version"]
+
+        update_cart_allow_guest(self.item.item_code, 2)
+        response = get_cart_quotation_allow_guest(if_none_match=version)
+
+        self.assertNotIn("not_modified", response)
+        self.assertEqual(response["doc"].total_qty, 2)
+
+    def test_address_change_changes_version(self):
+        quotation_name = update_cart_allow_guest(self.item.item_code, 1)["name"]
+        version = get_cart_quotation_allow_guest()["version"]
+
+        address = frappe.get_doc({
+            "doctype": "Address",
+            "address_title": "Cart Version Address",
+            "address_line1": "Block 1, Street 1",
+            "city": "Salmiya",
+            "country": "Kuwait",
+        }).insert(ignore_permissions=True)
+        quotation = frappe.get_doc("Quotation", quotation_name)
+        quotation.customer_address = address.name
+        quotation.shipping_address_name = address.name
+        quotation.save(ignore_permissions=True)
+
+        self.assertEqual(cart_summary.get_summary().shipping_address_name, address.name)
+        self.assertNotIn("not_modified", get_cart_quotation_allow_guest(if_none_match=version))
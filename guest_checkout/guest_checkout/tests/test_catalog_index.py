@@ -0,0 +1,63 @@
+# guest_checkout/guest_checkout/tests/test_catalog_index.py
+from collections import OrderedDict
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import catalog_index
+from guest_checkout.catalog_index import clear_catalog_index, resolve_website_items
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestCatalogIndex(FrappeTestCase):
+    def setUp(self):
+        self.item = make_test_item()
+
+        self.web_item = frappe.db.get_value("Website Item", {"item_code": self.item.item_code}, "name")
+        if not self.web_item:
+            self.web_item = frappe.get_doc({
+                "doctype": "Website Item",
+                "item_code": self.item.item_code,
+                "web_item_name": self.item.item_name,
+                "published": 1,
+            }).insert(ignore_permissions=True).name
+        clear_catalog_index()
+
+    def tearDown(self):
+        clear_catalog_index()
+        frappe.db.rollback()
+
+    def test_resolves_website_item_names_and_item_codes(self):
+        entries = resolve_website_items([self.web_item, self.item.item_code, "Does Not Exist"])
+
+        self.assertEqual(entries[self.web_item].item_code, self.item.item_code)
+        self.assertEqual(entries[self.item.item_code].website_item, self.web_item)
+        self.assertEqual(entries["Does Not Exist"].item_code, "Does Not Exist")
+        self.assertFalse(entries["Does Not Exist"].enabled)
+
+    def test_resolved_entries_are_kept_in_both_layers(self):
+        resolve_website_items([self.web_item])
+
+        local_index = catalog_index._get_local_index()
+        self.assertIn(self.web_item, local_index)
+        local_index.clear()
+        self.assertEqual(resolve_website_items([self.web_item])[self.web_item].item_code, self.item.item_code)
+
+    def test_local_index_is_kept_per_site(self):
+        other_index = OrderedDict(code=frappe._dict(item_code="code"))
+        catalog_index._local_indexes["other.site"] = ("other-version", other_index)
+
+        resolve_website_items([self.web_item])
+        clear_catalog_index()
+        resolve_website_items([self.web_item])
+
+        self.assertIs(catalog_index._local_indexes["other.site"][1], other_index)
+        self.assertIn("code", other_index)
+        catalog_index._local_indexes.pop("other.site")
+
+    def test_website_item_save_invalidates_index(self):
+        resolve_website_items([self.web_item])
+
+        frappe.db.set_value("Website Item", self.web_item, "published", 0)
+        frappe.get_doc("Website Item", self.web_item).save(ignore_permissions=True)
+
+        self.assertFalse(resolve_website_items([self.web_item])[self.web_item].enabled)
@@ -0,0 +1,49 @@
+# guest_checkout/guest_checkout/tests/test_checkout_bootstrap.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import cart_summary
+from guest_checkout.checkout_bootstrap import get_checkout_bootstrap
+from guest_checkout.guest_cart import update_cart_allow_guest
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestCheckoutBootstrap(FrappeTestCase):
+    def setUp(self):
+        frappe.db.set_single_value("Webshop Settings", "enabled", 1)
+        frappe.db.set_single_value("Webshop Settings", "guest_cart_in_cache", 0)
+
+        self.item = make_test_item()
+
+        self.original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+
+    def tearDown(self):
+        cart_summary.clear_summary()
+        frappe.session.user = self.original_session_user
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+        frappe.db.rollback()
+
+    def test_bootstrap_returns_cart_and_checkout_options(self):
+        update_cart_allow_guest(self.item.item_code, 2)
+
+        bootstrap = get_checkout_bootstrap()
+
+        self.assertEqual(bootstrap["cart"]["count"], 2)
+        self.assertEqual(bootstrap["items"][0]["item_code"], self.item.item_code)
+        self.assertIn("Cash on Delivery", bootstrap["payment_methods"])
+        self.assertIsInstance(bootstrap["delivery_areas"], list)
+        self.assertTrue(bootstrap["version"])
+
+    def test_unchanged_cart_is_not_modified(self):
+        update_cart_allow_guest(self.item.item_code, 1)
+        version = get_checkout_bootstrap()["version"]
+
+        self.assertTrue(get_checkout_bootstrap(if_none_match=version)["not_modified"])
+
+        update_cart_allow_guest(self.item.item_code, 3)
+        bootstrap = get_checkout_bootstrap(if_none_match=version)
+        self.assertNotIn("not_modified", bootstrap)
+        self.assertEqual(bootstrap["cart"]["count"], 3)
@@ -0,0 +1,44 @@
+# guest_checkout/guest_checkout/tests/test_checkout_jobs.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout.checkout_jobs import get_checkout_job_status, set_job_status
+
+
+class TestCheckoutJobs(FrappeTestCase):
+    def test_unknown_job_is_not_found(self):
+        self.assertEqual(get_checkout_job_status("does-not-exist")["status"], "not_found")
+
+    def test_job_status_round_trip(self):
+        job_id = frappe.generate_hash(length=20)
+
+        set_job_status(job_id, "queued")
+        self.assertEqual(get_checkout_job_status(job_id)["status"], "queued")
+
+        set_job_status(job_id, "completed", result={"success": True, "sales_order": "SO-0001"})
+        job = get_checkout_job_status(job_id)
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["result"]["sales_order"], "SO-0001")
+
+    def test_failed_job_gives_cart_back_to_guest(self):
+        original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+
+        try:
+            job_id = frappe.generate_hash(length=20)
+            set_job_status(job_id, "failed", message="Checkout failed", cart_refs={"guest_id": "abc123", "quotation_name": None})
+
+            job = get_checkout_job_status(job_id)
+            self.assertEqual(job["status"], "failed")
+            self.assertNotIn("cart_refs", job)
+            self.assertEqual(frappe.session.get("guest_id"), "abc123")
+
+            # Restored once; later polls leave the session alone
+            frappe.session["guest_id"] = "other"
+            get_checkout_job_status(job_id)
+            self.assertEqual(frappe.session.get("guest_id"), "other")
+        finally:
+            frappe.session.user = original_session_user
+            for key in ("guest_id", "guest_quotation_name"):
+                frappe.session.pop(key, None)
@@ -0,0 +1,94 @@
+# guest_checkout/guest_checkout/tests/test_cleanup.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, nowdate
+from guest_checkout import cleanup
+
+
+class TestGuestCleanup(FrappeTestCase):
+    def tearDown(self):
+        frappe.cache().delete_value(cleanup.CLEANUP_STATE_CACHE_KEY)
+        frappe.db.rollback()
+
+    def test_old_guest_customer_without_orders_is_deleted(self):
+        customer = frappe.get_doc({
+            "doctype": "Customer",
+            "customer_name": "Old Guest Cleanup Customer",
+            "customer_type": "Individual",
+            "guest_checkout": 1,
+        })
+        customer.flags.ignore_mandatory = True
+        customer.insert(ignore_permissions=True)
+        frappe.db.set_value("Customer", customer.name, "modified", add_days(nowdate(), -30), update_modified=False)
+
+        summary = cleanup.run_cleanup(retention_days=7, chunk_size=1)
+
+        self.assertTrue(summary.completed)
+        self.assertFalse(frappe.db.exists("Customer", customer.name))
+        self.assertIsNone(frappe.cache().get_value(cleanup.CLEANUP_STATE_CACHE_KEY))
+        self.assertEqual(cleanup.get_last_summary()["customers"], summary.customers)
+
+    def test_contacts_and_addresses_of_deleted_guest_are_deleted(self):
+        customer = frappe.get_doc({
+            "doctype": "Customer",
+            "customer_name": "Old Guest Cleanup Contact",
+            "customer_type": "Individual",
+            "guest_checkout": 1,
+        })
+        customer.flags.ignore_mandatory = True
+        customer.insert(ignore_permissions=True)
+        frappe.db.set_value("Customer", customer.name, "modified", add_days(nowdate(), -30), update_modified=False)
+
+        contact = frappe.get_doc({
+            "doctype": "Contact",
+            "first_name": "Old Guest Cleanup Contact",
+            "phone_nos": [{"phone": "51239901", "is_primary_mobile_no": 1}],
+            "links": [{"link_doctype": "Customer", "link_name": customer.name}],
+        }).insert(ignore_permissions=True)
+        address = frappe.get_doc({
+            "doctype": "Address",
+            "address_title": "Old Guest Cleanup Contact",
+            "address_line1": "Block 1, Street 1",
+            "city": "Salmiya",
+            "country": "Kuwait",
+            "links": [{"link_doctype": "Customer", "link_name": customer.name}],
+        }).insert(ignore_permissions=True)
+        shared_contact = frappe.get_doc({
+            "doctype": "Contact",
+            "first_name": "Shared Cleanup Contact",
+            "links": [
+                {"link_doctype": "Customer", "link_name": customer.name},
+                {"link_doctype": "Supplier", "link_name": "_Test Supplier"},
+            ],
+        }).insert(ignore_permissions=True)
+
+        cleanup.run_cleanup(retention_days=7)
+
+        self.assertFalse(frappe.db.exists("Customer", customer.name))
+        self.assertFalse(frappe.db.exists("Contact", contact.name))
+        self.assertFalse(frappe.db.exists("Contact Phone", {"parent": contact.name}))
+        self.assertFalse(frappe.db.exists("Address", address.name))
+        self.assertFalse(frappe.db.exists("Dynamic Link", {"parent": address.name}))
+
+        self.assertTrue(frappe.db.exists("Contact", shared_contact.name))
+        links = frappe.get_all("Dynamic Link", {"parent": shared_contact.name}, pluck="link_doctype")
+        self.assertEqual(links, ["Supplier"])
+
+    def test_paused_run_resumes_from_checkpoint(self):
+        frappe.cache().set_value(cleanup.CLEANUP_STATE_CACHE_KEY, {
+            "phase": "customers",
+            "last_name": "ZZZZ",
+            "cutoff": add_days(nowdate(), -7),
+        })
+
+        summary = cleanup.run_cleanup()
+
+        self.assertTrue(summary.resumed)
+        self.assertEqual(summary.quotations, 0)
+        self.assertTrue(summary.completed)
+
+    def test_no_time_budget_pauses_run(self):
+        summary = cleanup.run_cleanup(max_runtime=-1)
+
+        self.assertFalse(summary.completed)
+        self.assertEqual(summary.chunks, 0)
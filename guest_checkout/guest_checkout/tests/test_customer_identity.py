@@ -0,0 +1,84 @@
+# guest_checkout/guest_checkout/tests/test_customer_identity.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import customer_identity
+
+
+class TestCustomerIdentity(FrappeTestCase):
+    def setUp(self):
+        self.country = frappe.db.get_default("country")
+        frappe.db.set_default("country", "Kuwait")
+
+    def tearDown(self):
+        frappe.db.set_default("country", self.country)
+        frappe.cache().delete_value(customer_identity.IDENTITY_CACHE_KEY)
+        frappe.db.rollback()
+
+    def test_identity_key_normalizes_mobile_and_email(self):
+        self.assertEqual(customer_identity.get_identity_key("+965 5555-1234"), "mobile:55551234")
+        self.assertEqual(customer_identity.get_identity_key("0096555551234"), "mobile:55551234")
+        self.assertEqual(customer_identity.get_identity_key("96555551234"), "mobile:55551234")
+        self.assertEqual(customer_identity.get_identity_key("5555-1234"), "mobile:55551234")
+        self.assertEqual(customer_identity.get_identity_key("+44 7700 900123"), "mobile:447700900123")
+        self.assertEqual(customer_identity.get_identity_key(None, " Guest@Example.COM "), "email:guest@example.com")
+        self.assertIsNone(customer_identity.get_identity_key(None, None))
+
+    def test_local_number_starting_with_calling_code_is_kept(self):
+        self.assertEqual(customer_identity.normalize_mobile("96512345"), "96512345")
+
+    def test_same_shopper_resolves_to_one_customer(self):
+        customer, created = customer_identity.resolve_customer("+965 5123 0001", "identity@example.com", "Identity Guest")
+        self.assertTrue(created)
+        self.assertTrue(customer.guest_checkout)
+        self.assertEqual(customer.guest_identity_key, "mobile:51230001")
+
+        again, created = customer_identity.resolve_customer("51230001", "other@example.com", "Identity Guest")
+        self.assertFalse(created)
+        self.assertEqual(again.name, customer.name)
+
+    def test_registered_customer_is_not_flagged_as_guest(self):
+        customer, created = customer_identity.resolve_customer(
+            "51230003", "registered@example.com", "Registered Shopper", guest_checkout=False
+        )
+
+        self.assertTrue(created)
+        self.assertFalse(customer.guest_checkout)
+
+    def test_backfill_sets_missing_keys(self):
+        customer, _created = customer_identity.resolve_customer("+965 5123 0004", "backfill@example.com", "Backfill Guest")
+        frappe.db.set_value("Customer", customer.name, "guest_identity_key", None)
+
+        customer_identity.backfill_identity_keys()
+
+        self.assertEqual(frappe.db.get_value("Customer", customer.name, "guest_identity_key"), "mobile:51230004")
+
+    def test_concurrent_insert_loads_the_existing_customer(self):
+        customer, _created = customer_identity.resolve_customer("51230005", "race@example.com", "Race Guest")
+        frappe.cache().delete_value(customer_identity.IDENTITY_CACHE_KEY)
+
+        # The row a concurrent checkout committed between our lookup and our insert
+        duplicate = frappe.get_doc({
+            "doctype": "Customer",
+            "customer_name": "Race Guest Duplicate",
+            "customer_type": "Individual",
+            "guest_checkout": 1,
+            "guest_identity_key": customer.guest_identity_key,
+        })
+        duplicate.flags.ignore_mandatory = True
+
+        resolved, created = customer_identity._insert_customer(duplicate)
+
+        self.assertFalse(created)
+        self.assertEqual(resolved.name, customer.name)
+        self.assertEqual(
+            frappe.cache().hget(customer_identity.IDENTITY_CACHE_KEY, customer.guest_identity_key), customer.name
+        )
+
+    def test_stale_cache_entry_falls_back_to_the_key_column(self):
+        customer, _created = customer_identity.resolve_customer("96551230002", "stale@example.com", "Stale Guest")
+        frappe.cache().hset(customer_identity.IDENTITY_CACHE_KEY, customer.guest_identity_key, "Deleted Customer")
+
+        resolved, created = customer_identity.resolve_customer("96551230002", "stale@example.com", "Stale Guest")
+
+        self.assertFalse(created)
+        self.assertEqual(resolved.name, customer.name)
@@ -0,0 +1,23 @@
+# guest_checkout/guest_checkout/tests/test_db_indexes.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout.db_indexes import add_guest_checkout_indexes, check_guest_checkout_indexes
+
+
+class TestGuestCheckoutIndexes(FrappeTestCase):
+    def test_indexes_are_created_and_reported(self):
+        add_guest_checkout_indexes()
+
+        report = check_guest_checkout_indexes()
+
+        self.assertEqual(report["missing"], [])
+        for row in report["indexes"]:
+            self.assertTrue(row["exists"])
+            self.assertTrue(row["plan"])
+
+    def test_adding_indexes_twice_is_a_no_op(self):
+        add_guest_checkout_indexes()
+        add_guest_checkout_indexes()
+
+        self.assertTrue(frappe.db.has_index("tabQuotation", "guest_cart_lookup_index"))
+
@@ -0,0 +1,69 @@
+# guest_checkout/guest_checkout/tests/test_direct_checkout.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import direct_checkout
+from guest_checkout.guest_cart import _get_cart_quotation_for_guest_or_user, update_cart_allow_guest
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestDirectCheckout(FrappeTestCase):
+    def setUp(self):
+        frappe.db.set_single_value("Webshop Settings", "enabled", 1)
+        frappe.db.set_single_value("Webshop Settings", "guest_cart_in_cache", 0)
+
+        self.item = make_test_item()
+
+        self.original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+
+    def tearDown(self):
+        frappe.session.user = self.original_session_user
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+        frappe.db.rollback()
+
+    def test_sales_order_is_built_from_the_cart(self):
+        update_cart_allow_guest(self.item.item_code, 3)
+        quotation = _get_cart_quotation_for_guest_or_user()
+
+        sales_order = direct_checkout.make_sales_order(quotation)
+
+        self.assertTrue(sales_order.is_new())
+        self.assertEqual(sales_order.company, quotation.company)
+        self.assertEqual(sales_order.selling_price_list, quotation.selling_price_list)
+        self.assertEqual(
+            [(item.item_code, item.qty, item.rate) for item in sales_order.items],
+            [(item.item_code, item.qty, item.rate) for item in quotation.items],
+        )
+
+    def test_discounted_cart_totals_match_the_quotation_path(self):
+        from erpnext.selling.doctype.quotation.quotation import _make_sales_order
+
+        update_cart_allow_guest(self.item.item_code, 3)
+        quotation = _get_cart_quotation_for_guest_or_user()
+        quotation.items[0].rate = 10
+        quotation.apply_discount_on = "Net Total"
+        quotation.discount_amount = 5
+        quotation.flags.ignore_permissions = True
+        quotation.save()
+
+        direct = direct_checkout.make_sales_order(quotation)
+        direct.run_method("set_missing_values")
+        direct.run_method("calculate_taxes_and_totals")
+
+        quotation.submit()
+        mapped = frappe.get_doc(_make_sales_order(quotation.name))
+
+        self.assertEqual(direct.discount_amount, 5)
+        self.assertLess(direct.grand_total, direct.total)
+        self.assertEqual(direct.grand_total, mapped.grand_total)
+
+    def test_draft_cart_is_dropped(self):
+        update_cart_allow_guest(self.item.item_code, 1)
+        quotation = _get_cart_quotation_for_guest_or_user()
+
+        direct_checkout.drop_cart(quotation)
+
+        self.assertFalse(frappe.db.exists("Quotation", quotation.name))
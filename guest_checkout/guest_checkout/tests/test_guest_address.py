@@ -0,0 +1,55 @@
+# guest_checkout/guest_checkout/tests/test_guest_address.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout.guest_address import get_address_fingerprint, get_or_create_address
+
+
+class TestGuestAddress(FrappeTestCase):
+    def setUp(self):
+        self.customers = []
+        for name in ("Address Guest One", "Address Guest Two"):
+            customer = frappe.get_doc({
+                "doctype": "Customer",
+                "customer_name": name,
+                "customer_type": "Individual",
+            })
+            customer.flags.ignore_mandatory = True
+            customer.insert(ignore_permissions=True)
+            self.customers.append(customer.name)
+
+        self.address_data = {
+            "address_line1": "Block 4, Street 12",
+            "city": "Salmiya",
+            "country": "Kuwait",
+            "pincode": "20004",
+        }
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_fingerprint_ignores_case_and_whitespace(self):
+        self.assertEqual(
+            get_address_fingerprint(self.address_data),
+            get_address_fingerprint({
+                "address_line1": "  block 4,   STREET 12 ",
+                "city": "salmiya",
+                "country": "KUWAIT",
+                "pincode": "20004",
+            })
+        )
+
+    def test_repeat_order_reuses_the_address(self):
+        first = get_or_create_address(self.customers[0], self.address_data)
+        second = get_or_create_address(self.customers[0], dict(self.address_data, city="SALMIYA"))
+
+        self.assertEqual(first.name, second.name)
+
+    def test_address_of_another_customer_is_not_shared(self):
+        first = get_or_create_address(self.customers[0], self.address_data)
+        second = get_or_create_address(self.customers[1], self.address_data)
+
+        self.assertNotEqual(first.name, second.name)
+        first.reload()
+        for address, customer in ((first, self.customers[0]), (second, self.customers[1])):
+            linked = {link.link_name for link in address.links if link.link_doctype == "Customer"}
+            self.assertEqual(linked, {customer})
@@ -0,0 +1,65 @@
+# guest_checkout/guest_checkout/tests/test_guest_cart_store.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import guest_cart_store
+from guest_checkout.guest_cart import (
+    get_guest_id,
+    get_shopping_cart_menu,
+    update_cart_allow_guest
+)
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestGuestCartStore(FrappeTestCase):
+    def setUp(self):
+        frappe.db.set_single_value("Webshop Settings", "enabled", 1)
+        frappe.db.set_single_value("Webshop Settings", "guest_cart_in_cache", 1)
+
+        self.item = make_test_item()
+
+        self.original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        if "guest_id" in frappe.session:
+            del frappe.session["guest_id"]
+
+    def tearDown(self):
+        guest_cart_store.delete_cart(frappe.session.get("guest_id"))
+        frappe.session.user = self.original_session_user
+        if "guest_id" in frappe.session:
+            del frappe.session["guest_id"]
+        frappe.db.rollback()
+
+    def test_update_cart_does_not_insert_quotation(self):
+        quotation_count = frappe.db.count("Quotation")
+
+        response = update_cart_allow_guest(self.item.item_code, 2)
+
+        self.assertIsNone(response["name"])
+        self.assertEqual(response["shopping_cart_menu"]["cart_count"], 2)
+        self.assertEqual(frappe.db.count("Quotation"), quotation_count)
+
+    def test_cart_lines_are_kept_in_cache(self):
+        update_cart_allow_guest(self.item.item_code, 1)
+        update_cart_allow_guest(self.item.item_code, 3, additional_notes="Gift wrap")
+
+        cart = guest_cart_store.get_cart(get_guest_id())
+        self.assertEqual(len(cart["items"]), 1)
+        self.assertEqual(cart["items"][0].qty, 3)
+        self.assertEqual(cart["items"][0].additional_notes, "Gift wrap")
+
+    def test_remove_last_item_clears_cart(self):
+        update_cart_allow_guest(self.item.item_code, 1)
+        update_cart_allow_guest(self.item.item_code, 0)
+
+        self.assertEqual(guest_cart_store.get_cart(get_guest_id())["items"], [])
+        self.assertEqual(get_shopping_cart_menu()["cart_count"], 0)
+
+    def test_totals_use_cached_rates(self):
+        cart = frappe._dict({"items": [
+            frappe._dict({"item_code": "A", "qty": 2, "rate": 1.5}),
+            frappe._dict({"item_code": "B", "qty": 1, "rate": 4}),
+        ]})
+
+        totals = guest_cart_store.get_totals(cart)
+        self.assertEqual(totals.total_qty, 3)
+        self.assertEqual(totals.grand_total, 7)
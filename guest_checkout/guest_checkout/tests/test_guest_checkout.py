@@ -7,7 +7,8 @@ from guest_checkout.guest_cart import (
     get_guest_party,
     _get_cart_quotation_for_guest_or_user,
     set_cart_count_allow_guest,
-    update_cart_allow_guest
+    update_cart_allow_guest,
+    update_cart_items_allow_guest
 )
 from guest_checkout.api import (
     create_customer_and_link_cart,
@@ -134,6 +135,31 @@ class TestGuestCheckout(FrappeTestCase):
         quotation = _get_cart_quotation_for_guest_or_user()
         self.assertEqual(len(quotation.items), 0) # Item should be removed
 
+    def test_bulk_update_cart_guest(self):
+        update_cart_allow_guest(self.item.item_code, 1)
+
+        response = update_cart_items_allow_guest([
+            {"item_code": self.item.item_code, "qty": 4, "additional_notes": "No onions"},
+        ])
+
+        quotation = _get_cart_quotation_for_guest_or_user()
+        self.assertEqual(response["name"], quotation.name)
+        self.assertEqual(response["shopping_cart_menu"]["cart_count"], 4)
+        self.assertEqual(quotation.items[0].qty, 4)
+        self.assertEqual(quotation.items[0].additional_notes, "No onions")
+
+    def test_bulk_update_cart_removing_everything_deletes_cart(self):
+        update_cart_allow_guest(self.item.item_code, 1)
+
+        response = update_cart_items_allow_guest('[{"item_code": "%s", "qty": 0}]' % self.item.item_code)
+
+        self.assertIsNone(response["name"])
+        self.assertEqual(response["shopping_cart_menu"]["cart_count"], 0)
+
+    def test_bulk_update_cart_requires_item_code(self):
+        with self.assertRaises(frappe.ValidationError):
+            update_cart_items_allow_guest([{"qty": 1}])
+
     def test_set_cart_count_guest(self):
         update_cart_allow_guest(self.item.item_code, 2)
         set_cart_count_allow_guest()
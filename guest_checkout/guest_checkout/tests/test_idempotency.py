@@ -0,0 +1,67 @@
+# guest_checkout/guest_checkout/tests/test_idempotency.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import idempotency
+
+
+class TestIdempotency(FrappeTestCase):
+    def setUp(self):
+        self.key = frappe.generate_hash(length=20)
+        self.original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        frappe.session["guest_id"] = frappe.generate_hash(length=10)
+
+    def tearDown(self):
+        idempotency.release("test", self.key)
+        frappe.session.user = self.original_session_user
+        frappe.session.pop("guest_id", None)
+
+    def test_first_call_owns_the_key(self):
+        self.assertIsNone(idempotency.get_replayed_response("test", self.key))
+
+    def test_concurrent_call_is_pending(self):
+        idempotency.get_replayed_response("test", self.key)
+
+        response = idempotency.get_replayed_response("test", self.key)
+        self.assertTrue(response["pending"])
+
+    def test_repeat_call_returns_stored_result(self):
+        idempotency.get_replayed_response("test", self.key)
+        idempotency.set_result("test", self.key, {"success": True, "sales_order": "SO-0001"})
+        frappe.db.after_commit.run()
+
+        response = idempotency.get_replayed_response("test", self.key)
+        self.assertEqual(response["sales_order"], "SO-0001")
+
+    def test_result_is_stored_only_after_commit(self):
+        idempotency.get_replayed_response("test", self.key)
+        idempotency.set_result("test", self.key, {"success": True, "sales_order": "SO-0001"})
+
+        self.assertTrue(idempotency.get_replayed_response("test", self.key)["pending"])
+
+        frappe.db.rollback()
+        self.assertIsNone(idempotency.get_replayed_response("test", self.key))
+
+    def test_release_allows_retry(self):
+        idempotency.get_replayed_response("test", self.key)
+        idempotency.release("test", self.key)
+
+        self.assertIsNone(idempotency.get_replayed_response("test", self.key))
+
+    def test_missing_key_is_not_tracked(self):
+        self.assertIsNone(idempotency.get_replayed_response("test", None))
+        self.assertIsNone(idempotency.get_session_key(None))
+
+    def test_session_key_is_scoped_to_the_guest(self):
+        first_key = idempotency.get_session_key(self.key)
+
+        frappe.session["guest_id"] = frappe.generate_hash(length=10)
+        second_key = idempotency.get_session_key(self.key)
+
+        self.assertNotEqual(first_key, second_key)
+        self.assertTrue(second_key.endswith(self.key))
+
+        idempotency.get_replayed_response("test", first_key)
+        self.assertIsNone(idempotency.get_replayed_response("test", second_key))
+        idempotency.release("test", first_key)
+        idempotency.release("test", second_key)
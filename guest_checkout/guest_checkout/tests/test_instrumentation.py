@@ -0,0 +1,43 @@
+# guest_checkout/guest_checkout/tests/test_instrumentation.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import instrumentation
+
+
+class TestInstrumentation(FrappeTestCase):
+    endpoint = "guest_checkout.tests.test_instrumentation"
+
+    def setUp(self):
+        frappe.set_user("Administrator")
+        instrumentation.reset_checkout_profile()
+
+    def tearDown(self):
+        instrumentation.reset_checkout_profile()
+
+    def test_stages_are_recorded(self):
+        instrumentation.start_profile(self.endpoint)
+        with instrumentation.stage("lookup"):
+            frappe.db.sql("select 1")
+            frappe.db.sql("select 2")
+        instrumentation.finish_profile()
+
+        profile = instrumentation.get_checkout_profile()[self.endpoint]
+        self.assertEqual(profile["wall"]["count"], 1)
+        self.assertEqual(profile["queries"], 2)
+        self.assertEqual(profile["stages"]["lookup"]["count"], 1)
+        self.assertEqual(profile["stages"]["lookup"]["queries"], 2)
+
+    def test_stage_without_profile_is_noop(self):
+        with instrumentation.stage("lookup"):
+            frappe.db.sql("select 1")
+
+        self.assertEqual(instrumentation.get_checkout_profile(), {})
+
+    def test_prometheus_export(self):
+        instrumentation.start_profile(self.endpoint)
+        instrumentation.finish_profile()
+
+        response = instrumentation.get_checkout_metrics()
+        body = response.get_data(as_text=True)
+        self.assertIn(f'guest_checkout_request_seconds_count{{endpoint="{self.endpoint}"}} 1', body)
+        self.assertIn('le="+Inf"', body)
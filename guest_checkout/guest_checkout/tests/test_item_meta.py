@@ -0,0 +1,34 @@
+# guest_checkout/guest_checkout/tests/test_item_meta.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout.item_meta import ITEM_META_CACHE_KEY, clear_item_meta_cache, get_item_meta
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestItemMeta(FrappeTestCase):
+    def setUp(self):
+        self.item = make_test_item()
+        clear_item_meta_cache()
+
+    def tearDown(self):
+        clear_item_meta_cache()
+        frappe.db.rollback()
+
+    def test_get_item_meta_is_cached(self):
+        meta = get_item_meta([self.item.item_code, self.item.item_code])
+
+        self.assertEqual(list(meta), [self.item.item_code])
+        self.assertEqual(meta[self.item.item_code].item_name, self.item.item_name)
+        self.assertIsNotNone(frappe.cache().hget(ITEM_META_CACHE_KEY, self.item.item_code))
+
+    def test_item_save_invalidates_cache(self):
+        get_item_meta([self.item.item_code])
+
+        self.item.item_name = "Renamed Guest Checkout Item"
+        self.item.save()
+
+        meta = get_item_meta([self.item.item_code])
+        self.assertEqual(meta[self.item.item_code].item_name, "Renamed Guest Checkout Item")
+
+    def test_unknown_items_are_skipped(self):
+        self.assertEqual(get_item_meta(["Does Not Exist", None]), {})
@@ -0,0 +1,99 @@
+# guest_checkout/guest_checkout/tests/test_large_cart.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import large_cart
+from guest_checkout.guest_cart import update_cart_allow_guest, update_cart_items_allow_guest
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestLargeCart(FrappeTestCase):
+    def setUp(self):
+        frappe.db.set_single_value("Webshop Settings", "enabled", 1)
+        frappe.db.set_single_value("Webshop Settings", "guest_cart_in_cache", 0)
+        frappe.db.set_single_value("Webshop Settings", "coalesce_cart_updates", 0)
+        frappe.db.set_single_value("Webshop Settings", "large_cart_threshold", 3)
+
+        self.item_codes = [make_test_item(f"Test Large Cart Item {i}").name for i in range(1, 5)]
+
+        self.original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+
+    def tearDown(self):
+        frappe.session.user = self.original_session_user
+        for key in ("guest_id", "guest_quotation_name"):
+            frappe.session.pop(key, None)
+        frappe.db.rollback()
+
+    def _fill_cart(self):
+        return update_cart_items_allow_guest([
+            {"item_code": item_code, "qty": 2} for item_code in self.item_codes[:3]
+        ])["name"]
+
+    def test_incremental_totals_match_full_recalculation(self):
+        quotation_name = self._fill_cart()
+
+        update_cart_allow_guest(self.item_codes[0], 5)
+        update_cart_allow_guest(self.item_codes[3], 1)
+
+        quotation = frappe.get_doc("Quotation", quotation_name)
+        incremental = (quotation.total_qty, quotation.net_total, quotation.grand_total)
+
+        quotation.calculate_taxes_and_totals()
+        self.assertEqual(incremental, (quotation.total_qty, quotation.net_total, quotation.grand_total))
+        self.assertEqual(quotation.total_qty, 10)
+
+    def test_removed_line_is_deleted(self):
+        quotation_name = self._fill_cart()
+
+        update_cart_allow_guest(self.item_codes[1], 0)
+
+        quotation = frappe.get_doc("Quotation", quotation_name)
+        self.assertEqual([item.item_code for item in quotation.items], [self.item_codes[0], self.item_codes[2]])
+        self.assertEqual(quotation.total_qty, 4)
+
+    def test_compound_taxes_need_the_full_recalculation(self):
+        quotation = frappe.get_doc("Quotation", self._fill_cart())
+        quotation.append("taxes", {"charge_type": "On Previous Row Total", "rate": 5})
+        change = frappe._dict({"item_code": self.item_codes[0], "qty": 4})
+
+        self.assertTrue(large_cart.is_large_cart(quotation))
+        self.assertFalse(large_cart.can_update(quotation, [change]))
+
+    def test_changed_line_gets_pricing_rule_discount(self):
+        quotation_name = self._fill_cart()
+        quotation = frappe.get_doc("Quotation", quotation_name)
+        item_code = self.item_codes[0]
+
+        frappe.get_doc({
+            "doctype": "Item Price",
+            "item_code": item_code,
+            "price_list": quotation.selling_price_list,
+            "price_list_rate": 100,
+        }).insert(ignore_permissions=True)
+        frappe.get_doc({
+            "doctype": "Pricing Rule",
+            "title": "Test Large Cart Discount",
+            "apply_on": "Item Code",
+            "items": [{"item_code": item_code}],
+            "selling": 1,
+            "company": quotation.company,
+            "currency": quotation.currency,
+            "price_or_product_discount": "Price",
+            "rate_or_discount": "Discount Percentage",
+            "discount_percentage": 10,
+        }).insert(ignore_permissions=True)
+
+        update_cart_allow_guest(item_code, 5)
+
+        quotation = frappe.get_doc("Quotation", quotation_name)
+        row = quotation.get("items", {"item_code": item_code})[0]
+        self.assertEqual(row.price_list_rate, 100)
+        self.assertEqual(row.discount_percentage, 10)
+        self.assertEqual(row.rate, 90)
+        self.assertTrue(row.pricing_rules)
+
+        incremental = (quotation.net_total, quotation.grand_total)
+        quotation.calculate_taxes_and_totals()
+        self.assertEqual(incremental, (quotation.net_total, quotation.grand_total))
@@ -0,0 +1,114 @@
+# guest_checkout/guest_checkout/tests/test_payments.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, nowdate
+from guest_checkout import payments
+
+
+class TestPayments(FrappeTestCase):
+    def setUp(self):
+        self.original_secret = frappe.conf.get(payments.CALLBACK_SECRET_CONF_KEY)
+        frappe.conf[payments.CALLBACK_SECRET_CONF_KEY] = "test-secret"
+        frappe.cache().delete_value(payments.PAYMENT_QUEUE_KEY)
+
+    def tearDown(self):
+        frappe.conf[payments.CALLBACK_SECRET_CONF_KEY] = self.original_secret
+        frappe.cache().delete_value(payments.PAYMENT_QUEUE_KEY)
+        payments.clear_gateway_accounts()
+        frappe.db.rollback()
+
+    def test_callback_with_bad_signature_is_rejected(self):
+        with self.assertRaises(frappe.PermissionError):
+            payments.payment_callback("Bookeey", "SO-0001", "TXN-1", 10, "Paid", "not-a-signature")
+
+        self.assertFalse(payments.get_queued_payments())
+
+    def test_repeated_callbacks_queue_one_payment(self):
+        signature = payments.sign_callback("Bookeey", "SO-0001", "TXN-1", 10, "Paid")
+        for _i in range(2):
+            response = payments.payment_callback("Bookeey", "SO-0001", "TXN-1", 10, "Paid", signature)
+
+        self.assertEqual(response["status"], "queued")
+        queued = payments.get_queued_payments()
+        self.assertEqual(list(queued), ["TXN-1"])
+        self.assertEqual(queued["TXN-1"]["sales_order"], "SO-0001")
+        self.assertEqual(queued["TXN-1"]["amount"], 10)
+
+    def test_guest_cannot_simulate_payments(self):
+        original_user = frappe.session.user
+        frappe.set_user("Guest")
+        try:
+            with self.assertRaises(frappe.PermissionError):
+                payments.simulate_payment("SO-0001", "Bookeey", amount=10)
+        finally:
+            frappe.set_user(original_user)
+
+        self.assertFalse(payments.get_queued_payments())
+
+    def test_payments_of_one_order_are_queued_separately(self):
+        payments.simulate_payment("SO-0001", "Bookeey", amount=4)
+        payments.simulate_payment("SO-0001", "Bookeey", amount=6)
+
+        queued = payments.get_queued_payments().values()
+        self.assertEqual(sorted(payment["amount"] for payment in queued), [4, 6])
+
+    def test_unpaid_status_is_not_queued(self):
+        response = payments.simulate_payment("SO-0001", "Bookeey", amount=10, status="Failed")
+
+        self.assertEqual(response["status"], "ignored")
+        self.assertFalse(payments.get_queued_payments())
+
+    def test_reconciler_skips_unknown_orders(self):
+        payments.simulate_payment("SO-DOES-NOT-EXIST", "Bookeey", amount=10)
+
+        self.assertEqual(payments.reconcile_payments(), 0)
+        self.assertFalse(payments.get_queued_payments())
+
+    def test_gateway_accounts_are_cached(self):
+        payments.get_gateway_accounts()
+
+        self.assertIsNotNone(frappe.cache().get_value(payments.GATEWAY_ACCOUNTS_KEY))
+        payments.clear_gateway_accounts()
+        self.assertIsNone(frappe.cache().get_value(payments.GATEWAY_ACCOUNTS_KEY))
+
+    def test_queued_payment_is_posted_against_the_order(self):
+        sales_order = self._make_paid_setup()
+        payments.simulate_payment(sales_order.name, "Bookeey")
+        transaction_id = next(iter(payments.get_queued_payments()))
+
+        self.assertEqual(payments.reconcile_payments(), 1)
+
+        self.assertFalse(payments.get_queued_payments())
+        payment_entry = frappe.get_doc("Payment Entry", {"reference_no": transaction_id})
+        self.assertEqual(payment_entry.docstatus, 1)
+        self.assertEqual(payment_entry.paid_amount, sales_order.grand_total)
+        self.assertEqual(payment_entry.references[0].reference_name, sales_order.name)
+
+        # A payment left queued by a run that crashed after its commit is not posted twice
+        payments.queue_payment("Bookeey", sales_order.name, transaction_id, sales_order.grand_total)
+        self.assertEqual(payments.reconcile_payments(), 0)
+        self.assertFalse(payments.get_queued_payments())
+
+    def _make_paid_setup(self):
+        if not frappe.db.exists("Mode of Payment", "Bookeey"):
+            frappe.get_doc({"doctype": "Mode of Payment", "mode_of_payment": "Bookeey", "type": "Bank"}).insert()
+        if not frappe.db.exists("Payment Gateway", "Bookeey"):
+            frappe.get_doc({"doctype": "Payment Gateway", "gateway": "Bookeey"}).insert()
+        frappe.get_doc({
+            "doctype": "Payment Gateway Account",
+            "payment_gateway": "Bookeey",
+            "payment_account": "_Test Bank - _TC",
+            "currency": "INR",
+        }).insert()
+        payments.clear_gateway_accounts()
+
+        sales_order = frappe.get_doc({
+            "doctype": "Sales Order",
+            "customer": "_Test Customer",
+            "company": "_Test Company",
+            "delivery_date": add_days(nowdate(), 7),
+            "items": [{"item_code": "_Test Item", "qty": 1, "rate": 100, "warehouse": "_Test Warehouse - _TC"}],
+        })
+        sales_order.insert()
+        sales_order.submit()
+        return sales_order
@@ -0,0 +1,53 @@
+# guest_checkout/guest_checkout/tests/test_rate_limit.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import rate_limit
+
+
+class TestRateLimit(FrappeTestCase):
+    def setUp(self):
+        frappe.cache().delete_keys(rate_limit.RATE_LIMIT_PREFIX)
+        self.original_session_user = frappe.session.user
+        frappe.session.user = "Guest"
+        frappe.session["guest_id"] = frappe.generate_hash(length=10)
+
+    def tearDown(self):
+        frappe.cache().delete_keys(rate_limit.RATE_LIMIT_PREFIX)
+        frappe.session.user = self.original_session_user
+        frappe.session.pop("guest_id", None)
+        frappe.local.guest_checkout_retry_after = None
+
+    def test_budget_is_exhausted_after_burst(self):
+        capacity, _rate = rate_limit.RATE_LIMIT_BUDGETS["checkout"]
+
+        results = [rate_limit.consume("checkout") for _i in range(capacity + 1)]
+
+        self.assertTrue(all(allowed for allowed, _retry in results[:capacity]))
+        allowed, retry_after = results[-1]
+        self.assertFalse(allowed)
+        self.assertGreater(retry_after, 0)
+
+    def test_budgets_are_separate(self):
+        capacity, _rate = rate_limit.RATE_LIMIT_BUDGETS["checkout"]
+        for _i in range(capacity + 1):
+            rate_limit.consume("checkout")
+
+        self.assertTrue(rate_limit.consume("cart_write")[0])
+
+    def test_new_guest_id_gets_a_fresh_budget(self):
+        capacity, _rate = rate_limit.RATE_LIMIT_BUDGETS["checkout"]
+        for _i in range(capacity + 1):
+            rate_limit.consume("checkout")
+
+        frappe.session["guest_id"] = frappe.generate_hash(length=10)
+        self.assertTrue(rate_limit.consume("checkout")[0])
+
+    def test_limited_requests_are_counted(self):
+        capacity, _rate = rate_limit.RATE_LIMIT_BUDGETS["checkout"]
+        for _i in range(capacity + 1):
+            rate_limit.consume("checkout")
+
+        frappe.session.user = "Administrator"
+        stats = rate_limit.get_rate_limit_stats()["checkout"]
+        self.assertEqual(stats["allowed"], capacity)
+        self.assertEqual(stats["limited"], 1)
@@ -0,0 +1,58 @@
+# guest_checkout/guest_checkout/tests/test_stock_check.py
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from guest_checkout import stock_check
+from guest_checkout.tests.utils import make_test_item
+
+
+class TestStockCheck(FrappeTestCase):
+    def setUp(self):
+        frappe.db.set_single_value("Webshop Settings", "check_stock_before_checkout", 1)
+        self.warehouse = frappe.db.get_value("Warehouse", {"is_group": 0}, "name")
+
+        self.item_codes = [
+            make_test_item(f"Test Stock Check Item {i}", is_stock_item=is_stock_item).name
+            for i, is_stock_item in ((1, 1), (2, 0))
+        ]
+
+        from erpnext.stock.utils import get_or_make_bin
+        bin_name = get_or_make_bin(self.item_codes[0], self.warehouse)
+        frappe.db.set_value("Bin", bin_name, {"actual_qty": 5, "reserved_qty": 2})
+
+        for item_code in self.item_codes:
+            frappe.cache().delete_value(f"{stock_check.STOCK_CACHE_PREFIX}:{item_code}")
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_available_is_actual_minus_reserved(self):
+        stock = stock_check.get_stock(self.item_codes[:1])
+        self.assertEqual(stock[self.item_codes[0]]["warehouses"][self.warehouse], 3)
+
+    def test_lines_over_available_are_short(self):
+        lines = [
+            {"item_code": self.item_codes[0], "qty": 2, "warehouse": self.warehouse},
+            {"item_code": self.item_codes[0], "qty": 2, "warehouse": self.warehouse},
+            {"item_code": self.item_codes[1], "qty": 100, "warehouse": self.warehouse},
+        ]
+
+        shortages = stock_check.get_shortages(lines)
+        self.assertEqual(len(shortages), 1)
+        self.assertEqual(shortages[0]["item_code"], self.item_codes[0])
+        self.assertEqual(shortages[0]["qty"], 4)
+        self.assertEqual(shortages[0]["available_qty"], 3)
+
+        self.assertRaises(frappe.ValidationError, stock_check.validate_stock, lines)
+
+    def test_checkout_does_not_trust_cached_stock(self):
+        stock_check.get_stock(self.item_codes[:1])
+        bin_name = frappe.db.get_value("Bin", {"item_code": self.item_codes[0], "warehouse": self.warehouse})
+        frappe.db.set_value("Bin", bin_name, "reserved_qty", 4)
+
+        lines = [{"item_code": self.item_codes[0], "qty": 3, "warehouse": self.warehouse}]
+        self.assertFalse(stock_check.get_shortages(lines))
+        with self.assertRaises(frappe.ValidationError):
+            stock_check.validate_stock(lines)
+
+    def test_lines_within_stock_pass(self):
+        stock_check.validate_stock([{"item_code": self.item_codes[0], "qty": 3, "warehouse": self.warehouse}])
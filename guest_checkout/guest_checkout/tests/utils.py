@@ -0,0 +1,24 @@
+# guest_checkout/guest_checkout/tests/utils.py
+import frappe
+
+
+TEST_ITEM_CODE = "Test Item for Guest Checkout"
+
+
+def make_test_item(item_code=TEST_ITEM_CODE, is_stock_item=1, **fields):
+    """Return the test Item, creating it on the first run
+
+    Fields are only applied when the Item is created.
+    """
+    if frappe.db.exists("Item", item_code):
+        return frappe.get_doc("Item", item_code)
+
+    return frappe.get_doc({
+        "doctype": "Item",
+        "item_code": item_code,
+        "item_name": item_code,
+        "item_group": "All Item Groups",
+        "stock_uom": "Nos",
+        "is_stock_item": is_stock_item,
+        **fields,
+    }).insert(ignore_permissions=True)